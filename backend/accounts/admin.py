@@ -1,8 +1,24 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import OutboundEmail, UserProfile
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'city', 'country', 'postal_code', 'created_at']
-    search_fields = ['user__username', 'user__email', 'city', 'country']
\ No newline at end of file
+    search_fields = ['user__username', 'user__email', 'city', 'country']
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Delivery status only: bodies can carry password-reset tokens, so they are never shown"""
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'recipients']
+    fields = ['subject', 'from_email', 'recipients', 'status', 'attempts', 'next_attempt_at', 'last_error',
+              'created_at', 'sent_at']
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
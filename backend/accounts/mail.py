@@ -0,0 +1,181 @@
+"""
+Outbound mail queue.
+
+Views never talk to the mail server: queue_mail() stores the message in
+OutboundEmail as part of the caller's transaction and returns. The sender
+(`manage.py send_queued_mail`; the `mailer` service in docker-compose, the
+auction-mailer Deployment in k3s) must be running for anything to go out. It claims due messages a batch at a time and
+delivers them over one connection, kept open while there is work. A failed
+message is retried with exponential backoff until MAX_ATTEMPTS, then marked
+FAILED. Claims are leases: if the sender dies mid-batch, those messages come
+due again after CLAIM_LEASE.
+
+Bodies can hold secrets (a password-reset link carries a live token), so they
+are blanked as soon as a message is SENT or FAILED, and the sender deletes
+finished rows after RETENTION.
+
+Delivery goes through EMAIL_BACKEND, so the console and locmem backends work
+as usual (tests drain the queue with MailSender().run_once()).
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from auctions.events import get_broker
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAIL_QUEUE = 'outbound-mail'
+MAX_ATTEMPTS = 8
+RETRY_BASE = timedelta(seconds=30)
+RETRY_MAX = timedelta(hours=1)
+CLAIM_LEASE = timedelta(minutes=10)
+RETENTION = timedelta(days=7)
+PURGE_INTERVAL = 3600.0
+
+
+def queue_mail(subject, body, recipients, html_body='', from_email=None):
+    """Store a message for the sender; delivered after the current transaction commits"""
+    message = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+        next_attempt_at=timezone.now(),
+    )
+
+    def poke():
+        try:
+            get_broker().publish(MAIL_QUEUE, {"id": message.id})
+        except Exception:
+            # The sender polls as well
+            logger.exception("Could not announce queued mail %s", message.id)
+    transaction.on_commit(poke)
+    return message
+
+
+def retry_delay(attempts):
+    """Backoff before the next try after `attempts` failures"""
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+class MailSender:
+    def __init__(self, batch_size=50, poll_interval=5.0, connection=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._connection = connection
+        self._last_purge = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = get_connection()
+        return self._connection
+
+    def claim(self, now):
+        """Lease up to batch_size due messages to this sender, oldest first"""
+        with transaction.atomic():
+            ids = list(
+                OutboundEmail.objects.select_for_update(skip_locked=True)
+                .filter(status='QUEUED', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            OutboundEmail.objects.filter(id__in=ids).update(
+                attempts=F('attempts') + 1, next_attempt_at=now + CLAIM_LEASE
+            )
+        return list(OutboundEmail.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+    def deliver(self, message):
+        """Send one message on the shared connection; returns the error, or None"""
+        email = EmailMultiAlternatives(
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email,
+            to=message.recipients,
+            connection=self.connection,
+        )
+        if message.html_body:
+            email.attach_alternative(message.html_body, 'text/html')
+        try:
+            email.send(fail_silently=False)
+        except Exception as exc:
+            # The connection may be what broke; reopen it for the next message
+            self.close()
+            return f"{type(exc).__name__}: {exc}"
+        return None
+
+    def run_once(self):
+        """Deliver one batch; returns how many messages were claimed"""
+        batch = self.claim(timezone.now())
+        if not batch:
+            return 0
+        self.connection.open()
+        for message in batch:
+            error = self.deliver(message)
+            now = timezone.now()
+            if error is None:
+                OutboundEmail.objects.filter(id=message.id).update(
+                    status='SENT', sent_at=now, last_error='', body='', html_body=''
+                )
+            elif message.attempts >= MAX_ATTEMPTS:
+                logger.error("Giving up on mail %s after %d attempts: %s", message.id, message.attempts, error)
+                OutboundEmail.objects.filter(id=message.id).update(
+                    status='FAILED', last_error=error, body='', html_body=''
+                )
+            else:
+                OutboundEmail.objects.filter(id=message.id).update(
+                    next_attempt_at=now + retry_delay(message.attempts), last_error=error
+                )
+        return len(batch)
+
+    def purge(self, now):
+        """Delete SENT and FAILED messages older than RETENTION; returns how many"""
+        deleted, _ = OutboundEmail.objects.filter(
+            status__in=['SENT', 'FAILED'], created_at__lt=now - RETENTION
+        ).delete()
+        return deleted
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        wake = threading.Event()
+        unsubscribe = get_broker().subscribe(MAIL_QUEUE, lambda message: wake.set())
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                wake.clear()
+                try:
+                    if self._last_purge is None or time.monotonic() - self._last_purge >= PURGE_INTERVAL:
+                        self._last_purge = time.monotonic()
+                        self.purge(timezone.now())
+                    claimed = self.run_once()
+                except Exception:
+                    logger.exception("Mail pass failed")
+                    self.close()
+                    stop_event.wait(1)
+                    continue
+                if claimed < self.batch_size:
+                    # Queue drained: don't hold the mail server's connection while idle
+                    self.close()
+                    wake.wait(self.poll_interval)
+        finally:
+            unsubscribe()
+            self.close()
@@ -0,0 +1,38 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.mail import MailSender
+
+
+class Command(BaseCommand):
+    help = "Run the worker that delivers queued outbound email"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Messages claimed per round")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds between checks when idle")
+        parser.add_argument('--once', action='store_true', help="Deliver everything already due, purge old messages and exit")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO)
+        sender = MailSender(batch_size=options['batch_size'], poll_interval=options['poll_interval'])
+        if options['once']:
+            sent = 0
+            try:
+                while True:
+                    claimed = sender.run_once()
+                    sent += claimed
+                    if claimed < sender.batch_size:
+                        break
+            finally:
+                sender.close()
+            purged = sender.purge(timezone.now())
+            self.stdout.write(f"Processed {sent} queued messages, purged {purged} old ones")
+            return
+
+        self.stdout.write("Outbound mail sender running")
+        try:
+            sender.run_forever()
+        except KeyboardInterrupt:
+            pass
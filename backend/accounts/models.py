@@ -13,4 +13,34 @@ class UserProfile(models.Model):
     created_at    = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.username} profile"
\ No newline at end of file
+        return f"{self.user.username} profile"
+
+class OutboundEmail(models.Model):
+    """A message waiting for (or done with) delivery by `manage.py send_queued_mail`"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    subject       = models.CharField(max_length=255)
+    body          = models.TextField()
+    html_body     = models.TextField(blank=True, default='')
+    from_email    = models.CharField(max_length=254)
+    recipients    = models.JSONField(default=list)
+    status        = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts      = models.PositiveSmallIntegerField(default=0)
+    # When the sender may next pick it up: backoff after a failure, or the
+    # lease of a sender that has claimed it
+    next_attempt_at = models.DateTimeField()
+    last_error    = models.TextField(blank=True, default='')
+    created_at    = models.DateTimeField(auto_now_add=True)
+    sent_at       = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
@@ -1,3 +1,125 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .mail import MAX_ATTEMPTS, RETENTION, MailSender, queue_mail, retry_delay
+from .models import OutboundEmail
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that fails the first `failures` sends and counts opens"""
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.opens = 0
+
+    def open(self):
+        self.opens += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mail server unavailable")
+        return super().send_messages(messages)
+
+
+class PasswordResetMailTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('ada', email='ada@example.com', password='x')
+        self.client = APIClient()
+
+    def test_reset_is_queued_not_sent(self):
+        response = self.client.post('/auth/password-reset/', {'email': 'ada@example.com'}, format='json')
+        self.assertEqual(response.json(), {'ok': True})
+        self.assertEqual(mail.outbox, [])
+        queued = OutboundEmail.objects.get()
+        self.assertEqual((queued.status, queued.recipients), ('QUEUED', ['ada@example.com']))
+
+        self.assertEqual(MailSender().run_once(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/reset-password', mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboundEmail.objects.get().status, 'SENT')
+
+    def test_reset_token_is_not_kept_after_delivery(self):
+        self.client.post('/auth/password-reset/', {'email': 'ada@example.com'}, format='json')
+        token = default_token_generator.make_token(User.objects.get(username='ada'))
+        self.assertIn(token, OutboundEmail.objects.get().body)
+
+        MailSender().run_once()
+        self.assertIn(token, mail.outbox[0].body)
+        sent = OutboundEmail.objects.get()
+        self.assertEqual((sent.status, sent.body, sent.html_body), ('SENT', '', ''))
+
+    def test_admin_never_shows_bodies(self):
+        User.objects.create_superuser('root', password='x')
+        self.client.post('/auth/password-reset/', {'email': 'ada@example.com'}, format='json')
+        queued = OutboundEmail.objects.get()
+        self.client.force_login(User.objects.get(username='root'))
+
+        response = self.client.get(f'/admin/accounts/outboundemail/{queued.id}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('reset-password', response.content.decode())
+        self.assertEqual(self.client.post(f'/admin/accounts/outboundemail/{queued.id}/change/', {}).status_code, 403)
+
+    def test_unknown_account_looks_the_same(self):
+        response = self.client.post('/auth/password-reset/', {'email': 'nobody@example.com'}, format='json')
+        self.assertEqual(response.json(), {'ok': True})
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class MailSenderTests(TestCase):
+    def test_batches_share_one_connection(self):
+        for n in range(5):
+            queue_mail(f'Note {n}', 'body', [f'user{n}@example.com'])
+        backend = FlakyBackend()
+        sender = MailSender(batch_size=2, connection=backend)
+        while sender.run_once():
+            pass
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(OutboundEmail.objects.filter(status='SENT').count(), 5)
+        self.assertEqual(backend.opens, 3)  # one per batch, all on the same backend
+        self.assertIs(sender.connection, backend)
+
+    def test_failures_back_off_then_give_up(self):
+        queued = queue_mail('Note', 'body', ['user@example.com'])
+        now = timezone.now()
+        for attempt in range(1, MAX_ATTEMPTS):
+            OutboundEmail.objects.filter(id=queued.id).update(next_attempt_at=now)
+            MailSender(connection=FlakyBackend(failures=1)).run_once()
+            queued.refresh_from_db()
+            self.assertEqual((queued.status, queued.attempts), ('QUEUED', attempt))
+            self.assertIn('mail server unavailable', queued.last_error)
+            self.assertGreaterEqual(queued.next_attempt_at, now + retry_delay(attempt))
+        self.assertEqual(MailSender().run_once(), 0)  # not due yet
+
+        OutboundEmail.objects.filter(id=queued.id).update(next_attempt_at=now)
+        MailSender(connection=FlakyBackend(failures=1)).run_once()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.body), ('FAILED', ''))
+        self.assertEqual(mail.outbox, [])
+
+    def test_finished_messages_are_purged_after_retention(self):
+        for n in range(4):
+            queue_mail(f'Note {n}', 'body', ['user@example.com'])
+        old = timezone.now() - RETENTION - timedelta(hours=1)
+        OutboundEmail.objects.update(created_at=old)
+        for message, status in zip(OutboundEmail.objects.order_by('id'), ['SENT', 'FAILED', 'QUEUED', 'SENT']):
+            OutboundEmail.objects.filter(id=message.id).update(status=status)
+        OutboundEmail.objects.filter(subject='Note 3').update(created_at=timezone.now())
+
+        self.assertEqual(MailSender().purge(timezone.now()), 2)
+        self.assertEqual(sorted(OutboundEmail.objects.values_list('subject', flat=True)), ['Note 2', 'Note 3'])
 
-# Create your tests here.
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(retry_delay(3), timedelta(seconds=120))
+        self.assertEqual(retry_delay(20), timedelta(hours=1))
@@ -5,7 +5,6 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.core.mail import send_mail # for sending password reset emails
 from django.views.decorators.http import require_GET, require_POST
 from django.middleware.csrf import get_token
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
@@ -14,6 +13,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from .serializers import SignupSerializer, UserSerializer
 from .models import UserProfile
+from .mail import queue_mail # for sending password reset emails
 from .authentication import CsrfExemptSessionAuthentication
 import os
 from urllib.parse import urlencode
@@ -197,23 +197,14 @@ KickBay Website Team
 </html>
 """
 
-    try:
-        print("Attempting to send email...")
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=os.getenv("DEFAULT_FROM_EMAIL", "noreply@example.com"),
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        print(f"✓ Password reset email sent to {user.email}")
-        print(f"Reset link (for dev): {reset_url}")
-    except Exception as e:
-        print(f"✗ Failed to send email: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-    
+    # Delivered by `manage.py send_queued_mail`; the request never waits on the mail server
+    queue_mail(
+        subject=subject,
+        body=message,
+        recipients=[user.email],
+        html_body=html_message,
+        from_email=os.getenv("DEFAULT_FROM_EMAIL", "noreply@example.com"),
+    )
     return Response({"ok": True})
 
 # Password Reset Token Confirmation 
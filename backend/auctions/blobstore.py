@@ -0,0 +1,120 @@
+"""
+Content-addressed storage for item images.
+
+Image bytes live outside the database under their SHA-256 digest, so
+identical uploads are stored once and a digest's content never changes (the
+serving view can mark responses immutable). AuctionItem.images keeps only
+metadata: [{"hash": ..., "format": "jpeg", "size": ..., "order": 0}, ...].
+
+The store is pluggable through settings.AUCTION_BLOB_STORE; the default keeps
+files on local disk under AUCTION_BLOB_ROOT (MEDIA_ROOT/blobs). Every process
+that saves or serves images must see the same root: in k3s that is the
+auction-blobs volume (k3s/1b-blobs.yaml), mounted by the backend pods, the
+migrate Job and the workers.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class BaseBlobStore:
+    def save(self, data):
+        """Store bytes and return their hex SHA-256 digest"""
+        return self.save_stream([data])[0]
+
+    def save_stream(self, chunks):
+        """Store an iterable of byte chunks; returns (digest, size)"""
+        raise NotImplementedError
+
+    def open(self, digest):
+        """Binary file object for a stored blob (raises FileNotFoundError)"""
+        raise NotImplementedError
+
+    def size(self, digest):
+        raise NotImplementedError
+
+    def exists(self, digest):
+        raise NotImplementedError
+
+    def read(self, digest):
+        with self.open(digest) as f:
+            return f.read()
+
+    def verify(self, digest):
+        """True if the blob is stored and its content still hashes to its digest"""
+        sha = hashlib.sha256()
+        try:
+            with self.open(digest) as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    sha.update(chunk)
+        except FileNotFoundError:
+            return False
+        return sha.hexdigest() == digest
+
+
+class FileSystemBlobStore(BaseBlobStore):
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, digest):
+        if not DIGEST_RE.match(digest):
+            raise FileNotFoundError(digest)
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def save_stream(self, chunks):
+        tmp_dir = self.root / 'tmp'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    sha.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            digest = sha.hexdigest()
+            final = self.path(digest)
+            if final.exists():
+                os.unlink(tmp_path)
+            else:
+                final.parent.mkdir(parents=True, exist_ok=True)
+                # Atomic, so readers never see a partially written blob
+                os.replace(tmp_path, final)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest, size
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    def size(self, digest):
+        return self.path(digest).stat().st_size
+
+    def exists(self, digest):
+        try:
+            return self.path(digest).exists()
+        except FileNotFoundError:
+            return False
+
+
+@lru_cache(maxsize=None)
+def get_blob_store():
+    store_class = import_string(settings.AUCTION_BLOB_STORE)
+    return store_class(settings.AUCTION_BLOB_ROOT)
+
+
+def image_url(image):
+    """Public URL of a stored image from its metadata entry"""
+    return f"{settings.AUCTION_IMAGE_URL}{image['hash']}.{image.get('format', 'jpeg')}"
@@ -0,0 +1,165 @@
+"""
+Read-through cache for single items.
+
+get_item_details, get_current_price and get_auction_status read items
+through get_item(). It caches the loaded AuctionItem (seller, current
+bidder and recent bids included) under a versioned key in the Django cache
+named by settings.AUCTION_ITEM_CACHE. Anything time-dependent (is_open,
+live_price, remaining time) is derived from the cached instance at read
+time, so entries only go stale when the row changes.
+
+Writers call invalidate_item() after changing an item. It moves the item
+to a new version once the transaction commits, so a reader that loaded the
+old row just before the write can only fill the old, unreachable key. In a
+shared cache that one bump reaches every process. Only a per-process cache
+(locmem, which the settings allow with DEBUG on) also announces the change
+on the events broker, so other processes bump their own copy of the version.
+
+Concurrent misses for the same item in one process share a single
+database load (single-flight), so a hot auction can't stampede the DB.
+
+The cache must be shared by every process serving items (Redis or
+Memcached): a per-process cache would keep serving a price other workers
+have moved on from. With AUCTION_ITEM_CACHE set to "" (the default when
+only locmem is configured), get_item() reads straight from the database.
+"""
+
+import logging
+import threading
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import serializers
+from .events import get_broker
+from .models import AuctionItem
+
+logger = logging.getLogger(__name__)
+
+ITEM_INVALIDATIONS = 'auction-item-invalidations'
+
+
+class SingleFlight:
+    """Run fn once per key at a time; concurrent callers wait for and share its result"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_flights = SingleFlight()
+
+
+def _cache():
+    return caches[settings.AUCTION_ITEM_CACHE]
+
+
+def _process_local():
+    """True when every process has its own copy of the item cache"""
+    return settings.CACHES[settings.AUCTION_ITEM_CACHE]['BACKEND'] in settings.PER_PROCESS_CACHE_BACKENDS
+
+
+def _version_key(item_id):
+    return f'auctions:item:{item_id}:version'
+
+
+def _item_version(item_id):
+    """Current version token of an item, creating one on first use"""
+    key = _version_key(item_id)
+    version = _cache().get(key)
+    if version is None:
+        # add() so racing readers agree on the same token
+        _cache().add(key, uuid.uuid4().hex, None)
+        version = _cache().get(key)
+    return version
+
+
+def load_item(item_id):
+    """Everything the item endpoints render, in one query plus the recent bids"""
+    return (
+        AuctionItem.objects
+        .select_related('seller', 'current_bidder')
+        .prefetch_related(serializers.recent_bids_prefetch())
+        .get(id=item_id)
+    )
+
+
+def get_item(item_id):
+    """The item with id item_id, from cache when possible; raises AuctionItem.DoesNotExist"""
+    if not settings.AUCTION_ITEM_CACHE:
+        return load_item(item_id)
+    if _process_local():
+        _subscribe()
+    key = f'auctions:item:{item_id}:{_item_version(item_id)}'
+    item = _cache().get(key)
+    if item is not None:
+        return item
+
+    def fill():
+        item = load_item(item_id)
+        _cache().set(key, item, settings.AUCTION_ITEM_CACHE_TTL)
+        return item
+    return _flights.do(key, fill)
+
+
+def _bump(item_id):
+    _cache().set(_version_key(item_id), uuid.uuid4().hex, None)
+
+
+def invalidate_item(item_id):
+    """Drop cached copies of an item, here and on other replicas, once the current transaction commits"""
+    if not settings.AUCTION_ITEM_CACHE:
+        return
+
+    def send():
+        _bump(item_id)
+        if not _process_local():
+            return
+        try:
+            get_broker().publish(ITEM_INVALIDATIONS, {"item_id": item_id})
+        except Exception:
+            # Other replicas' entries still expire after AUCTION_ITEM_CACHE_TTL
+            logger.exception("Could not publish invalidation for item %s", item_id)
+    transaction.on_commit(send)
+
+
+@lru_cache(maxsize=None)
+def _subscribe():
+    """Listen for other processes' invalidations (once per process)"""
+    get_broker().subscribe(ITEM_INVALIDATIONS, _on_invalidation)
+
+
+def _on_invalidation(message):
+    if settings.AUCTION_ITEM_CACHE and _process_local():
+        _bump(message["item_id"])
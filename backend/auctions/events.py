@@ -0,0 +1,123 @@
+"""
+Item update events.
+
+Writers (place_bid, the expiry scheduler) publish partial item state on a
+broker channel; every replica subscribes and fans the message out to its
+own listeners (the price stream in auctions/stream.py). The broker is
+pluggable through settings.AUCTION_EVENT_BROKER:
+
+- InProcessBroker delivers within the current process only. It is the
+  default and what tests use.
+- RedisBroker uses Redis pub/sub so updates reach every replica. It needs
+  the optional `redis` package and AUCTION_EVENT_BROKER_URL.
+"""
+
+import json
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except Exception:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+ITEM_UPDATES = 'auction-items'
+
+
+class BaseBroker:
+    """Publish/subscribe on named channels; callbacks may run on any thread"""
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, callback):
+        """Register callback(message); returns a function that unsubscribes it"""
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    def __init__(self, url=None):
+        self._lock = threading.Lock()
+        self._callbacks = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._callbacks.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Subscriber on %s failed", channel)
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._callbacks.setdefault(channel, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._callbacks.get(channel, ()):
+                    self._callbacks[channel].remove(callback)
+        return unsubscribe
+
+
+class RedisBroker(BaseBroker):
+    def __init__(self, url=None):
+        if redis is None:
+            raise RuntimeError("RedisBroker requires the 'redis' package")
+        self._client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self._local = InProcessBroker()
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._channels = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, channel, message):
+        self._client.publish(channel, json.dumps(message))
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            if channel not in self._channels:
+                self._pubsub.subscribe(**{channel: self._dispatch})
+                self._channels.add(channel)
+            if self._thread is None:
+                self._thread = self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+        return self._local.subscribe(channel, callback)
+
+    def _dispatch(self, raw):
+        channel = raw['channel'].decode() if isinstance(raw['channel'], bytes) else raw['channel']
+        self._local.publish(channel, json.loads(raw['data']))
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    broker_class = import_string(settings.AUCTION_EVENT_BROKER)
+    return broker_class(settings.AUCTION_EVENT_BROKER_URL or None)
+
+
+def item_state(item):
+    """The slice of an item the price stream needs, as JSON-friendly values"""
+    return {
+        "item_id": item.id,
+        "current_price": str(item.current_price),
+        "current_bidder": item.current_bidder.username if item.current_bidder_id else None,
+        "is_active": item.is_active,
+        "end_time": item.end_time.isoformat(),
+    }
+
+
+def publish_item_update(state):
+    """Publish (a partial) item state once the current transaction commits"""
+    def send():
+        try:
+            get_broker().publish(ITEM_UPDATES, state)
+        except Exception:
+            # Listeners fall back to their own timers; never fail the write for this
+            logger.exception("Could not publish update for item %s", state.get("item_id"))
+    transaction.on_commit(send)
@@ -0,0 +1,103 @@
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from auctions.models import AuctionItem, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the legacy AuctionItem.bid_history JSON into the Bid table, a chunk of items at a time. "
+        "Bids from usernames that no longer exist stay in the JSON unless --drop-unknown is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Items per transaction")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between chunks")
+        parser.add_argument('--drop-unknown', action='store_true',
+                            help="Discard bids from unknown users (still counted in bid_count)")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        moved_items = moved_bids = unknown = 0
+
+        while True:
+            # Only ids and the JSON we need; walk the table by primary key so
+            # each chunk is a short range scan and the app keeps serving bids
+            chunk = list(
+                AuctionItem.objects.filter(id__gt=last_id)
+                .exclude(bid_history=[])
+                .order_by('id')
+                .values('id', 'bid_history')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1]['id']
+
+            usernames = {
+                entry.get('username')
+                for row in chunk for entry in row['bid_history']
+            }
+            users = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+            with transaction.atomic():
+                for row in chunk:
+                    bids = []
+                    kept = []
+                    for entry in row['bid_history']:
+                        bidder_id = users.get(entry.get('username'))
+                        if bidder_id is None:
+                            # No Bid row can hold it; keep it where has_bids and bid_history still see it
+                            kept.append(entry)
+                            continue
+                        bids.append(Bid(
+                            item_id=row['id'],
+                            bidder_id=bidder_id,
+                            amount=Decimal(str(entry['amount'])).quantize(Decimal('0.01')),
+                            timestamp=_parse_timestamp(entry.get('timestamp'))
+                        ))
+                    Bid.objects.bulk_create(bids)
+                    counted = len(bids)
+                    unknown += len(kept)
+                    if options['drop_unknown']:
+                        # Dropped bids still count, so the item keeps has_bids
+                        counted += len(kept)
+                        kept = []
+                    # place_bid only bumps bid_count, so adding to it here is safe while live
+                    AuctionItem.objects.filter(id=row['id']).update(
+                        bid_history=kept,
+                        bid_count=F('bid_count') + counted
+                    )
+                    moved_bids += len(bids)
+            moved_items += len(chunk)
+
+            self.stdout.write(f"Backfilled {moved_items} items ({moved_bids} bids), last id {last_id}")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if unknown:
+            if options['drop_unknown']:
+                self.stdout.write(self.style.WARNING(f"Dropped {unknown} bids from unknown users"))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"Kept {unknown} bids from unknown users in bid_history; --drop-unknown discards them"
+                ))
+        self.stdout.write(self.style.SUCCESS(f"Done: {moved_bids} bids moved from {moved_items} items"))
+
+
+def _parse_timestamp(value):
+    """Parse an isoformat timestamp from bid_history, falling back to now"""
+    try:
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return timezone.now()
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts)
+    return ts
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from auctions.models import AuctionItem, Bid, BidParticipation
+
+
+class Command(BaseCommand):
+    help = "Rebuild BidParticipation rows from the Bid table, a chunk of items at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Items per transaction")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between chunks")
+
+    def handle(self, *args, **options):
+        # Participations are built from Bid rows only; bids still in the legacy
+        # JSON would be left out, so backfill_bids has to have finished. What it
+        # leaves behind is bids of users that no longer exist, who need no rows
+        legacy = AuctionItem.objects.exclude(bid_history=[]).values_list('bid_history', flat=True)
+        usernames = {entry.get('username') for history in legacy.iterator() for entry in history}
+        if User.objects.filter(username__in=usernames).exists():
+            raise CommandError("Items still keep bids in bid_history; run `manage.py backfill_bids` first")
+
+        last_id = 0
+        items = rows = 0
+        latest_amount = Subquery(
+            Bid.objects.filter(item_id=OuterRef('item_id'), bidder_id=OuterRef('bidder_id'))
+            .order_by('-timestamp', '-id')
+            .values('amount')[:1]
+        )
+
+        while True:
+            with transaction.atomic():
+                # Lock the chunk's items so place_bid can't record a bid between
+                # the aggregate and the rewrite; walk by primary key like backfill_bids
+                ids = list(
+                    AuctionItem.objects.select_for_update()
+                    .filter(id__gt=last_id, bid_count__gt=0)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:options['chunk_size']]
+                )
+                if not ids:
+                    break
+                last_id = ids[-1]
+
+                aggregates = (
+                    Bid.objects.filter(item_id__in=ids)
+                    .values('bidder_id', 'item_id')
+                    .annotate(count=Count('id'), last_at=Max('timestamp'), last_amount=latest_amount)
+                    .order_by()
+                )
+                participations = [
+                    BidParticipation(
+                        user_id=row['bidder_id'], item_id=row['item_id'], bid_count=row['count'],
+                        last_amount=row['last_amount'], last_bid_at=row['last_at']
+                    )
+                    for row in aggregates
+                ]
+                BidParticipation.objects.filter(item_id__in=ids).delete()
+                BidParticipation.objects.bulk_create(participations, batch_size=1000)
+            items += len(ids)
+            rows += len(participations)
+
+            self.stdout.write(f"Backfilled {items} items ({rows} participations), last id {last_id}")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {rows} participations for {items} items"))
@@ -0,0 +1,97 @@
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auctions.models import AuctionItem
+from core.benchmarking import summarize
+
+
+class Command(BaseCommand):
+    help = "Fire N concurrent bidders at one item and report accepted bids/s, p99 latency and lost updates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bidders', type=int, default=16)
+        parser.add_argument('--bids', type=int, default=25, help="Bids per bidder")
+        parser.add_argument('--auction-type', choices=['FORWARD', 'DUTCH'], default='FORWARD')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        bidders = [User.objects.create_user(f'bench-{tag}-{i}') for i in range(options['bidders'])]
+        dutch = options['auction_type'] == 'DUTCH'
+        item = AuctionItem.objects.create(
+            name=f'bench item {tag}',
+            description='bid benchmark',
+            starting_price=Decimal('10.00'),
+            current_price=Decimal('10.00'),
+            auction_type=options['auction_type'],
+            end_time=timezone.now() + timedelta(hours=1),
+            seller=seller,
+            dutch_decrease_percentage=Decimal('1.00') if dutch else None,
+            dutch_decrease_interval=3600 if dutch else None,
+            last_price_update=timezone.now(),
+        )
+
+        lock = threading.Lock()
+        latencies, accepted = [], []
+        statuses = {}
+        start_gate = threading.Barrier(len(bidders))
+
+        def bidder_loop(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            start_gate.wait()
+            try:
+                for _ in range(options['bids']):
+                    # Everybody races for the same "next" price, like a real bidding storm
+                    price = AuctionItem.objects.values_list('current_price', flat=True).get(id=item.id)
+                    amount = price if dutch else (price * Decimal('1.05')).quantize(Decimal('0.01')) + Decimal('0.01')
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(f'/items/{item.id}/bid/', {'bid_amount': str(amount)}, format='json')
+                        code = response.status_code
+                    except Exception as e:
+                        code = type(e).__name__
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses[code] = statuses.get(code, 0) + 1
+                        if code == 200:
+                            accepted.append(amount)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=bidder_loop, args=(u,)) for u in bidders]
+        wall_start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - wall_start
+
+        item.refresh_from_db()
+        stats = summarize(latencies)
+        lost = len(accepted) - item.bid_count
+
+        self.stdout.write(f"{len(bidders)} bidders x {options['bids']} bids on one {options['auction_type']} item in {wall:.2f}s")
+        self.stdout.write(f"  responses: {dict(sorted(statuses.items(), key=str))}")
+        self.stdout.write(f"  accepted bids/s: {len(accepted) / wall:.1f}")
+        self.stdout.write(f"  latency p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms")
+        self.stdout.write(f"  final price {item.current_price}, highest accepted {max(accepted) if accepted else None}")
+        if lost or (accepted and item.current_price != max(accepted)):
+            self.stdout.write(self.style.ERROR(f"  LOST UPDATES: {len(accepted)} accepted bids but bid_count is {item.bid_count}"))
+        elif dutch and len(accepted) > 1:
+            self.stdout.write(self.style.ERROR(f"  {len(accepted)} buyers won the same Dutch auction"))
+        else:
+            self.stdout.write(self.style.SUCCESS("  no lost updates"))
+
+        # Clean up everything the run created (items and bids cascade)
+        User.objects.filter(id__in=[seller.id] + [u.id for u in bidders]).delete()
@@ -0,0 +1,54 @@
+import base64
+import os
+import struct
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+
+from auctions.serializers import _check_base64_image, _check_uploaded_image
+from auctions.uploads import run_checks
+from core.benchmarking import best_of
+
+
+def synthetic_jpeg(size, width=6000, height=4000):
+    """`size` bytes that probe() reads as a width x height JPEG"""
+    header = (
+        b'\xff\xd8'
+        + b'\xff\xe0\x00\x10JFIF\x00' + bytes(9)
+        + b'\xff\xc0\x00\x11\x08' + struct.pack('>HH', height, width) + b'\x03' + bytes(9)
+    )
+    return header + os.urandom(size - len(header))
+
+
+class Command(BaseCommand):
+    help = "Time create_item's image validation, one image at a time vs on the validation pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=25, help="Image size, MB")
+        parser.add_argument('--images', type=int, default=5, help="Images per request")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        image = synthetic_jpeg(options['size'] * 1024 * 1024)
+        encoded = [base64.b64encode(image).decode()] * options['images']
+        uploads = []
+        for n in range(options['images']):
+            upload = TemporaryUploadedFile(f'{n}.jpg', 'image/jpeg', len(image), None)
+            upload.write(image)
+            uploads.append(upload)
+        del image
+
+        cases = [
+            ('images_data (base64)', _check_base64_image, encoded),
+            ('image_files (streamed)', _check_uploaded_image, uploads),
+        ]
+        self.stdout.write(f"{options['images']} x {options['size']}MB images; best of {options['repeat']}")
+        self.stdout.write(f"  {'':<24} {'serial':>10} {'pool':>10}")
+        try:
+            for label, check, items in cases:
+                serial = best_of(lambda: [check(idx, item) for idx, item in enumerate(items)], options['repeat'])
+                pooled = best_of(lambda: run_checks(check, items), options['repeat'])
+                self.stdout.write(f"  {label:<24} {serial * 1000:>7.1f} ms {pooled * 1000:>7.1f} ms")
+        finally:
+            for upload in uploads:
+                upload.close()
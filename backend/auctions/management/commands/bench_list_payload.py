@@ -0,0 +1,89 @@
+import json
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from auctions.models import AuctionItem, Bid
+from auctions.serializers import (
+    LIST_DEFERRED_FIELDS,
+    AuctionItemListSerializer,
+    AuctionItemSerializer,
+    recent_bids_prefetch
+)
+from core.benchmarking import best_of
+
+
+class Command(BaseCommand):
+    help = "Compare fetched bytes, response size and render time of full vs. list-mode item pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--images', type=int, default=5, help="Images per item")
+        parser.add_argument('--bids', type=int, default=40, help="Bids per item")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        bidder = User.objects.create_user(f'bench-bidder-{tag}')
+        try:
+            self._seed(tag, seller, bidder, options)
+            base = AuctionItem.objects.filter(seller=seller).select_related('seller', 'current_bidder').order_by('-end_time')
+
+            full_qs = base.prefetch_related(recent_bids_prefetch())
+            list_qs = base.defer(*LIST_DEFERRED_FIELDS)
+
+            self.stdout.write(f"{options['items']}-item page, {options['images']} images and {options['bids']} bids per item")
+            self.stdout.write(f"  {'mode':<6} {'queries':>8} {'db bytes':>12} {'response bytes':>15} {'render ms':>10}")
+            for mode, qs, serializer_class in [
+                ('full', full_qs, AuctionItemSerializer),
+                ('list', list_qs, AuctionItemListSerializer),
+            ]:
+                with CaptureQueriesContext(connection) as queries:
+                    body = json.dumps(serializer_class(list(qs), many=True).data).encode()
+                db_bytes = sum(_result_bytes(q['sql']) for q in queries.captured_queries)
+                render = best_of(lambda: json.dumps(serializer_class(list(qs), many=True).data), repeat=5)
+                self.stdout.write(
+                    f"  {mode:<6} {len(queries):>8} {db_bytes:>12,} {len(body):>15,} {render * 1000:>10.1f}"
+                )
+        finally:
+            seller.delete()
+            bidder.delete()
+
+    def _seed(self, tag, seller, bidder, options):
+        now = timezone.now()
+        image = {
+            "hash": "0" * 64, "format": "jpeg", "size": 4_000_000, "order": 0,
+            "renditions": {
+                name: {"hash": "1" * 64, "format": "webp", "width": edge, "height": edge * 3 // 4}
+                for name, edge in (('thumb', 240), ('medium', 800), ('full', 1600))
+            },
+        }
+        items = AuctionItem.objects.bulk_create([
+            AuctionItem(
+                name=f'bench-{tag} item {i}', description='A reasonably sized description. ' * 6,
+                starting_price=Decimal('10.00'), current_price=Decimal('10.00'),
+                auction_type='FORWARD', end_time=now + timedelta(days=1), seller=seller,
+                current_bidder=bidder, bid_count=options['bids'],
+                images=[dict(image, order=n) for n in range(options['images'])],
+                thumbnail_key=f"{'1' * 64}.webp",
+            )
+            for i in range(options['items'])
+        ])
+        Bid.objects.bulk_create([
+            Bid(item=item, bidder=bidder, amount=Decimal('10.00') + n, timestamp=now - timedelta(minutes=n))
+            for item in items for n in range(options['bids'])
+        ], batch_size=1000)
+
+
+def _result_bytes(sql):
+    """Approximate bytes the database sent back for a captured query"""
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return sum(len(str(value).encode()) for row in cursor.fetchall() for value in row if value is not None)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from auctions.serializers import serialize_list_rows
+from core.benchmarking import best_of
+from core.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = "Compare render throughput of DRF's JSONRenderer and FastJSONRenderer on list and bid-history payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000, help="Items in the list payload")
+        parser.add_argument('--bids', type=int, default=5000, help="Entries in the bid-history payload")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed; FastJSONRenderer falls back to the stdlib encoder")
+        payloads = {
+            f"list page ({options['items']} items)": self._list_payload(options['items']),
+            f"bid history ({options['bids']} bids)": self._bid_history_payload(options['bids']),
+        }
+        renderers = [('drf', JSONRenderer()), ('fast', FastJSONRenderer())]
+
+        self.stdout.write(f"best of {options['repeat']}")
+        self.stdout.write(f"  {'payload':<28} {'renderer':<8} {'bytes':>10} {'ms':>8} {'MB/s':>8} {'speedup':>8}")
+        for name, payload in payloads.items():
+            baseline = None
+            for label, renderer in renderers:
+                body = renderer.render(payload)
+                seconds = best_of(lambda: renderer.render(payload), options['repeat'])
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f"  {name:<28} {label:<8} {len(body):>10,} {seconds * 1000:>8.2f}"
+                    f" {len(body) / seconds / 1e6:>8.1f} {baseline / seconds:>7.1f}x"
+                )
+
+    def _list_payload(self, count):
+        """A list_items response: compiled-serializer rows (strings, floats, nested dicts)"""
+        now = timezone.now()
+        rows = [
+            {
+                'id': i, 'name': f'Item {i}', 'description': 'A reasonably sized description. ' * 6,
+                'starting_price': Decimal('100.00'), 'current_price': Decimal('100.00') + i,
+                'auction_type': 'DUTCH' if i % 4 == 0 else 'FORWARD',
+                'end_time': now + timedelta(hours=1) if i % 3 else now - timedelta(hours=1),
+                'is_active': bool(i % 3), 'created_at': now - timedelta(days=1), 'bid_count': i % 7,
+                'thumbnail_key': f"{'1' * 64}.webp", 'dutch_decrease_interval': 60,
+                'dutch_decrease_percentage': Decimal('5.00'), 'seller__username': 'seller',
+                'current_bidder__username': 'bidder' if i % 2 else None,
+            }
+            for i in range(count)
+        ]
+        return {'count': count, 'page_size': count, 'next_cursor': None, 'results': serialize_list_rows(rows, now)}
+
+    def _bid_history_payload(self, count):
+        """Raw Decimal amounts and aware datetimes, left for the renderer to encode"""
+        now = timezone.now()
+        return {
+            'item_id': 1,
+            'bids': [
+                {'username': f'bidder{n % 50}', 'amount': Decimal('10.00') + n, 'timestamp': now - timedelta(seconds=n)}
+                for n in range(count)
+            ],
+        }
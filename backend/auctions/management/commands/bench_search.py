@@ -0,0 +1,101 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from auctions.models import AuctionItem
+from auctions.search import get_search_backend
+from core.benchmarking import summarize, timed
+
+WORDS = (
+    'vintage', 'leather', 'jacket', 'shoe', 'sneaker', 'boot', 'watch', 'camera', 'lens', 'guitar',
+    'amplifier', 'vinyl', 'record', 'lamp', 'chair', 'table', 'desk', 'bicycle', 'helmet', 'console',
+    'controller', 'laptop', 'monitor', 'keyboard', 'phone', 'tablet', 'ring', 'necklace', 'bracelet', 'painting',
+    'poster', 'comic', 'novel', 'signed', 'rare', 'mint', 'sealed', 'used', 'antique', 'wooden',
+)
+
+
+class Command(BaseCommand):
+    help = "Compare search_items latency of the old icontains scan against the configured search backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000)
+        parser.add_argument('--vocabulary', type=int, default=20_000, help="Distinct words in the synthetic catalog")
+        parser.add_argument('--rounds', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--page-size', type=int, default=24)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        rng = random.Random(4413)
+        vocabulary = list(WORDS) + [f'{tag[:2]}w{n}' for n in range(options['vocabulary'])]
+        # Zipf-ish word frequencies so queries cover very common and rare terms
+        weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+        try:
+            started = time.perf_counter()
+            self._seed(seller, rng, vocabulary, weights, options['items'])
+            self.stdout.write(f"seeded {options['items']:,} items in {time.perf_counter() - started:.1f}s")
+
+            backend = get_search_backend()
+            if hasattr(backend, 'rebuild'):
+                started = time.perf_counter()
+                backend.rebuild()
+                self.stdout.write(f"built in-process index in {time.perf_counter() - started:.1f}s")
+
+            queries = [vocabulary[0], vocabulary[5], vocabulary[30], vocabulary[500], f'{vocabulary[1]} {vocabulary[200]}']
+            page_size = options['page_size']
+            self.stdout.write(f"{type(backend).__name__}, page of {page_size}, {options['rounds']} rounds per query")
+            self.stdout.write(f"  {'query':<24} {'matches':>9} {'icontains p50':>14} {'engine p50':>11} {'speedup':>8}")
+            for keyword in queries:
+                now = timezone.now()
+                scan, engine = [], []
+                for _ in range(options['rounds']):
+                    with timed(scan):
+                        matches = self._icontains_page(keyword, now, page_size)
+                    with timed(engine):
+                        total, _ = backend.search(keyword, now=now, offset=0, limit=page_size, status='active')
+                scan, engine = summarize(scan), summarize(engine)
+                self.stdout.write(
+                    f"  {keyword:<24} {total:>9,} {scan['p50_ms']:>12.1f}ms {engine['p50_ms']:>9.1f}ms "
+                    f"{scan['p50_ms'] / max(engine['p50_ms'], 0.001):>7.1f}x"
+                )
+        finally:
+            # Raw delete: collecting a million rows through the ORM would dwarf the benchmark
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {AuctionItem._meta.db_table} WHERE seller_id = %s', [seller.id])
+            seller.delete()
+            if hasattr(get_search_backend(), 'rebuild'):
+                get_search_backend().rebuild()
+
+    def _seed(self, seller, rng, vocabulary, weights, count, batch_size=5000):
+        now = timezone.now()
+        for start in range(0, count, batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, count)):
+                price = Decimal(rng.randint(100, 100_000)) / 100
+                batch.append(AuctionItem(
+                    name=' '.join(rng.choices(vocabulary, cum_weights=weights, k=3)),
+                    description=' '.join(rng.choices(vocabulary, cum_weights=weights, k=12)),
+                    starting_price=price, current_price=price,
+                    auction_type='DUTCH' if i % 5 == 0 else 'FORWARD',
+                    end_time=now + timedelta(hours=rng.randint(-24, 240)), seller=seller,
+                ))
+            AuctionItem.objects.bulk_create(batch)
+
+    def _icontains_page(self, keyword, now, page_size):
+        """What search_items did before: substring scan over name and description"""
+        qs = AuctionItem.objects.filter(
+            Q(name__icontains=keyword) | Q(description__icontains=keyword),
+            is_active=True, end_time__gt=now,
+        ).order_by('-created_at')
+        total = qs.count()
+        list(qs.values_list('id', flat=True)[:page_size])
+        return total
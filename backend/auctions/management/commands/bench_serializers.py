@@ -0,0 +1,70 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.models import AuctionItem
+from auctions.serializers import (
+    LIST_DEFERRED_FIELDS,
+    LIST_VALUES,
+    AuctionItemListSerializer,
+    serialize_list_rows
+)
+from core.benchmarking import best_of
+
+
+class Command(BaseCommand):
+    help = "Compare AuctionItemListSerializer with the compiled serialize_list_rows path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        bidder = User.objects.create_user(f'bench-bidder-{tag}')
+        try:
+            self._seed(tag, seller, bidder, max(options['sizes']))
+            base = AuctionItem.objects.filter(seller=seller).order_by('id')
+            drf_qs = base.select_related('seller', 'current_bidder').defer(*LIST_DEFERRED_FIELDS)
+            values_qs = base.values(*LIST_VALUES)
+
+            self.stdout.write(f"best of {options['repeat']}, milliseconds per page")
+            self.stdout.write(
+                f"  {'items':>6} {'drf render':>11} {'fast render':>12} {'speedup':>8} {'drf e2e':>9} {'fast e2e':>9} {'speedup':>8}"
+            )
+            for size in options['sizes']:
+                instances = list(drf_qs[:size])
+                rows = list(values_qs[:size])
+                drf = best_of(lambda: AuctionItemListSerializer(instances, many=True).data, options['repeat'])
+                fast = best_of(lambda: serialize_list_rows(rows), options['repeat'])
+                # End to end: fetch plus render, as the views do it
+                drf_e2e = best_of(lambda: AuctionItemListSerializer(drf_qs[:size], many=True).data, options['repeat'])
+                fast_e2e = best_of(lambda: serialize_list_rows(values_qs[:size]), options['repeat'])
+                self.stdout.write(
+                    f"  {size:>6} {drf * 1000:>11.2f} {fast * 1000:>12.2f} {drf / fast:>7.1f}x"
+                    f" {drf_e2e * 1000:>9.2f} {fast_e2e * 1000:>9.2f} {drf_e2e / fast_e2e:>7.1f}x"
+                )
+        finally:
+            seller.delete()
+            bidder.delete()
+
+    def _seed(self, tag, seller, bidder, count):
+        now = timezone.now()
+        AuctionItem.objects.bulk_create([
+            AuctionItem(
+                name=f'bench-{tag} item {i}', description='A reasonably sized description. ' * 6,
+                starting_price=Decimal('100.00'), current_price=Decimal('100.00') + i,
+                # A mix of open/ended forward auctions and open Dutch auctions
+                auction_type='DUTCH' if i % 4 == 0 else 'FORWARD',
+                end_time=now + timedelta(hours=1) if i % 3 else now - timedelta(hours=1),
+                is_active=bool(i % 3), seller=seller, current_bidder=bidder if i % 2 else None,
+                dutch_decrease_percentage=Decimal('5.00'), dutch_decrease_interval=60,
+                thumbnail_key=f"{'1' * 64}.webp",
+            )
+            for i in range(count)
+        ], batch_size=1000)
@@ -0,0 +1,86 @@
+import base64
+import io
+import json
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auctions import renditions
+from auctions.blobstore import get_blob_store
+from auctions.models import AuctionItem
+
+
+class Command(BaseCommand):
+    help = "Compare list page payload with inline base64 thumbnails vs. rendition URLs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=20, help="Items on the page")
+        parser.add_argument('--width', type=int, default=3000)
+        parser.add_argument('--height', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        from PIL import Image
+
+        tag = uuid.uuid4().hex[:8]
+        store = get_blob_store()
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        try:
+            originals = []
+            for i in range(options['items']):
+                # Noise compresses badly, like a real photo
+                image = Image.effect_noise((options['width'], options['height']), 40 + i).convert('RGB')
+                out = io.BytesIO()
+                image.save(out, 'JPEG', quality=90)
+                originals.append(out.getvalue())
+
+            items = []
+            for i, content in enumerate(originals):
+                image = {"hash": store.save(content), "format": "jpeg", "size": len(content), "order": 0}
+                item = AuctionItem(
+                    name=f'bench-{tag} item {i}', description='thumbnail benchmark',
+                    starting_price=Decimal('10.00'), current_price=Decimal('10.00'),
+                    auction_type='FORWARD', end_time=timezone.now() + timedelta(days=1),
+                    seller=seller, images=[image]
+                )
+                item.thumbnail_key = item.compute_thumbnail_key()
+                item.save()
+                items.append(item)
+
+            client = APIClient()
+            url = f"/items/?q=bench-{tag}&page_size={options['items']}"
+
+            # Before: every card carried its full first image as a base64 data URI
+            page = json.loads(client.get(url).content)
+            by_id = {item.id: content for item, content in zip(items, originals)}
+            for row in page['results']:
+                encoded = base64.b64encode(by_id[row['id']]).decode()
+                row['thumbnail'] = f"data:image/jpeg;base64,{encoded}"
+                row['images'] = [{"data": encoded, "format": "jpeg", "order": 0}]
+            legacy_bytes = len(json.dumps(page).encode())
+
+            with ProcessPoolExecutor() as pool:
+                for item in items:
+                    renditions.build_for_item(item.id, pool=pool)
+
+            response = client.get(url)
+            page = json.loads(response.content)
+            json_bytes = len(response.content)
+            thumb_bytes = sum(store.size(row['thumbnail'].rsplit('/', 1)[-1].split('.')[0]) for row in page['results'])
+
+            self.stdout.write(f"{options['items']} items, {options['width']}x{options['height']} JPEG originals")
+            self.stdout.write(f"  original images total:          {sum(map(len, originals)):>14,} bytes")
+            self.stdout.write(f"  before: page JSON (base64 inline) {legacy_bytes:>12,} bytes")
+            self.stdout.write(f"  after:  page JSON                 {json_bytes:>12,} bytes")
+            self.stdout.write(f"  after:  + thumbnails fetched      {thumb_bytes:>12,} bytes")
+            self.stdout.write(self.style.SUCCESS(
+                f"  page weight {legacy_bytes:,} -> {json_bytes + thumb_bytes:,} bytes "
+                f"({legacy_bytes / max(json_bytes + thumb_bytes, 1):.0f}x smaller)"
+            ))
+        finally:
+            seller.delete()
@@ -0,0 +1,116 @@
+import base64
+import json
+import multiprocessing
+import resource
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.client import MULTIPART_CONTENT
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+
+from auctions.blobstore import get_blob_store
+from auctions.management.commands.bench_image_validation import synthetic_jpeg
+from auctions.views import create_item
+
+
+def _status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+
+def _reset_peak_rss():
+    """Start a new high-water mark at the current RSS (Linux); returns the current RSS in kB"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _status_kb('VmRSS')
+    except OSError:
+        # Elsewhere the peak can't be reset; growth is measured against the old peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _peak_rss_kb():
+    try:
+        return _status_kb('VmHWM')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    help = "Peak RSS of one create_item request: base64 images_data vs streamed image_files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,5,20', help="Image sizes to try, MB")
+        parser.add_argument('--images', type=int, default=5, help="Images per request")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='bench-uploader')
+        self.stdout.write(f"{options['images']} images per request; peak RSS growth while handling it")
+        self.stdout.write(f"{'image':>7} {'payload':>9} {'base64 JSON':>12} {'multipart':>10}")
+        try:
+            for size_mb in [int(value) for value in options['sizes'].split(',')]:
+                payload_mb = size_mb * options['images']
+                base64_mb = self.measure('base64', user.id, size_mb, options['images'])
+                stream_mb = self.measure('multipart', user.id, size_mb, options['images'])
+                self.stdout.write(f"{size_mb:>5}MB {payload_mb:>7}MB {base64_mb:>10.1f}MB {stream_mb:>8.1f}MB")
+        finally:
+            user.delete()
+
+    def measure(self, mode, user_id, size_mb, count):
+        # A forked child per request, so each high-water mark starts from the same place
+        connection.close()
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        child = ctx.Process(target=self._upload, args=(queue, mode, user_id, size_mb, count))
+        child.start()
+        result = queue.get()
+        child.join()
+        if isinstance(result, str):
+            raise RuntimeError(result)
+        return result
+
+    def _upload(self, queue, mode, user_id, size_mb, count):
+        try:
+            queue.put(self._upload_in_child(mode, user_id, size_mb, count))
+        except Exception as exc:
+            queue.put(f"{type(exc).__name__}: {exc}")
+
+    def _upload_in_child(self, mode, user_id, size_mb, count):
+        with tempfile.TemporaryDirectory() as blob_root:
+            settings.AUCTION_BLOB_ROOT = blob_root
+            get_blob_store.cache_clear()
+            user = User.objects.get(id=user_id)
+            image = synthetic_jpeg(size_mb * 1024 * 1024)
+            fields = {
+                'name': 'bench', 'description': 'upload benchmark', 'starting_price': '10.00',
+                'auction_type': 'FORWARD', 'end_time': (timezone.now() + timedelta(days=1)).isoformat(),
+            }
+            factory = RequestFactory()
+            # The request body is built before the baseline: only server-side handling is measured
+            if mode == 'base64':
+                body = json.dumps({**fields, 'images_data': [base64.b64encode(image).decode()] * count})
+                request = factory.post('/items/create/', body, content_type='application/json')
+                del body
+            else:
+                files = [SimpleUploadedFile(f'{n}.jpg', image) for n in range(count)]
+                request = factory.post('/items/create/', {**fields, 'image_files': files}, content_type=MULTIPART_CONTENT)
+                del files
+            del image
+            force_authenticate(request, user)
+
+            baseline = _reset_peak_rss()
+            with transaction.atomic():
+                response = create_item(request)
+                transaction.set_rollback(True)
+            if response.status_code != 201:
+                raise RuntimeError(f"create_item answered {response.status_code}: {response.data}")
+            return (_peak_rss_kb() - baseline) / 1024
@@ -0,0 +1,111 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from auctions.models import AuctionItem, Bid, BidParticipation
+from auctions.pagination import keyset_page
+from auctions.serializers import LIST_VALUES, serialize_list_rows
+from core.benchmarking import best_of
+
+
+class Command(BaseCommand):
+    help = "Compare ways of answering get_user_bids on a large catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--bidders', type=int, default=200)
+        parser.add_argument('--bids-per-item', type=int, default=3)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        bidders = User.objects.bulk_create([
+            User(username=f'bench-bidder-{tag}-{n}') for n in range(options['bidders'])
+        ])
+        bidders = list(User.objects.filter(username__startswith=f'bench-bidder-{tag}-'))
+        target = bidders[0]
+        try:
+            started = time.perf_counter()
+            self._seed(seller, bidders, options)
+            self.stdout.write(f"seeded {options['items']:,} items in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            call_command('backfill_participations', stdout=open('/dev/null', 'w'))
+            self.stdout.write(f"backfilled participations in {time.perf_counter() - started:.1f}s")
+            participating = BidParticipation.objects.filter(user=target).count()
+            self.stdout.write(f"{target.username} has bid on {participating:,} items")
+
+            def legacy_scan():
+                # What get_user_bids used to do: every item, every bid_history entry
+                return [
+                    item for item in AuctionItem.objects.filter(seller=seller)
+                    if any(entry.get('username') == target.username for entry in item.bid_history)
+                ]
+
+            def bids_subquery():
+                return serialize_list_rows(AuctionItem.objects.filter(
+                    id__in=Bid.objects.filter(bidder=target).values('item_id')
+                ).order_by('-created_at').values(*LIST_VALUES))
+
+            def participation_page():
+                qs = AuctionItem.objects.filter(participations__user=target).annotate(
+                    bid_amount=F('participations__last_amount'),
+                    last_bid_at=F('participations__last_bid_at')
+                ).values(*LIST_VALUES, 'bid_amount', 'last_bid_at')
+                rows, _ = keyset_page(qs, '-last_bid_at', options['page_size'])
+                return serialize_list_rows(rows)
+
+            self.stdout.write(f"best of {options['repeat']}")
+            for label, fn in [
+                ('bid_history scan (all items)', legacy_scan),
+                ('Bid subquery (all items)', bids_subquery),
+                (f"participation index (page of {options['page_size']})", participation_page),
+            ]:
+                self.stdout.write(f"  {label:<36} {best_of(fn, options['repeat']) * 1000:>10.1f} ms")
+        finally:
+            # Raw deletes: collecting this many rows through the ORM would dwarf the benchmark
+            items = f'SELECT id FROM {AuctionItem._meta.db_table} WHERE seller_id = %s'
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {BidParticipation._meta.db_table} WHERE item_id IN ({items})', [seller.id])
+                cursor.execute(f'DELETE FROM {Bid._meta.db_table} WHERE item_id IN ({items})', [seller.id])
+                cursor.execute(f'DELETE FROM {AuctionItem._meta.db_table} WHERE seller_id = %s', [seller.id])
+            User.objects.filter(id__in=[seller.id] + [bidder.id for bidder in bidders]).delete()
+
+    def _seed(self, seller, bidders, options, batch_size=5000):
+        rng = random.Random(4413)
+        now = timezone.now()
+        for start in range(0, options['items'], batch_size):
+            count = min(batch_size, options['items'] - start)
+            histories = [
+                [(rng.choice(bidders), Decimal(10 + n)) for n in range(options['bids_per_item'])]
+                for _ in range(count)
+            ]
+            items = AuctionItem.objects.bulk_create([
+                AuctionItem(
+                    name=f'Item {start + i}', description='Seeded item',
+                    starting_price=Decimal('10.00'), current_price=history[-1][1],
+                    auction_type='FORWARD', end_time=now + timedelta(days=1), seller=seller,
+                    current_bidder=history[-1][0], bid_count=len(history),
+                    bid_history=[
+                        {"username": bidder.username, "amount": float(amount), "timestamp": now.isoformat()}
+                        for bidder, amount in history
+                    ],
+                )
+                for i, history in enumerate(histories)
+            ])
+            Bid.objects.bulk_create([
+                Bid(item=item, bidder=bidder, amount=amount, timestamp=now - timedelta(seconds=rng.randint(0, 86400)))
+                for item, history in zip(items, histories)
+                for bidder, amount in history
+            ], batch_size=batch_size)
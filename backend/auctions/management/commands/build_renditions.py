@@ -0,0 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auctions import renditions
+from auctions.models import AuctionItem
+
+
+class Command(BaseCommand):
+    help = "Build thumbnail/medium/full renditions for items that don't have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.AUCTION_RENDITION_WORKERS)
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        items = images = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                ids = list(
+                    AuctionItem.objects.filter(id__gt=last_id)
+                    .exclude(images=[])
+                    .order_by('id')
+                    .values_list('id', flat=True)[:options['chunk_size']]
+                )
+                if not ids:
+                    break
+                last_id = ids[-1]
+                for item_id in ids:
+                    built = renditions.build_for_item(item_id, pool=pool)
+                    if built:
+                        items += 1
+                        images += built
+                self.stdout.write(f"Checked up to item {last_id}: {images} images rendered across {items} items")
+        self.stdout.write(self.style.SUCCESS(f"Done: {images} images rendered across {items} items"))
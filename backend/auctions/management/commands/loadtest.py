@@ -0,0 +1,426 @@
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import ROUND_UP, Decimal
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Max, Q
+from django.test import Client
+from django.utils import timezone
+
+from auctions.models import AuctionItem, Bid
+from core.benchmarking import summarize
+from payments.models import Payment
+from payments.settlement import SettlementWorker
+
+SCENARIOS = ('browse', 'poll', 'bid', 'dutch', 'pay')
+DEFAULT_MIX = 'browse=45,poll=35,bid=12,dutch=4,pay=4'
+SORTS = ('ending_soon', 'newest', 'price_asc', 'price_desc')
+BROWSE_PAGE_SIZE = 24  # as app/page.tsx asks for
+# Browsers who click "Next page" again, following next_cursor like the frontend
+NEXT_PAGE_SHARE = 0.6
+# Old clients still paging with ?page=N (OFFSET pagination)
+LEGACY_PAGE_SHARE = 0.05
+CENT = Decimal('0.01')
+
+
+def parse_mix(value):
+    """'browse=45,poll=35,...' -> {scenario: weight}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS or not weight.strip().isdigit():
+            raise CommandError(f"Bad --mix entry {part!r}; scenarios are {', '.join(SCENARIOS)}")
+        mix[name.strip()] = int(weight)
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one non-zero weight")
+    return mix
+
+
+class Recorder:
+    """One thread's results: latencies and statuses per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.rejected = Counter()
+        self.scenarios = Counter()
+
+    def call(self, client, method, path, endpoint, expected=(200,), rejections=(), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = getattr(client, method)(path, **kwargs)
+        except Exception:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.statuses[endpoint]['exception'] += 1
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][str(response.status_code)] += 1
+        if response.status_code in rejections:
+            # The workload expects these: outbid, sold out from under the bidder, ...
+            self.rejected[endpoint] += 1
+        elif response.status_code not in expected:
+            self.errors[endpoint] += 1
+        return response
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a catalog and drive the API in-process with a mix of browsing, price polling, "
+        "bidding storms, Dutch races and payments; reports latency and errors per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=20000, help="Catalog size")
+        parser.add_argument('--users', type=int, default=200, help="Registered bidders")
+        parser.add_argument('--hot', type=int, default=5, help="Forward auctions closing during the run")
+        parser.add_argument('--dutch', type=int, default=40, help="Open Dutch auctions to race for")
+        parser.add_argument('--won', type=int, default=400, help="Closed auctions awaiting payment")
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent virtual clients")
+        parser.add_argument('--duration', type=float, default=30.0, help="Seconds of load")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help="Scenario weights")
+        parser.add_argument('--seed', type=int, default=4413)
+        parser.add_argument('--no-settlement', action='store_true',
+                            help="Don't run a settlement worker alongside (payments stay PENDING)")
+        parser.add_argument('--json', help="Write the report to this file")
+        parser.add_argument('--compare', help="A previous --json report to show changes against")
+        parser.add_argument('--label', default='', help="Free text stored in the report, e.g. a commit")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        self.rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:8]
+        self.stdout.write(f"Seeding {options['items']} items and {options['users']} users...")
+        try:
+            self._seed(tag, options)
+            report = self._run(mix, options)
+        finally:
+            self._cleanup(tag)
+
+        self._print(report, baseline)
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Report written to {options['json']}")
+
+    # Seeding
+
+    def _seed(self, tag, options):
+        rng = self.rng
+        now = timezone.now()
+        User.objects.bulk_create([User(username=f'load-{tag}-{n}') for n in range(options['users'] + 10)])
+        users = list(User.objects.filter(username__startswith=f'load-{tag}-').order_by('id'))
+        sellers, self.bidders = users[:10], users[10:]
+
+        # Log each bidder in once; every thread's client reuses the session cookie
+        login = Client()
+        self.sessions = {}
+        for user in self.bidders:
+            login.force_login(user)
+            self.sessions[user.id] = login.cookies[settings.SESSION_COOKIE_NAME].value
+            login.cookies.clear()
+
+        def item(n, **fields):
+            price = Decimal(rng.randint(100, 50_000)) / 100
+            return AuctionItem(
+                name=f'Load {tag} item {n}', description='Seeded by manage.py loadtest',
+                starting_price=price, current_price=price, seller=rng.choice(sellers), **fields,
+            )
+
+        catalog = []
+        for n in range(options['items']):
+            is_open = rng.random() < 0.2
+            catalog.append(item(
+                n, auction_type='DUTCH' if n % 5 == 0 and is_open else 'FORWARD', is_active=is_open,
+                end_time=now + timedelta(hours=rng.randint(1, 240)) if is_open
+                else now - timedelta(hours=rng.randint(1, 5000)),
+                dutch_decrease_percentage=5, dutch_decrease_interval=3600,
+            ))
+        # Bidding storms: these close just after the run, so every bid lands in their final moments
+        closing = now + timedelta(seconds=options['duration'] + 60)
+        catalog += [item(f'hot-{n}', auction_type='FORWARD', end_time=closing) for n in range(options['hot'])]
+        catalog += [
+            item(f'dutch-{n}', auction_type='DUTCH', end_time=now + timedelta(days=1),
+                 dutch_decrease_percentage=5, dutch_decrease_interval=60)
+            for n in range(options['dutch'])
+        ]
+        winners = [rng.choice(self.bidders) for _ in range(options['won'])]
+        catalog += [
+            item(f'won-{n}', auction_type='FORWARD', is_active=False, current_bidder=winner,
+                 end_time=now - timedelta(minutes=rng.randint(1, 120)))
+            for n, winner in enumerate(winners)
+        ]
+        AuctionItem.objects.bulk_create(catalog, batch_size=1000)
+
+        seeded = AuctionItem.objects.filter(name__startswith=f'Load {tag} item ')
+        self.open_ids = list(seeded.filter(is_active=True).values_list('id', flat=True))
+        self.hot_ids = list(seeded.filter(name__contains=' item hot-').values_list('id', flat=True))
+        self.dutch_ids = list(seeded.filter(name__contains=' item dutch-').values_list('id', flat=True))
+        self.unpaid = list(seeded.filter(name__contains=' item won-').values_list('id', 'current_bidder_id'))
+        rng.shuffle(self.unpaid)
+        self.lock = threading.Lock()
+        self.seeded = seeded
+
+    def _cleanup(self, tag):
+        Session.objects.filter(session_key__in=getattr(self, 'sessions', {}).values()).delete()
+        # Items, bids and payments go with their sellers and bidders
+        User.objects.filter(username__startswith=f'load-{tag}-').delete()
+
+    # The workload
+
+    def _client(self, user_id=None):
+        client = Client(raise_request_exception=False, HTTP_HOST='localhost')
+        if user_id is not None:
+            client.cookies[settings.SESSION_COOKIE_NAME] = self.sessions[user_id]
+        return client
+
+    def _browse(self, rec, rng, clients):
+        if rng.random() < LEGACY_PAGE_SHARE:
+            page = min(int(rng.expovariate(0.7)) + 1, 20)
+            query = urlencode({'page': page, 'sort': rng.choice(SORTS), 'page_size': BROWSE_PAGE_SIZE})
+            rec.call(clients.anonymous, 'get', f'/items/?{query}', 'GET items/ (page=N)')
+        else:
+            if clients.next_cursor is None or rng.random() >= NEXT_PAGE_SHARE:
+                clients.browse_sort, clients.next_cursor = rng.choice(SORTS), None
+            params = {'sort': clients.browse_sort, 'page_size': BROWSE_PAGE_SIZE}
+            if clients.next_cursor:
+                params['cursor'] = clients.next_cursor
+            response = rec.call(clients.anonymous, 'get', f'/items/?{urlencode(params)}', 'GET items/')
+            ok = response is not None and response.status_code == 200
+            clients.next_cursor = response.json().get('next_cursor') if ok else None
+        if rng.random() < 0.3:
+            rec.call(clients.anonymous, 'get', f'/items/{rng.choice(self.open_ids)}/', 'GET items/<int:item_id>/')
+
+    def _poll(self, rec, rng, clients):
+        # Watchers crowd onto the auctions about to close
+        item_id = rng.choice(self.hot_ids) if rng.random() < 0.5 else rng.choice(self.open_ids)
+        rec.call(clients.anonymous, 'get', f'/items/{item_id}/current-price/',
+                 'GET items/<int:item_id>/current-price/')
+
+    def _bid(self, rec, rng, clients):
+        item_id = rng.choice(self.hot_ids)
+        bidder = rng.choice(self.bidders)
+        client = clients.for_user(bidder.id)
+        response = rec.call(client, 'get', f'/items/{item_id}/current-price/',
+                            'GET items/<int:item_id>/current-price/')
+        if response is None or response.status_code != 200 or response.json()['minimum_bid'] is None:
+            return
+        amount = Decimal(str(response.json()['minimum_bid'])).quantize(CENT, ROUND_UP) + CENT * rng.randint(0, 50)
+        # 400: someone else's bid got in first
+        rec.call(client, 'post', f'/items/{item_id}/bid/', 'POST items/<int:item_id>/bid/',
+                 rejections=(400,), data={'bid_amount': str(amount)}, content_type='application/json')
+
+    def _dutch(self, rec, rng, clients):
+        with self.lock:
+            if not self.dutch_ids:
+                return
+            # Everyone goes for the few still unsold, so buyers collide
+            item_id = rng.choice(self.dutch_ids[:3])
+        client = clients.for_user(rng.choice(self.bidders).id)
+        response = rec.call(client, 'get', f'/items/{item_id}/current-price/',
+                            'GET items/<int:item_id>/current-price/')
+        if response is None or response.status_code != 200:
+            return
+        price = response.json()['current_price']
+        # 400: sold to a faster buyer
+        response = rec.call(client, 'post', f'/items/{item_id}/bid/', 'POST items/<int:item_id>/bid/',
+                            rejections=(400,), data={'bid_amount': str(price)}, content_type='application/json')
+        if response is not None and response.status_code in (200, 400):
+            with self.lock:
+                if item_id in self.dutch_ids:
+                    self.dutch_ids.remove(item_id)
+
+    def _pay(self, rec, rng, clients):
+        with self.lock:
+            if not self.unpaid:
+                return
+            item_id, winner_id = self.unpaid.pop()
+        client = clients.for_user(winner_id)
+        key = uuid.uuid4().hex
+        body = {'expedited_shipping': rng.random() < 0.3, 'card_number': '4532015112830366',
+                'name_on_card': 'Load Test', 'expiration_date': '12/29', 'security_code': '123'}
+        # A share of buyers double-submit, as flaky networks make them; the key replays the first answer
+        for _ in range(2 if rng.random() < 0.1 else 1):
+            rec.call(client, 'post', f'/payments/{item_id}/pay/', 'POST payments/<int:item_id>/pay/',
+                     expected=(202,), data=body, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+        rec.call(client, 'get', f'/payments/{item_id}/status/', 'GET payments/<int:item_id>/status/')
+
+    def _worker(self, rec, mix, seed, deadline):
+        rng = random.Random(seed)
+        names, weights = zip(*mix.items())
+        clients = _Clients(self)
+        try:
+            while time.monotonic() < deadline:
+                scenario = rng.choices(names, weights)[0]
+                rec.scenarios[scenario] += 1
+                getattr(self, f'_{scenario}')(rec, rng, clients)
+        finally:
+            connection.close()
+
+    def _settle(self, stop):
+        try:
+            SettlementWorker().run_forever(stop)
+        finally:
+            connection.close()
+
+    def _run(self, mix, options):
+        if connection.vendor == 'sqlite' and (options['threads'] > 1 or not options['no_settlement']):
+            self.stdout.write(self.style.WARNING(
+                "SQLite takes one writer at a time: concurrent bids and payments will fail with "
+                "'database is locked'. Use MySQL, or --threads 1 --no-settlement."
+            ))
+        recorders = [Recorder() for _ in range(options['threads'])]
+        stop = threading.Event()
+        settlement = None
+        if not options['no_settlement']:
+            settlement = threading.Thread(target=self._settle, args=(stop,), daemon=True)
+            settlement.start()
+
+        # Rejected bids and payments are part of the workload; don't log every one
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        self.stdout.write(f"Running {options['threads']} clients for {options['duration']}s...")
+        start = time.monotonic()
+        deadline = start + options['duration']
+        threads = [
+            threading.Thread(target=self._worker, args=(rec, mix, options['seed'] + n, deadline))
+            for n, rec in enumerate(recorders)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            request_logger.setLevel(level)
+            stop.set()
+            if settlement is not None:
+                settlement.join()
+        elapsed = time.monotonic() - start
+        return self._report(recorders, elapsed, mix, options)
+
+    # Reporting
+
+    def _report(self, recorders, elapsed, mix, options):
+        endpoints = {}
+        names = sorted({name for rec in recorders for name in rec.latencies})
+        for name in names:
+            latencies = [value for rec in recorders for value in rec.latencies[name]]
+            statuses = sum((rec.statuses[name] for rec in recorders), Counter())
+            errors = sum(rec.errors[name] for rec in recorders)
+            rejected = sum(rec.rejected[name] for rec in recorders)
+            endpoints[name] = {
+                **summarize(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "errors": errors,
+                "error_rate": round(errors / len(latencies), 4),
+                "rejected": rejected,
+                "statuses": dict(sorted(statuses.items())),
+            }
+        total = sum(endpoint['count'] for endpoint in endpoints.values())
+        return {
+            "label": options['label'],
+            "started_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "config": {key: options[key] for key in
+                       ('items', 'users', 'hot', 'dutch', 'won', 'threads', 'duration', 'seed', 'no_settlement')},
+            "mix": mix,
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "scenarios": dict(sum((rec.scenarios for rec in recorders), Counter())),
+            "endpoints": endpoints,
+            "checks": self._checks(),
+        }
+
+    def _checks(self):
+        """Invariants the races must not break"""
+        hot = (
+            self.seeded.filter(id__in=self.hot_ids)
+            .annotate(bids_placed=Count('bids'), top_bid=Max('bids__amount'))
+            .values('id', 'current_price', 'starting_price', 'bid_count', 'bids_placed', 'top_bid')
+        )
+        dutch_winners = Bid.objects.filter(item__in=self.seeded.filter(auction_type='DUTCH')) \
+            .values('item').annotate(bids=Count('id'))
+        payments = Payment.objects.filter(auction_item__in=self.seeded)
+        live = payments.exclude(payment_status='FAILED').values('auction_item').annotate(live=Count('id'))
+        return {
+            # Every accepted bid is counted, and the price is the highest of them
+            "forward_prices_consistent": all(
+                row['bid_count'] == row['bids_placed']
+                and row['current_price'] == (row['top_bid'] or row['starting_price'])
+                for row in hot
+            ),
+            "dutch_single_winner": all(row['bids'] == 1 for row in dutch_winners),
+            "one_live_payment_per_item": all(row['live'] == 1 for row in live),
+            "dutch_sold": dutch_winners.count(),
+            "payments": dict(Counter(payments.values_list('payment_status', flat=True))),
+        }
+
+    def _print(self, report, baseline):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']}s ({report['throughput_rps']} req/s) "
+            f"on {report['database']}"
+        )
+        header = f"  {'endpoint':<42} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        if baseline:
+            header += f" {'p95 vs base':>12} {'req/s vs base':>14}"
+        self.stdout.write(header)
+        for name, stats in report['endpoints'].items():
+            line = (
+                f"  {name:<42} {stats['count']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f}"
+                f" {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['error_rate']:>7.2%}"
+            )
+            before = (baseline or {}).get('endpoints', {}).get(name)
+            if before:
+                line += (
+                    f" {_change(stats['p95_ms'], before['p95_ms']):>12}"
+                    f" {_change(stats['throughput_rps'], before['throughput_rps']):>14}"
+                )
+            self.stdout.write(line)
+        checks = report['checks']
+        for check in ('forward_prices_consistent', 'dutch_single_winner', 'one_live_payment_per_item'):
+            self.stdout.write(f"  {check}: {'ok' if checks[check] else 'FAILED'}")
+        self.stdout.write(f"  dutch auctions sold: {checks['dutch_sold']}, payments: {checks['payments']}")
+
+
+class _Clients:
+    """A thread's test clients: one anonymous, one per logged-in user it has acted as"""
+
+    def __init__(self, command):
+        self.command = command
+        self.anonymous = command._client()
+        self._users = {}
+        # Where the anonymous browser is in the catalog
+        self.browse_sort = None
+        self.next_cursor = None
+
+    def for_user(self, user_id):
+        client = self._users.get(user_id)
+        if client is None:
+            client = self._users[user_id] = self.command._client(user_id)
+        return client
+
+
+def _change(new, old):
+    if not old:
+        return '-'
+    return f"{(new / old - 1) * 100:+.1f}%"
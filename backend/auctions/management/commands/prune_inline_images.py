@@ -0,0 +1,61 @@
+import base64
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from auctions import cache as item_cache
+from auctions.blobstore import get_blob_store
+from auctions.models import AuctionItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop the base64 copies migration 0005 left in AuctionItem.images, once each "
+        "blob is verified in the blob store. Run it where the shared blob volume is mounted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100, help="Items per pass")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between chunks")
+
+    def handle(self, *args, **options):
+        store = get_blob_store()
+        last_id = 0
+        pruned = restored = 0
+
+        while True:
+            ids = list(
+                AuctionItem.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            for item_id in ids:
+                with transaction.atomic():
+                    item = AuctionItem.objects.select_for_update().only('id', 'images').filter(id=item_id).first()
+                    if item is None or not any('data' in image for image in item.images):
+                        continue
+                    for image in item.images:
+                        if 'data' not in image:
+                            continue
+                        if not store.verify(image['hash']):
+                            # Lost or damaged (e.g. written to a pod's own disk); store it again
+                            if store.save(base64.b64decode(image['data'])) != image['hash']:
+                                raise CommandError(f"Inline data of item {item_id} does not match {image['hash']}")
+                            if not store.verify(image['hash']):
+                                raise CommandError(f"Blob {image['hash']} of item {item_id} did not read back intact")
+                            restored += 1
+                        del image['data']
+                        pruned += 1
+                    item.save(update_fields=['images'])
+                    item_cache.invalidate_item(item_id)
+
+            self.stdout.write(f"Pruned {pruned} images ({restored} restored), last id {last_id}")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {pruned} inline images pruned, {restored} blobs restored"))
@@ -0,0 +1,32 @@
+import logging
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from auctions.scheduler import ExpiryScheduler
+
+
+class Command(BaseCommand):
+    help = "Run the worker that closes auctions at their end_time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, default=600, help="Seconds of upcoming end times kept in memory")
+        parser.add_argument('--refresh-interval', type=int, default=30, help="Seconds between reloads from the database")
+        parser.add_argument('--once', action='store_true', help="Close everything already due and exit")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO)
+        scheduler = ExpiryScheduler(
+            horizon=timedelta(seconds=options['horizon']),
+            refresh_interval=options['refresh_interval']
+        )
+        if options['once']:
+            closed = scheduler.run_once()
+            self.stdout.write(f"Closed {len(closed)} auctions")
+            return
+
+        self.stdout.write("Auction expiry scheduler running")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
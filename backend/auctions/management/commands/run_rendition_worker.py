@@ -0,0 +1,36 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from auctions.renditions import RenditionWorker
+
+
+class Command(BaseCommand):
+    help = "Run the worker that builds resized renditions of newly uploaded images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Processes rendering images in parallel")
+        parser.add_argument('--poll-interval', type=float, default=10.0, help="Seconds between checks when idle")
+        parser.add_argument('--once', action='store_true', help="Build everything already pending and exit")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO)
+        worker = RenditionWorker(workers=options['workers'], poll_interval=options['poll_interval'])
+        if options['once']:
+            handled = 0
+            try:
+                while True:
+                    batch = worker.run_once()
+                    handled += batch
+                    if batch < worker.batch_size:
+                        break
+            finally:
+                worker.close()
+            self.stdout.write(f"Processed {handled} items")
+            return
+
+        self.stdout.write("Image rendition worker running")
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            pass
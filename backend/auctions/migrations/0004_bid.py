@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0003_alter_auctionitem_dutch_decrease_interval'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionitem',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Bid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('timestamp', models.DateTimeField()),
+                ('bidder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to=settings.AUTH_USER_MODEL)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='auctions.auctionitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', '-timestamp'], name='bid_item_time_idx'), models.Index(fields=['bidder', '-timestamp'], name='bid_bidder_time_idx')],
+            },
+        ),
+    ]
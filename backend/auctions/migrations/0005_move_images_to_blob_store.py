@@ -0,0 +1,88 @@
+import base64
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 100
+
+
+def move_images_to_blob_store(apps, schema_editor):
+    """
+    Store inline base64 images in the blob store and record their digests, a
+    chunk of rows at a time. The base64 stays in each entry: this may run in a
+    pod whose blob root is not the shared volume, so only `manage.py
+    prune_inline_images`, run where the volume is mounted, drops it after
+    checking the stored blob.
+    """
+    from auctions.blobstore import get_blob_store
+
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    store = get_blob_store()
+    last_id = 0
+    while True:
+        ids = list(
+            AuctionItem.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        # Load the heavy column one row at a time to keep memory flat
+        for item_id in ids:
+            images = AuctionItem.objects.filter(id=item_id).values_list('images', flat=True).get()
+            if not any('data' in image and 'hash' not in image for image in images):
+                continue
+            moved = []
+            for idx, image in enumerate(images):
+                if 'data' not in image or 'hash' in image:
+                    moved.append(image)
+                    continue
+                content = base64.b64decode(image['data'])
+                digest = store.save(content)
+                if not store.verify(digest):
+                    raise RuntimeError(f"Blob {digest} for item {item_id} did not read back intact")
+                moved.append({
+                    "hash": digest,
+                    "format": image.get('format', 'jpeg'),
+                    "size": len(content),
+                    "order": image.get('order', idx),
+                    "data": image['data'],
+                })
+            AuctionItem.objects.filter(id=item_id).update(images=moved)
+
+
+def inline_images(apps, schema_editor):
+    """Reverse: put the base64 data back into the rows"""
+    from auctions.blobstore import get_blob_store
+
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    store = get_blob_store()
+    for item_id in AuctionItem.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=CHUNK_SIZE):
+        images = AuctionItem.objects.filter(id=item_id).values_list('images', flat=True).get()
+        if not any('hash' in image for image in images):
+            continue
+        inlined = [
+            {
+                "data": image.get('data') or base64.b64encode(store.read(image['hash'])).decode(),
+                "format": image.get('format', 'jpeg'),
+                "order": image.get('order', idx),
+            } if 'hash' in image else image
+            for idx, image in enumerate(images)
+        ]
+        AuctionItem.objects.filter(id=item_id).update(images=inlined)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_bid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auctionitem',
+            name='images',
+            field=models.JSONField(blank=True, default=list, help_text='List of stored image digests with metadata'),
+        ),
+        migrations.RunPython(move_images_to_blob_store, inline_images),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+
+def fill_thumbnail_keys(apps, schema_editor):
+    """Point existing items at their first original image until renditions are built"""
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    for item_id, images in AuctionItem.objects.exclude(images=[]).values_list('id', 'images').iterator(chunk_size=500):
+        first = images[0]
+        AuctionItem.objects.filter(id=item_id).update(
+            thumbnail_key=f"{first['hash']}.{first.get('format', 'jpeg')}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_move_images_to_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionitem',
+            name='thumbnail_key',
+            field=models.CharField(blank=True, default='', max_length=80),
+        ),
+        migrations.RunPython(fill_thumbnail_keys, migrations.RunPython.noop),
+    ]
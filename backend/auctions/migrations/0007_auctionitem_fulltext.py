@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def add_fulltext_index(apps, schema_editor):
+    """FULLTEXT index used by MySQLFullTextBackend; other databases search in-process"""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX auction_item_fulltext ON auctions_auctionitem (name, description)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX auction_item_fulltext ON auctions_auctionitem')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0006_auctionitem_thumbnail_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0007_auctionitem_fulltext'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auctionitem',
+            index=models.Index(fields=['is_active', 'end_time'], name='item_open_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionitem',
+            index=models.Index(fields=['is_active', 'created_at'], name='item_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionitem',
+            index=models.Index(fields=['is_active', 'current_price'], name='item_open_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionitem',
+            index=models.Index(fields=['auction_type', 'is_active', 'end_time'], name='item_type_open_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionitem',
+            index=models.Index(fields=['end_time'], name='item_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionitem',
+            index=models.Index(fields=['current_bidder', 'end_time'], name='item_winner_end_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0008_auctionitem_workload_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BidParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('last_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_bid_at', models.DateTimeField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='auctions.auctionitem')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bid_participations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_bid_at'], name='participation_user_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'item'), name='participation_user_item_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_paid_items(apps, schema_editor):
+    """Point each item at its completed payment, if it has one"""
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    Payment = apps.get_model('payments', 'Payment')
+    completed = Payment.objects.filter(payment_status='COMPLETED').order_by('paid_at', 'id')
+    for item_id, payment_id in completed.values_list('auction_item_id', 'id').iterator():
+        AuctionItem.objects.filter(id=item_id, payment__isnull=True).update(payment_id=payment_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_bidparticipation'),
+        ('payments', '0002_payment_item_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionitem',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payments.payment'),
+        ),
+        migrations.RunPython(mark_paid_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+CHUNK_SIZE = 500
+
+
+def store_final_dutch_prices(apps, schema_editor):
+    """
+    Dutch auctions closed unsold kept their starting price, since the decayed
+    price was only computed on read; store the price each one ended at.
+    """
+    from auctions.models import dutch_price_at
+
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    unsold = AuctionItem.objects.filter(
+        auction_type='DUTCH', is_active=False, current_bidder__isnull=True, bid_count=0, bid_history=[]
+    )
+    last_id = 0
+    while True:
+        rows = list(
+            unsold.filter(id__gt=last_id).order_by('id').values(
+                'id', 'starting_price', 'created_at', 'end_time',
+                'dutch_decrease_interval', 'dutch_decrease_percentage'
+            )[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        for row in rows:
+            price = dutch_price_at(
+                row['starting_price'], row['created_at'],
+                row['dutch_decrease_interval'], row['dutch_decrease_percentage'], row['end_time']
+            )
+            AuctionItem.objects.filter(id=row['id']).update(current_price=price)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_auctionitem_payment'),
+    ]
+
+    operations = [
+        migrations.RunPython(store_final_dutch_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+CHUNK_SIZE = 500
+
+
+def queue_items_with_images(apps, schema_editor):
+    """
+    Renditions used to be queued in web worker memory; flag every item with
+    images so the worker builds whatever was lost (done items are just unflagged).
+    """
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    last_id = 0
+    while True:
+        ids = list(
+            AuctionItem.objects.filter(id__gt=last_id)
+            .exclude(images=[])
+            .order_by('id')
+            .values_list('id', flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        AuctionItem.objects.filter(id__in=ids).update(renditions_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_dutch_final_prices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionitem',
+            name='renditions_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(queue_items_with_images, migrations.RunPython.noop),
+    ]
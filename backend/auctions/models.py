@@ -1,5 +1,55 @@
+import math
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+# Lowest price a Dutch auction can decay to
+DUTCH_PRICE_FLOOR = Decimal('0.01')
+
+
+def dutch_price_at(starting_price, started_at, interval, percentage, now):
+    """
+    Dutch price after every full interval since started_at has taken
+    `percentage` off: starting_price * (1 - percentage/100) ** intervals,
+    rounded to cents and clamped to DUTCH_PRICE_FLOOR.
+    """
+    if not interval or not percentage or percentage <= 0:
+        return starting_price
+    intervals = int((now - started_at).total_seconds() // interval)
+    if intervals <= 0:
+        return starting_price
+    if percentage >= 100 or starting_price <= DUTCH_PRICE_FLOOR:
+        return DUTCH_PRICE_FLOOR
+
+    factor = (Decimal(100) - percentage) / Decimal(100)
+    # Past the point where the price hits the floor extra intervals change
+    # nothing, so cap the exponent; this bounds the Decimal ** cost for
+    # auctions that have been running for a very long time
+    steps_to_floor = math.ceil(
+        math.log(float(DUTCH_PRICE_FLOOR / starting_price)) / math.log(float(factor))
+    ) + 1
+    price = starting_price * factor ** min(intervals, steps_to_floor)
+    return max(price.quantize(DUTCH_PRICE_FLOOR), DUTCH_PRICE_FLOOR)
+
+
+def row_price_at(row, now):
+    """
+    AuctionItem.price_at for a .values() row with the price, type, state and
+    Dutch fields. An unsold Dutch auction decays until its end_time; anything
+    else is worth its stored current_price.
+    """
+    if row['auction_type'] == 'DUTCH' and row['is_active']:
+        return dutch_price_at(
+            row['starting_price'], row['created_at'],
+            row['dutch_decrease_interval'], row['dutch_decrease_percentage'],
+            min(now, row['end_time'])
+        )
+    return row['current_price']
+
 
 class AuctionItem(models.Model):
     AUCTION_TYPES = [
@@ -24,7 +74,20 @@ class AuctionItem(models.Model):
         blank=True,
         related_name='items_bidding_on'
     )
+    # Legacy JSON bid log, superseded by the Bid table. No longer written;
+    # kept until every row has been moved over by `manage.py backfill_bids`.
     bid_history = models.JSONField(default=list, blank=True)
+    bid_count = models.PositiveIntegerField(default=0)
+
+    # The completed payment, set by process_payment, so won-item pages can
+    # tell paid from unpaid without a Payment lookup per item
+    payment = models.ForeignKey(
+        'payments.Payment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
 
     # DUTCH auction fields
     dutch_decrease_percentage = models.DecimalField(
@@ -54,19 +117,145 @@ class AuctionItem(models.Model):
         help_text="Additional cost for expedited shipping cost"
     )
 
-    # NEW: Images stored as base64 in JSON
-    # Structure: [{"data": "base64string", "format": "jpeg", "order": 0}, ...]
+    # Image bytes live in the blob store (auctions/blobstore.py); only metadata here
+    # Structure: [{"hash": "<sha256>", "format": "jpeg", "size": 12345, "order": 0}, ...]
     images = models.JSONField(
         default=list,
         blank=True,
-        help_text="List of base64-encoded images with metadata"
+        help_text="List of stored image digests with metadata"
     )
+    # "<digest>.<ext>" of the small rendition of the first image (or the image
+    # itself until renditions are built), so listings never need `images`
+    thumbnail_key = models.CharField(max_length=80, blank=True, default='')
+    # Images still waiting for the rendition worker (auctions/renditions.py)
+    renditions_pending = models.BooleanField(default=False, db_index=True)
+
+    class Meta:
+        # Shaped after the endpoint queries; auctions/tests.py fails if one of them full-scans
+        indexes = [
+            # list_items with status=active, per sort; also the expiry scheduler
+            models.Index(fields=['is_active', 'end_time'], name='item_open_end_idx'),
+            models.Index(fields=['is_active', 'created_at'], name='item_open_created_idx'),
+            models.Index(fields=['is_active', 'current_price'], name='item_open_price_idx'),
+            models.Index(fields=['auction_type', 'is_active', 'end_time'], name='item_type_open_end_idx'),
+            # list_items for all/ended items
+            models.Index(fields=['end_time'], name='item_end_idx'),
+            # get_my_won_items
+            models.Index(fields=['current_bidder', 'end_time'], name='item_winner_end_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def is_open_at(self, now):
+        """Whether bidding is open at `now`, whether or not the scheduler has closed it yet"""
+        return self.is_active and now < self.end_time
+
+    @property
+    def is_open(self):
+        return self.is_open_at(timezone.now())
+
+    def price_at(self, now):
+        """
+        Price at `now`. Unsold Dutch auctions are priced on read, up to their
+        end_time; the scheduler only copies that price into current_price so
+        price sorts and filters stay close (auctions/scheduler.py).
+        """
+        if self.auction_type == 'DUTCH' and self.is_active:
+            return dutch_price_at(
+                self.starting_price,
+                self.created_at,
+                self.dutch_decrease_interval,
+                self.dutch_decrease_percentage,
+                min(now, self.end_time)
+            )
+        return self.current_price
+
+    @property
+    def live_price(self):
+        return self.price_at(timezone.now())
+
+    @property
+    def has_bids(self):
+        """True once anyone has bid (legacy JSON covers rows not yet backfilled)"""
+        return self.bid_count > 0 or bool(self.bid_history)
+
+    @property
+    def paid(self):
+        return self.payment_id is not None
+
+    def compute_thumbnail_key(self):
+        """thumbnail_key for the current first image"""
+        if not self.images:
+            return ''
+        first = self.images[0]
+        image = first.get('renditions', {}).get('thumb', first)
+        return f"{image['hash']}.{image.get('format', 'jpeg')}"
+
     def get_thumbnail_url(self):
-        """Returns the first image (thumbnail) or None"""
-        if self.images and len(self.images) > 0:
-            return f"data:image/{self.images[0].get('format', 'jpeg')};base64,{self.images[0]['data']}"
-        return None
\ No newline at end of file
+        """Returns the URL of the first image's thumbnail or None"""
+        if self.thumbnail_key:
+            return f"{settings.AUCTION_IMAGE_URL}{self.thumbnail_key}"
+        return None
+
+
+class Bid(models.Model):
+    """A single bid placed on an auction item"""
+    item = models.ForeignKey(AuctionItem, on_delete=models.CASCADE, related_name='bids')
+    bidder = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bids')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', '-timestamp'], name='bid_item_time_idx'),
+            models.Index(fields=['bidder', '-timestamp'], name='bid_bidder_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bidder.username} - {self.amount} on {self.item_id}"
+
+    def as_history_entry(self):
+        """Same shape as the entries of the legacy bid_history JSON"""
+        return {
+            "username": self.bidder.username,
+            "amount": float(self.amount),
+            "timestamp": self.timestamp.isoformat()
+        }
+
+
+class BidParticipation(models.Model):
+    """
+    One row per (user, item) the user has bid on, with their latest bid.
+    Maintained by place_bid in the bid's transaction; backs get_user_bids.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bid_participations')
+    item = models.ForeignKey(AuctionItem, on_delete=models.CASCADE, related_name='participations')
+    bid_count = models.PositiveIntegerField(default=0)
+    last_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    last_bid_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'item'], name='participation_user_item_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_bid_at'], name='participation_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.item_id}"
+
+    @classmethod
+    def record(cls, user, item, amount, at):
+        """
+        Count a bid. Callers hold the item's row lock, so two bids by the same
+        user on the same item can't both take the create branch.
+        """
+        updated = cls.objects.filter(user=user, item=item).update(
+            bid_count=models.F('bid_count') + 1,
+            last_amount=amount,
+            last_bid_at=at
+        )
+        if not updated:
+            cls.objects.create(user=user, item=item, bid_count=1, last_amount=amount, last_bid_at=at)
@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination for item listings.
+
+Instead of OFFSET, a cursor remembers the sort value and id of the last row
+on a page and the next page starts strictly after it, so every page costs
+the same no matter how deep. The id breaks ties between equal sort values.
+Cursors are opaque base64 JSON tied to the ordering they were issued for.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateTimeField, DecimalField, Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ordering, value, item_id):
+    payload = json.dumps({"o": ordering, "v": str(value), "id": item_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering, field):
+    """(value, id) from a cursor issued for `ordering`"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if data["o"] != ordering:
+            raise InvalidCursor("Cursor was issued for a different sort")
+        if isinstance(field, DateTimeField):
+            value = datetime.fromisoformat(data["v"])
+        elif isinstance(field, DecimalField):
+            value = Decimal(data["v"])
+        else:
+            value = data["v"]
+        return value, int(data["id"])
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError, ArithmeticError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def keyset_page(qs, ordering, page_size, cursor=None):
+    """
+    One page of qs ordered by `ordering` ("field" or "-field") plus id.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    name = ordering.lstrip('-')
+    descending = ordering.startswith('-')
+    qs = qs.order_by(ordering, '-id' if descending else 'id')
+
+    if cursor:
+        if name in qs.query.annotations:
+            field = qs.query.annotations[name].output_field
+        else:
+            field = qs.model._meta.get_field(name)
+        value, last_id = decode_cursor(cursor, ordering, field)
+        op = 'lt' if descending else 'gt'
+        # Same rows as `field > v OR (field = v AND id > last)`, but the leading
+        # range on the sort field lets the planner drive the query from its index
+        qs = qs.filter(
+            Q(**{f'{name}__{op}e': value}),
+            Q(**{f'{name}__{op}': value}) | Q(**{f'id__{op}': last_id}),
+        )
+
+    rows = list(qs[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    # Works on model instances and on .values() rows
+    if isinstance(last, dict):
+        return rows, encode_cursor(ordering, last[name], last['id'])
+    return rows, encode_cursor(ordering, getattr(last, name), last.id)
+
+
+def cached_count(qs, filters):
+    """
+    Total for a filter combination, cached for AUCTION_LIST_COUNT_TTL seconds.
+    Approximate by design: it can lag inserts and expiries by up to the TTL.
+    """
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = f'auctions:list-count:{digest}'
+    total = cache.get(key)
+    if total is None:
+        total = qs.count()
+        cache.set(key, total, settings.AUCTION_LIST_COUNT_TTL)
+    return total
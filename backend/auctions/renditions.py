@@ -0,0 +1,163 @@
+"""
+Resized image renditions, built off the request path.
+
+create_item flags a new item renditions_pending and pokes the rendition
+worker (`manage.py run_rendition_worker`) over the event broker once the
+transaction commits. The worker hands the decode/resize/encode work to its
+own process pool, stores each rendition in the blob store and records it in
+the image metadata:
+
+    {"hash": ..., "format": "png", "order": 0,
+     "renditions": {"thumb": {"hash": ..., "format": "webp", "width": 240, "height": 180}, ...}}
+
+The queue is the flag in the database, so nothing is lost when a pod
+restarts, and web workers never fork. The worker also polls, in case a poke
+is missed. Until an item's renditions exist, the API keeps serving the
+original images. `manage.py build_renditions` runs the same pipeline for
+existing items.
+"""
+
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import cache as item_cache
+from .blobstore import get_blob_store
+from .events import get_broker
+from .models import AuctionItem
+
+logger = logging.getLogger(__name__)
+
+# Name -> longest edge in pixels. Images are never scaled up.
+RENDITION_SIZES = {
+    'thumb': 240,
+    'medium': 800,
+    'full': 1600,
+}
+RENDITION_FORMAT = 'webp'
+RENDITION_QUALITY = 80
+
+RENDITION_QUEUE = 'image-renditions'
+
+
+def render(content):
+    """Decode one image and encode every rendition; runs in a pool process"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(content)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        results = {}
+        for name, edge in RENDITION_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, RENDITION_FORMAT, quality=RENDITION_QUALITY, method=4)
+            results[name] = {"content": out.getvalue(), "width": resized.width, "height": resized.height}
+        return results
+
+
+def build_for_item(item_id, pool=None):
+    """
+    Render every image of an item that has no renditions yet and clear its
+    renditions_pending flag; returns how many were built. Renders in this
+    process unless given a pool.
+    """
+    store = get_blob_store()
+    images = AuctionItem.objects.filter(id=item_id).values_list('images', flat=True).first()
+    pending = [idx for idx, image in enumerate(images or []) if 'renditions' not in image]
+    if not pending:
+        AuctionItem.objects.filter(id=item_id).update(renditions_pending=False)
+        return 0
+    results = (pool.map if pool else map)(render, [store.read(images[idx]['hash']) for idx in pending])
+
+    built = {}
+    for idx, renditions in zip(pending, results):
+        built[images[idx]['hash']] = {
+            name: {
+                "hash": store.save(r['content']),
+                "format": RENDITION_FORMAT,
+                "width": r['width'],
+                "height": r['height'],
+            }
+            for name, r in renditions.items()
+        }
+
+    # Re-read under a lock and merge, so a concurrent edit (e.g. a reorder) isn't lost
+    with transaction.atomic():
+        item = AuctionItem.objects.select_for_update().only('id', 'images', 'thumbnail_key', 'renditions_pending').get(id=item_id)
+        for image in item.images:
+            if image['hash'] in built:
+                image['renditions'] = built[image['hash']]
+        item.thumbnail_key = item.compute_thumbnail_key()
+        item.renditions_pending = False
+        item.save(update_fields=['images', 'thumbnail_key', 'renditions_pending'])
+        item_cache.invalidate_item(item_id)
+    return len(built)
+
+
+def schedule(item_id):
+    """Wake the rendition worker for a renditions_pending item once the current transaction commits"""
+    def poke():
+        try:
+            get_broker().publish(RENDITION_QUEUE, {"item_id": item_id})
+        except Exception:
+            # The worker polls as well
+            logger.exception("Could not announce renditions for item %s", item_id)
+    transaction.on_commit(poke)
+
+
+class RenditionWorker:
+    def __init__(self, workers=None, batch_size=20, poll_interval=10.0):
+        self.workers = workers or settings.AUCTION_RENDITION_WORKERS
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+
+    def run_once(self):
+        """Build renditions for up to batch_size pending items, oldest first; returns how many were handled"""
+        ids = list(
+            AuctionItem.objects.filter(renditions_pending=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:self.batch_size]
+        )
+        for item_id in ids:
+            try:
+                build_for_item(item_id, pool=self._pool)
+            except AuctionItem.DoesNotExist:
+                pass  # deleted before we got to it
+            except Exception:
+                # Don't retry forever on an image that can't be decoded; the
+                # item keeps its originals and build_renditions can try again
+                logger.exception("Building renditions for item %s failed", item_id)
+                AuctionItem.objects.filter(id=item_id).update(renditions_pending=False)
+        return len(ids)
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        wake = threading.Event()
+        unsubscribe = get_broker().subscribe(RENDITION_QUEUE, lambda message: wake.set())
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                wake.clear()
+                try:
+                    handled = self.run_once()
+                except Exception:
+                    logger.exception("Rendition round failed")
+                    stop_event.wait(1)
+                    continue
+                if handled < self.batch_size:
+                    wake.wait(self.poll_interval)
+        finally:
+            unsubscribe()
+            self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
@@ -0,0 +1,143 @@
+"""
+Closes auctions exactly when they end.
+
+Read paths derive an auction's state from end_time (AuctionItem.is_open_at),
+so nothing on the request path has to write is_active. This scheduler keeps
+the stored flag in step: it holds a min-heap of upcoming end times, loaded
+from the database a window at a time, and flips is_active for each item as
+its end_time passes.
+
+It does the same for Dutch prices, which reads compute from the decay
+schedule. Every refresh copies the current price of each running Dutch
+auction into current_price, so price sorts and min/max_price filters are at
+most refresh_interval behind. Closing an unsold Dutch auction stores the
+price it ended at.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .cache import invalidate_item
+from .events import publish_item_update
+from .models import AuctionItem, dutch_price_at
+
+logger = logging.getLogger(__name__)
+
+DUTCH_FIELDS = ('id', 'starting_price', 'created_at', 'dutch_decrease_interval', 'dutch_decrease_percentage')
+
+
+class ExpiryScheduler:
+    def __init__(self, horizon=timedelta(minutes=10), refresh_interval=30, batch_size=500):
+        # Only auctions ending within `horizon` are kept in memory; the heap is
+        # reloaded every `refresh_interval` seconds to pick up new and edited items
+        self.horizon = horizon
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self._heap = []
+        self._next_refresh = None
+
+    def refresh(self, now):
+        """Reload the heap with every active auction ending before now + horizon"""
+        upcoming = AuctionItem.objects.filter(
+            is_active=True,
+            end_time__lte=now + self.horizon
+        ).values_list('end_time', 'id')
+        self._heap = list(upcoming)
+        heapq.heapify(self._heap)
+        self.reprice_dutch(now)
+        self._next_refresh = now + timedelta(seconds=self.refresh_interval)
+
+    def reprice_dutch(self, now):
+        """Store the current price of every running Dutch auction; returns how many changed"""
+        running = AuctionItem.objects.filter(auction_type='DUTCH', is_active=True, end_time__gt=now)
+        changed = 0
+        last_id = 0
+        while True:
+            rows = list(
+                running.filter(id__gt=last_id).order_by('id').values(*DUTCH_FIELDS, 'current_price')[:self.batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            with transaction.atomic():
+                for row in rows:
+                    price = _dutch_price(row, now)
+                    # is_active=True: a bid that sold the item since the read wins
+                    if price != row['current_price']:
+                        changed += AuctionItem.objects.filter(id=row['id'], is_active=True).update(current_price=price)
+        return changed
+
+    def close_due(self, now):
+        """Close every auction in the heap whose end_time has passed; returns the closed ids"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+
+        closed = []
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            # end_time may have moved since the heap was loaded, so re-check it
+            rows = list(AuctionItem.objects.filter(
+                id__in=batch,
+                is_active=True,
+                end_time__lte=now
+            ).values(*DUTCH_FIELDS, 'auction_type', 'end_time'))
+            ids = [row['id'] for row in rows]
+            if ids:
+                with transaction.atomic():
+                    forward = [row['id'] for row in rows if row['auction_type'] != 'DUTCH']
+                    AuctionItem.objects.filter(id__in=forward, is_active=True).update(is_active=False)
+                    for row in rows:
+                        update = {"item_id": row['id'], "is_active": False}
+                        if row['auction_type'] == 'DUTCH':
+                            # Unless a bid sold it meanwhile, it ended unsold at this price
+                            price = _dutch_price(row, row['end_time'])
+                            if AuctionItem.objects.filter(id=row['id'], is_active=True).update(
+                                is_active=False, current_price=price
+                            ):
+                                update["current_price"] = str(price)
+                        invalidate_item(row['id'])
+                        publish_item_update(update)
+                closed.extend(ids)
+        if closed:
+            logger.info("Closed %d auctions: %s", len(closed), closed)
+        return closed
+
+    def seconds_until_next(self, now):
+        """How long the loop can sleep before something needs doing"""
+        wake = self._next_refresh
+        if self._heap and self._heap[0][0] < wake:
+            wake = self._heap[0][0]
+        return max((wake - now).total_seconds(), 0)
+
+    def run_once(self):
+        now = timezone.now()
+        if self._next_refresh is None or now >= self._next_refresh:
+            self.refresh(now)
+        return self.close_due(now)
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Auction expiry pass failed")
+                # Force a fresh load from the database on the next pass
+                self._next_refresh = None
+                stop_event.wait(1)
+                continue
+            stop_event.wait(self.seconds_until_next(timezone.now()))
+
+
+def _dutch_price(row, now):
+    return dutch_price_at(
+        row['starting_price'], row['created_at'],
+        row['dutch_decrease_interval'], row['dutch_decrease_percentage'], now
+    )
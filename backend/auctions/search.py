@@ -0,0 +1,293 @@
+"""
+Keyword search for auction items.
+
+search_items asks a backend for the ids of the items matching a keyword,
+ranked by relevance, already filtered and paginated:
+
+- MySQLFullTextBackend uses the FULLTEXT index on (name, description)
+  (migration 0007) with MATCH ... AGAINST in natural language mode, so
+  filtering, ranking and pagination all happen in SQL.
+- InvertedIndexBackend is an in-process BM25 inverted index for databases
+  without full-text search (SQLite in tests and local dev). It is built from
+  the table on first use, kept current through model signals (a save that
+  leaves name and description alone, like a bid, only updates the item's
+  filter fields), and rebuilt
+  after AUCTION_SEARCH_INDEX_TTL seconds to pick up bulk writes that bypass
+  signals. Each process has its own copy.
+
+InnoDB leaves words shorter than innodb_ft_min_token_size and stopwords out
+of the index, so a query made only of those ("tv", "the", "4") falls back to
+a substring scan. Both backends apply the same rule, so a short query returns
+the same items whatever the database.
+
+The backend is picked from the database vendor unless settings.AUCTION_SEARCH_BACKEND names one.
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+
+from .models import AuctionItem
+
+TOKEN_RE = re.compile(r'\w{2,}')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def filter_items(qs, now, auction_type=None, status=None, min_price=None, max_price=None):
+    """Apply the listing filters shared by search backends"""
+    if status == 'active':
+        qs = qs.filter(is_active=True, end_time__gt=now)
+    elif status == 'ended':
+        qs = qs.filter(Q(is_active=False) | Q(end_time__lte=now))
+    if auction_type:
+        qs = qs.filter(auction_type=auction_type)
+    if min_price is not None:
+        qs = qs.filter(current_price__gte=min_price)
+    if max_price is not None:
+        qs = qs.filter(current_price__lte=max_price)
+    return qs
+
+
+class BaseSearchBackend:
+    MIN_TOKEN_SIZE = 3  # InnoDB's innodb_ft_min_token_size default
+    # InnoDB's default stopword list (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD)
+    STOPWORDS = frozenset((
+        'a about an are as at be by com de en for from how i in is it la of on or '
+        'that the this to was what when where who will with und www'
+    ).split())
+
+    def search(self, keyword, now, offset, limit, sort=None, **filters):
+        """
+        Returns (total matches, ids for the requested slice). Results are
+        ranked by relevance unless `sort` names an order_by() field.
+        """
+        raise NotImplementedError
+
+    def indexed_terms(self, keyword):
+        """The words of a query the FULLTEXT index can match on"""
+        return [
+            token for token in tokenize(keyword)
+            if len(token) >= self.MIN_TOKEN_SIZE and token not in self.STOPWORDS
+        ]
+
+    def _search_substrings(self, qs, keyword, offset, limit, sort):
+        """Items whose name or description contains every word of the query (or the query itself)"""
+        for word in tokenize(keyword) or [keyword]:
+            qs = qs.filter(Q(name__icontains=word) | Q(description__icontains=word))
+        total = qs.count()
+        qs = qs.order_by(sort, '-id') if sort else qs.order_by('-created_at', '-id')
+        return total, list(qs.values_list('id', flat=True)[offset:offset + limit])
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    def search(self, keyword, now, offset, limit, sort=None, **filters):
+        qs = filter_items(AuctionItem.objects.all(), now, **filters)
+        if not self.indexed_terms(keyword):
+            return self._search_substrings(qs, keyword, offset, limit, sort)
+
+        table = connection.ops.quote_name(AuctionItem._meta.db_table)
+        match = f"MATCH({table}.`name`, {table}.`description`) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+        qs = qs.filter(RawSQL(match, [keyword], output_field=BooleanField()))
+        total = qs.count()
+        if sort:
+            qs = qs.order_by(sort, '-id')
+        else:
+            qs = qs.annotate(relevance=RawSQL(match, [keyword], output_field=FloatField()))
+            qs = qs.order_by('-relevance', '-created_at')
+        return total, list(qs.values_list('id', flat=True)[offset:offset + limit])
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    K1 = 1.2
+    B = 0.75
+    NAME_WEIGHT = 2  # name tokens count this many times towards term frequency
+    TEXT_FIELDS = ('name', 'description')
+    FILTER_FIELDS = ('auction_type', 'is_active', 'end_time', 'current_price', 'created_at')
+    INDEXED_FIELDS = TEXT_FIELDS + FILTER_FIELDS
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        post_save.connect(self._on_save, sender=AuctionItem, dispatch_uid='auction-search-index-save')
+        post_delete.connect(self._on_delete, sender=AuctionItem, dispatch_uid='auction-search-index-delete')
+
+    # -- index maintenance --
+
+    def _reset(self):
+        self._postings = {}            # token -> array of doc numbers (repeated per occurrence)
+        self._doc_of = {}              # item id -> current doc number
+        self._ids = array('q')         # doc number -> item id
+        self._lengths = array('I')
+        self._norms = array('d')       # BM25 length normalisation, against the average at build time
+        self._avg_length = 1.0
+        self._alive = bytearray()
+        self._types = bytearray()      # 1 = DUTCH
+        self._active = bytearray()
+        self._end = array('d')
+        self._price = array('d')
+        self._created = array('d')
+        self._text_hashes = array('q')  # hash of (name, description), to spot saves that change no text
+        self._total_length = 0
+        self._live_docs = 0
+
+    def _add(self, item_id, name, description, auction_type, is_active, end_time, current_price, created_at):
+        doc = len(self._ids)
+        tokens = tokenize(name) * self.NAME_WEIGHT + tokenize(description)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = array('I')
+            postings.append(doc)
+        self._ids.append(item_id)
+        self._lengths.append(len(tokens))
+        self._norms.append(self.K1 * (1 - self.B + self.B * len(tokens) / self._avg_length))
+        self._alive.append(1)
+        self._types.append(0)
+        self._active.append(0)
+        self._end.append(0.0)
+        self._price.append(0.0)
+        self._created.append(0.0)
+        self._text_hashes.append(hash((name, description)))
+        self._set_fields(doc, auction_type, is_active, end_time, current_price, created_at)
+        self._doc_of[item_id] = doc
+        self._total_length += len(tokens)
+        self._live_docs += 1
+
+    def _set_fields(self, doc, auction_type, is_active, end_time, current_price, created_at):
+        """Store the non-text fields searches filter and sort on"""
+        self._types[doc] = auction_type == 'DUTCH'
+        self._active[doc] = bool(is_active)
+        self._end[doc] = end_time.timestamp()
+        self._price[doc] = float(current_price)
+        self._created[doc] = created_at.timestamp()
+
+    def _remove(self, item_id):
+        doc = self._doc_of.pop(item_id, None)
+        if doc is not None:
+            self._alive[doc] = 0
+            self._total_length -= self._lengths[doc]
+            self._live_docs -= 1
+
+    def rebuild(self):
+        with self._lock:
+            self._reset()
+            rows = AuctionItem.objects.order_by().values_list('id', *self.INDEXED_FIELDS)
+            for row in rows.iterator(chunk_size=5000):
+                self._add(*row)
+            if self._live_docs:
+                self._avg_length = self._total_length / self._live_docs or 1.0
+                self._norms = array('d', (
+                    self.K1 * (1 - self.B + self.B * length / self._avg_length) for length in self._lengths
+                ))
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if self._built_at is None or time.monotonic() - self._built_at > settings.AUCTION_SEARCH_INDEX_TTL:
+            self.rebuild()
+
+    def _on_save(self, sender, instance, update_fields=None, **kwargs):
+        if self._built_at is None:
+            return
+        if update_fields is not None and not set(update_fields) & set(self.INDEXED_FIELDS):
+            return
+        if update_fields is not None and not set(update_fields) & set(self.TEXT_FIELDS):
+            # A bid or a close: the text is unchanged, so skip the query and the re-tokenizing
+            with self._lock:
+                doc = self._doc_of.get(instance.id)
+                if doc is not None:
+                    self._set_fields(doc, *(getattr(instance, field) for field in self.FILTER_FIELDS))
+            return
+        # Re-read the row: the saved instance may have deferred fields
+        row = AuctionItem.objects.filter(id=instance.id).values_list('id', *self.INDEXED_FIELDS).first()
+        with self._lock:
+            doc = self._doc_of.get(instance.id)
+            if row and doc is not None and self._text_hashes[doc] == hash(row[1:3]):
+                self._set_fields(doc, *row[3:])
+                return
+            self._remove(instance.id)
+            if row:
+                self._add(*row)
+
+    def _on_delete(self, sender, instance, **kwargs):
+        if self._built_at is not None:
+            with self._lock:
+                self._remove(instance.id)
+
+    # -- querying --
+
+    def search(self, keyword, now, offset, limit, sort=None, **filters):
+        if not self.indexed_terms(keyword):
+            # As on MySQL, so the same short query finds the same items
+            qs = filter_items(AuctionItem.objects.all(), now, **filters)
+            return self._search_substrings(qs, keyword, offset, limit, sort)
+        with self._lock:
+            self._ensure_built()
+            scores = self._score(set(tokenize(keyword)))
+            docs = self._filter(list(scores), now.timestamp(), **filters)
+            top = heapq.nsmallest(offset + limit, docs, key=self._sort_key(sort, scores))
+            return len(docs), [self._ids[doc] for doc in top[offset:]]
+
+    def _score(self, tokens):
+        """BM25 score per live doc containing any of the tokens"""
+        scores = {}
+        alive, norms = self._alive, self._norms
+        for token in tokens:
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            counts = Counter(postings)
+            idf = math.log(1 + (self._live_docs - len(counts) + 0.5) / (len(counts) + 0.5))
+            weight = idf * (self.K1 + 1)
+            for doc, tf in counts.items():
+                if alive[doc]:
+                    scores[doc] = scores.get(doc, 0.0) + weight * tf / (tf + norms[doc])
+        return scores
+
+    def _filter(self, docs, now, auction_type=None, status=None, min_price=None, max_price=None):
+        active, end, price = self._active, self._end, self._price
+        if status == 'active':
+            docs = [doc for doc in docs if active[doc] and end[doc] > now]
+        elif status == 'ended':
+            docs = [doc for doc in docs if not active[doc] or end[doc] <= now]
+        if auction_type:
+            dutch = auction_type == 'DUTCH'
+            docs = [doc for doc in docs if self._types[doc] == dutch]
+        if min_price is not None:
+            docs = [doc for doc in docs if price[doc] >= float(min_price)]
+        if max_price is not None:
+            docs = [doc for doc in docs if price[doc] <= float(max_price)]
+        return docs
+
+    def _sort_key(self, sort, scores):
+        keys = {
+            'end_time': lambda doc: (self._end[doc], -self._ids[doc]),
+            '-end_time': lambda doc: (-self._end[doc], -self._ids[doc]),
+            '-created_at': lambda doc: (-self._created[doc], -self._ids[doc]),
+            'current_price': lambda doc: (self._price[doc], -self._ids[doc]),
+            '-current_price': lambda doc: (-self._price[doc], -self._ids[doc]),
+        }
+        return keys.get(sort, lambda doc: (-scores[doc], -self._created[doc]))
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    if settings.AUCTION_SEARCH_BACKEND:
+        return import_string(settings.AUCTION_SEARCH_BACKEND)()
+    if connection.vendor == 'mysql':
+        return MySQLFullTextBackend()
+    return InvertedIndexBackend()
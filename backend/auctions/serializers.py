@@ -1,25 +1,47 @@
 from rest_framework import serializers
-from .models import AuctionItem
+from . import renditions
+from .blobstore import get_blob_store, image_url
+from .models import AuctionItem, Bid, row_price_at
+from .uploads import ALLOWED_FORMATS, MAX_IMAGE_BYTES, MAX_IMAGES, InvalidImage, probe, run_checks, too_many_pixels
+from django.conf import settings
+from django.db.models import Prefetch
 from django.utils import timezone
 from decimal import Decimal
 import base64
-import imghdr
+import io
+
+# bid_history is derived from the Bid table and capped to the latest bids
+BID_HISTORY_LIMIT = 50
+
+
+def recent_bids_prefetch():
+    """Prefetch the bids shown in bid_history for many items in one query"""
+    return Prefetch(
+        'bids',
+        queryset=Bid.objects.select_related('bidder').order_by('-timestamp', '-id')[:BID_HISTORY_LIMIT],
+        to_attr='recent_bids'
+    )
+
 
 class AuctionItemSerializer(serializers.ModelSerializer):
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, source='live_price', read_only=True)
     remaining_time = serializers.SerializerMethodField()
+    is_active = serializers.BooleanField(source='is_open', read_only=True)
     current_bidder_username = serializers.SerializerMethodField()
     seller_username = serializers.CharField(source='seller.username', read_only=True)
     minimum_bid = serializers.SerializerMethodField()
     auction_status = serializers.SerializerMethodField()
     winner_info = serializers.SerializerMethodField()
     thumbnail = serializers.SerializerMethodField()
+    bid_history = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = AuctionItem
         fields = [
             'id', 'name', 'description', 'starting_price', 'current_price',
             'auction_type', 'remaining_time', 'is_active', 'seller_username',
-            'current_bidder_username', 'bid_history', 'minimum_bid', 'end_time',
+            'current_bidder_username', 'bid_history', 'bid_count', 'minimum_bid', 'end_time',
             'auction_status', 'winner_info', 'thumbnail', 'images', 'created_at'
         ]
 
@@ -41,7 +63,7 @@ class AuctionItemSerializer(serializers.ModelSerializer):
 
     def get_minimum_bid(self, obj):
         """Calculate minimum bid (current_price + 5%)"""
-        if obj.auction_type == 'FORWARD' and obj.is_active:
+        if obj.auction_type == 'FORWARD' and obj.is_open:
             return float(obj.current_price * Decimal('1.05'))
         return None
 
@@ -69,10 +91,195 @@ class AuctionItemSerializer(serializers.ModelSerializer):
             }
         return None
 
+    def get_bid_history(self, obj):
+        """
+        Latest bids in chronological order (oldest first), capped at BID_HISTORY_LIMIT.
+        Items `manage.py backfill_bids` hasn't reached yet still keep their older
+        bids in the legacy JSON, so those go first.
+        """
+        bids = getattr(obj, 'recent_bids', None)
+        if bids is None:
+            bids = obj.bids.select_related('bidder').order_by('-timestamp', '-id')[:BID_HISTORY_LIMIT]
+        history = [bid.as_history_entry() for bid in reversed(list(bids))]
+        room = BID_HISTORY_LIMIT - len(history)
+        if room > 0 and obj.bid_history:
+            history = obj.bid_history[-room:] + history
+        return history
+
     def get_thumbnail(self, obj):
-        """Return the first image as thumbnail (base64 data URI)"""
+        """Return the URL of the first image as thumbnail"""
         return obj.get_thumbnail_url()
 
+    def get_images(self, obj):
+        """Original image URLs, plus resized renditions once they have been built"""
+        return [
+            {
+                "url": image_url(image),
+                "format": image.get('format', 'jpeg'),
+                "order": image.get('order', idx),
+                "renditions": {
+                    name: image_url(rendition)
+                    for name, rendition in image.get('renditions', {}).items()
+                }
+            }
+            for idx, image in enumerate(obj.images)
+        ]
+
+
+# Reference implementation of the listing payload. Views render listings with
+# serialize_list_rows() below; this serializer (fetched with these columns
+# deferred) defines what that must produce. CompiledListSerializerTests holds
+# the two to the same output and the bench_* commands time one against the
+# other, so a change to the listing payload goes into both.
+LIST_DEFERRED_FIELDS = ('images', 'bid_history')
+
+
+class AuctionItemListSerializer(AuctionItemSerializer):
+    """Card-sized item for listings (reference for serialize_list_rows; views don't use it)"""
+
+    class Meta(AuctionItemSerializer.Meta):
+        fields = [
+            'id', 'name', 'description', 'starting_price', 'current_price',
+            'auction_type', 'remaining_time', 'is_active', 'seller_username',
+            'current_bidder_username', 'bid_count', 'minimum_bid', 'end_time',
+            'auction_status', 'winner_info', 'thumbnail', 'created_at'
+        ]
+
+
+# Compiled fast path for listings. serialize_list_rows() builds exactly what
+# AuctionItemListSerializer renders, but straight from .values() rows and
+# with "now" taken once per page instead of in every method field.
+LIST_VALUES = (
+    'id', 'name', 'description', 'starting_price', 'current_price', 'auction_type',
+    'end_time', 'is_active', 'created_at', 'bid_count', 'thumbnail_key',
+    'dutch_decrease_interval', 'dutch_decrease_percentage',
+    'seller__username', 'current_bidder__username',
+)
+CENTS = Decimal('0.01')
+
+
+def _decimal(value):
+    """DecimalField(decimal_places=2) output"""
+    return '{:f}'.format(value.quantize(CENTS))
+
+
+def _datetime(value, tz):
+    """DateTimeField output (ISO 8601 in the current timezone, Z for UTC)"""
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def serialize_list_rows(rows, now=None):
+    """AuctionItemListSerializer(many=True).data for rows from qs.values(*LIST_VALUES)"""
+    now = now or timezone.now()
+    tz = timezone.get_current_timezone()
+    image_url_prefix = settings.AUCTION_IMAGE_URL
+    data = []
+    for row in rows:
+        is_active = row['is_active']
+        end_time = row['end_time']
+        current_price = row['current_price']
+        bidder = row['current_bidder__username']
+        is_open = is_active and now < end_time
+        ended = not is_active or now > end_time
+
+        live_price = row_price_at(row, now)
+
+        remaining_time = "Ended"
+        if is_active:
+            seconds_left = (end_time - now).total_seconds()
+            if seconds_left > 0:
+                hours, remainder = divmod(int(seconds_left), 3600)
+                minutes, seconds = divmod(remainder, 60)
+                remaining_time = f"{hours}h {minutes}m {seconds}s"
+
+        winner_info = None
+        if ended:
+            if bidder:
+                winner_info = {
+                    "winner": bidder,
+                    "winning_bid": float(current_price),
+                    "message": f"Auction ended. Winner: {bidder}"
+                }
+            else:
+                winner_info = {"winner": None, "winning_bid": None, "message": "Auction ended with no bids"}
+
+        data.append({
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'starting_price': _decimal(row['starting_price']),
+            'current_price': _decimal(live_price),
+            'auction_type': row['auction_type'],
+            'remaining_time': remaining_time,
+            'is_active': bool(is_open),
+            'seller_username': row['seller__username'],
+            'current_bidder_username': bidder,
+            'bid_count': row['bid_count'],
+            'minimum_bid': (
+                float(current_price * Decimal('1.05'))
+                if row['auction_type'] == 'FORWARD' and is_open else None
+            ),
+            'end_time': _datetime(end_time, tz),
+            'auction_status': "Ended" if ended else "Active",
+            'winner_info': winner_info,
+            'thumbnail': f"{image_url_prefix}{row['thumbnail_key']}" if row['thumbnail_key'] else None,
+            'created_at': _datetime(row['created_at'], tz),
+        })
+    return data
+
+
+def _check_image_header(idx, f):
+    """Format and dimensions of one image, with the errors create_item reports"""
+    try:
+        info = probe(f)
+    except InvalidImage:
+        raise serializers.ValidationError(
+            f"Image {idx + 1} has unsupported format. Allowed: JPG, JPEG, PNG."
+        )
+    if info.format not in ALLOWED_FORMATS:
+        raise serializers.ValidationError(
+            f"Image {idx + 1} has unsupported format. Allowed: JPG, JPEG, PNG."
+        )
+    if too_many_pixels(info):
+        raise serializers.ValidationError(
+            f"Image {idx + 1} is too large ({info.width}x{info.height} pixels)."
+        )
+    return info
+
+
+def _check_base64_image(idx, base64_str):
+    """Decode and check one images_data entry; runs on the validation pool"""
+    # Decode base64
+    if ',' in base64_str:
+        # Remove data URI prefix if present (e.g., "data:image/jpeg;base64,")
+        base64_str = base64_str.split(',')[1]
+
+    image_data = base64.b64decode(base64_str)
+
+    # Check file size
+    if len(image_data) > MAX_IMAGE_BYTES:
+        raise serializers.ValidationError(
+            f"Image {idx + 1} exceeds 25MB limit."
+        )
+
+    info = _check_image_header(idx, io.BytesIO(image_data))
+    return {"content": image_data, "format": info.format, "order": idx}
+
+
+def _check_uploaded_image(idx, upload):
+    """Check one streamed image_files part; runs on the validation pool"""
+    if getattr(upload, 'oversize', False) or upload.size > MAX_IMAGE_BYTES:
+        raise serializers.ValidationError(f"Image {idx + 1} exceeds 25MB limit.")
+    upload.seek(0)
+    try:
+        info = _check_image_header(idx, upload)
+    finally:
+        upload.seek(0)
+    return {"file": upload, "format": info.format}
+
 
 class CreateAuctionItemSerializer(serializers.ModelSerializer):
     # Accept images as list of base64 strings from frontend
@@ -82,13 +289,20 @@ class CreateAuctionItemSerializer(serializers.ModelSerializer):
         allow_empty=True,
         help_text="List of base64-encoded image strings"
     )
+    # Or as multipart file parts, streamed to disk (auctions/uploads.py)
+    image_files = serializers.ListField(
+        child=serializers.FileField(),
+        required=False,
+        allow_empty=True,
+        help_text="Image files sent as multipart/form-data parts"
+    )
 
     class Meta:
         model = AuctionItem
         fields = [
             'name', 'description', 'starting_price', 'current_price',
             'auction_type', 'end_time', 'dutch_decrease_percentage',
-            'dutch_decrease_interval', 'images_data'
+            'dutch_decrease_interval', 'images_data', 'image_files'
         ]
         extra_kwargs = {
             'current_price': {'read_only': True},
@@ -100,44 +314,18 @@ class CreateAuctionItemSerializer(serializers.ModelSerializer):
             return value
 
         # Max 5 images
-        if len(value) > 5:
+        if len(value) > MAX_IMAGES:
             raise serializers.ValidationError("Maximum 5 images allowed per item.")
 
-        # Allowed formats
-        allowed_formats = {'jpeg', 'jpg', 'png'}
-        max_size_bytes = 25 * 1024 * 1024  # 25MB
-
         processed_images = []
 
-        for idx, base64_str in enumerate(value):
+        # Decode and check every image at once; the first bad one is reported, as before
+        for idx, (image, error) in enumerate(run_checks(_check_base64_image, value)):
             try:
-                # Decode base64
-                if ',' in base64_str:
-                    # Remove data URI prefix if present (e.g., "data:image/jpeg;base64,")
-                    base64_str = base64_str.split(',')[1]
-
-                image_data = base64.b64decode(base64_str)
-
-                # Check file size
-                if len(image_data) > max_size_bytes:
-                    raise serializers.ValidationError(
-                        f"Image {idx + 1} exceeds 25MB limit."
-                    )
-
-                # Detect image format
-                img_format = imghdr.what(None, h=image_data)
-
-                if img_format not in allowed_formats:
-                    raise serializers.ValidationError(
-                        f"Image {idx + 1} has unsupported format. Allowed: JPG, JPEG, PNG."
-                    )
-
-                # Store with format and order
-                processed_images.append({
-                    "data": base64_str,
-                    "format": img_format,
-                    "order": idx
-                })
+                if error is not None:
+                    raise error
+                # Keep the decoded bytes; create() moves them into the blob store
+                processed_images.append(image)
 
             except Exception as e:
                 raise serializers.ValidationError(
@@ -145,7 +333,19 @@ class CreateAuctionItemSerializer(serializers.ModelSerializer):
                 )
 
         return processed_images
-    
+
+    def validate_image_files(self, value):
+        """Validate streamed uploads; their size was checked as they arrived"""
+        if len(value) > MAX_IMAGES:
+            raise serializers.ValidationError("Maximum 5 images allowed per item.")
+
+        processed_images = []
+        for image, error in run_checks(_check_uploaded_image, value):
+            if error is not None:
+                raise error
+            processed_images.append(image)
+        return processed_images
+
     def validate_dutch_decrease_interval(self, value):
         """Ensure interval is a positive integer"""
         if value is not None:
@@ -163,6 +363,9 @@ class CreateAuctionItemSerializer(serializers.ModelSerializer):
                     "Dutch auctions require a decrease percentage and a time interval for the decreasing"
                 )
 
+        if len(data.get('images_data') or []) + len(data.get('image_files') or []) > MAX_IMAGES:
+            raise serializers.ValidationError({"images": "Maximum 5 images allowed per item."})
+
         # Ensure starting_price is valid
         sp = data.get('starting_price')
         if sp is not None and sp <= 0:
@@ -175,11 +378,34 @@ class CreateAuctionItemSerializer(serializers.ModelSerializer):
         # Always start the auction at starting_price
         validated_data['current_price'] = validated_data['starting_price']
 
-        # Extract and process images
-        images_data = validated_data.pop('images_data', [])
-        validated_data['images'] = images_data
-
-        return super().create(validated_data)
+        # Store image bytes in the blob store, keep only metadata on the item
+        store = get_blob_store()
+        validated_data['images'] = [
+            {
+                "hash": store.save(image['content']),
+                "format": image['format'],
+                "size": len(image['content']),
+                "order": image['order']
+            }
+            for image in validated_data.pop('images_data', [])
+        ]
+        # Streamed uploads are copied from their temp files a chunk at a time
+        for image in validated_data.pop('image_files', []):
+            digest, size = store.save_stream(image['file'].chunks())
+            validated_data['images'].append({
+                "hash": digest,
+                "format": image['format'],
+                "size": size,
+                "order": len(validated_data['images'])
+            })
+
+        item = AuctionItem(**validated_data)
+        item.thumbnail_key = item.compute_thumbnail_key()
+        item.renditions_pending = bool(item.images)
+        item.save()
+        if item.images:
+            renditions.schedule(item.id)
+        return item
 
 
 class EditAuctionItemSerializer(serializers.ModelSerializer):
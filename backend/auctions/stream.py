@@ -0,0 +1,234 @@
+"""
+Live price stream for auction items, as server-sent events straight on ASGI.
+
+    GET /items/stream/?ids=1,2,3
+
+The stream sends a `price` event per item when it connects and again whenever
+the item's price, bidder or active state changes. That covers bids and
+expiry (published on the event broker by place_bid and the scheduler) and
+Dutch price drops. Dutch prices are closed-form, so each connection
+recomputes them on its own timer without touching the database. Payloads
+match GET items/<id>/current-price/, plus `item_id`.
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .events import ITEM_UPDATES, get_broker
+from .models import AuctionItem, row_price_at
+
+MAX_ITEMS_PER_STREAM = 50
+KEEPALIVE_SECONDS = 15
+
+_DISCONNECTED = object()
+
+
+class ItemStreamHub:
+    """Fans item updates from the broker out to the queues of open streams"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = {}  # item id -> set of (event loop, queue)
+        self._unsubscribe = None
+
+    def add(self, item_ids, loop, queue):
+        with self._lock:
+            if self._unsubscribe is None:
+                self._unsubscribe = get_broker().subscribe(ITEM_UPDATES, self._on_message)
+            for item_id in item_ids:
+                self._listeners.setdefault(item_id, set()).add((loop, queue))
+
+    def remove(self, item_ids, loop, queue):
+        with self._lock:
+            for item_id in item_ids:
+                listeners = self._listeners.get(item_id)
+                if listeners:
+                    listeners.discard((loop, queue))
+                    if not listeners:
+                        del self._listeners[item_id]
+
+    def _on_message(self, message):
+        # Called on the publisher's (or broker's) thread
+        with self._lock:
+            listeners = list(self._listeners.get(message.get('item_id'), ()))
+        for loop, queue in listeners:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass  # loop already closed; the stream is going away
+
+
+hub = ItemStreamHub()
+
+
+def _load_items(item_ids):
+    rows = AuctionItem.objects.filter(id__in=item_ids).values(
+        'id', 'auction_type', 'starting_price', 'current_price', 'current_bidder__username',
+        'is_active', 'end_time', 'created_at', 'dutch_decrease_interval', 'dutch_decrease_percentage'
+    )
+    return {row['id']: row for row in rows}
+
+
+def _apply_update(row, message):
+    """Merge a (partial) item_state() message from the broker into a loaded row"""
+    if 'current_price' in message:
+        row['current_price'] = Decimal(message['current_price'])
+    if 'current_bidder' in message:
+        row['current_bidder__username'] = message['current_bidder']
+    if 'is_active' in message:
+        row['is_active'] = message['is_active']
+    if 'end_time' in message:
+        row['end_time'] = datetime.fromisoformat(message['end_time'])
+
+
+def _is_dutch_running(row, now):
+    return (
+        row['auction_type'] == 'DUTCH'
+        and row['is_active'] and now < row['end_time']
+        and row['dutch_decrease_interval']
+    )
+
+
+def _render(row, now):
+    is_open = row['is_active'] and now < row['end_time']
+    price = row_price_at(row, now)
+    minimum_bid = None
+    if row['auction_type'] == 'FORWARD' and is_open:
+        minimum_bid = float(price * Decimal('1.05'))
+    return {
+        "item_id": row['id'],
+        "current_price": float(price),
+        "current_bidder": row['current_bidder__username'],
+        "is_active": is_open,
+        "minimum_bid": minimum_bid,
+    }
+
+
+def _next_change(row, now):
+    """When this item's rendered state next changes on its own (Dutch tick or end), or None"""
+    if not (row['is_active'] and now < row['end_time']):
+        return None
+    wake = row['end_time']
+    if _is_dutch_running(row, now):
+        interval = row['dutch_decrease_interval']
+        elapsed = (now - row['created_at']).total_seconds()
+        tick = row['created_at'] + timedelta(seconds=(int(elapsed // interval) + 1) * interval)
+        wake = min(wake, tick)
+    return wake
+
+
+def _cors_headers(scope):
+    """What django-cors-headers would add; this handler runs outside the middleware stack"""
+    origin = dict(scope.get('headers', [])).get(b'origin')
+    if origin is None or origin.decode('latin-1') not in settings.CORS_ALLOWED_ORIGINS:
+        return []
+    return [
+        (b'access-control-allow-origin', origin),
+        (b'access-control-allow-credentials', b'true'),
+        (b'vary', b'origin'),
+    ]
+
+
+async def _send_json(scope, send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), *_cors_headers(scope)],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(body).encode()})
+
+
+async def price_stream(scope, receive, send):
+    if scope['method'] != 'GET':
+        await _send_json(scope, send, 405, {"error": "Method not allowed"})
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        item_ids = sorted({int(i) for part in query.get('ids', []) for i in part.split(',') if i})
+    except ValueError:
+        await _send_json(scope, send, 400, {"error": "ids must be a comma-separated list of item ids"})
+        return
+    if not item_ids or len(item_ids) > MAX_ITEMS_PER_STREAM:
+        await _send_json(scope, send, 400, {"error": f"Provide between 1 and {MAX_ITEMS_PER_STREAM} item ids"})
+        return
+
+    # Subscribe before loading so no update can slip in between
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    hub.add(item_ids, loop, queue)
+    try:
+        rows = await sync_to_async(_load_items)(item_ids)
+        if not rows:
+            await _send_json(scope, send, 404, {"error": "Item not found"})
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                *_cors_headers(scope),
+            ],
+        })
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            queue.put_nowait(_DISCONNECTED)
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await _run_stream(send, queue, rows)
+        except OSError:
+            pass  # client went away mid-write
+        finally:
+            watcher.cancel()
+    finally:
+        hub.remove(item_ids, loop, queue)
+
+
+async def _run_stream(send, queue, rows):
+    last_sent = {}
+    loop_time = asyncio.get_running_loop().time
+    last_write = loop_time()
+
+    while True:
+        now = timezone.now()
+        chunks = []
+        for item_id, row in rows.items():
+            payload = _render(row, now)
+            if last_sent.get(item_id) != payload:
+                last_sent[item_id] = payload
+                chunks.append(f"event: price\ndata: {json.dumps(payload)}\n\n")
+        if not chunks and loop_time() - last_write >= KEEPALIVE_SECONDS:
+            chunks.append(": keepalive\n\n")
+        if chunks:
+            await send({'type': 'http.response.body', 'body': ''.join(chunks).encode(), 'more_body': True})
+            last_write = loop_time()
+
+        # Sleep until an update arrives, a Dutch tick or end_time passes, or a keepalive is due
+        timeout = KEEPALIVE_SECONDS - (loop_time() - last_write)
+        for row in rows.values():
+            wake = _next_change(row, now)
+            if wake is not None:
+                timeout = min(timeout, (wake - now).total_seconds() + 0.01)
+        try:
+            message = await asyncio.wait_for(queue.get(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            continue
+        if message is _DISCONNECTED:
+            return
+        row = rows.get(message.get('item_id'))
+        if row is not None:
+            _apply_update(row, message)
@@ -0,0 +1,168 @@
+"""
+Image upload handling for create_item.
+
+Streaming: images sent as multipart file parts (`image_files`) never sit in
+memory whole. ImageUploadHandler writes each part to a temporary file as its
+chunks arrive, and once a part passes MAX_IMAGE_BYTES it stops storing it
+and marks it oversize instead of reading the rest into memory.
+
+Validation: probe() reads only an image's header, the PNG IHDR chunk or the
+JPEG markers up to the first start-of-frame, to get its format and
+dimensions without decoding pixels. Images over AUCTION_MAX_IMAGE_PIXELS are
+rejected before anything tries to decode them (decompression bombs).
+run_checks() validates all of a request's images at once on a small thread
+pool.
+"""
+
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.parsers import MultiPartParser
+
+MAX_IMAGES = 5
+MAX_IMAGE_BYTES = 25 * 1024 * 1024  # 25MB
+ALLOWED_FORMATS = {'jpeg', 'png'}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Start-of-frame markers carry the dimensions; C4 (DHT), C8 (JPG) and CC (DAC) don't
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers with no length field
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+    @property
+    def pixels(self):
+        return self.width * self.height
+
+
+def _read_exactly(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise InvalidImage("Truncated image header")
+    return data
+
+
+def _probe_png(f):
+    length, chunk_type = struct.unpack('>I4s', _read_exactly(f, 8))
+    if chunk_type != b'IHDR' or length != 13:
+        raise InvalidImage("PNG does not start with IHDR")
+    width, height = struct.unpack('>II', _read_exactly(f, 8))
+    return ImageInfo('png', width, height)
+
+
+def _probe_jpeg(f):
+    while True:
+        if _read_exactly(f, 1) != b'\xff':
+            raise InvalidImage("Expected a JPEG marker")
+        marker = _read_exactly(f, 1)[0]
+        while marker == 0xFF:  # fill bytes
+            marker = _read_exactly(f, 1)[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / start of scan
+            raise InvalidImage("JPEG has no frame header")
+        (length,) = struct.unpack('>H', _read_exactly(f, 2))
+        if length < 2:
+            raise InvalidImage("Bad JPEG segment length")
+        if marker in JPEG_SOF_MARKERS:
+            _precision, height, width = struct.unpack('>BHH', _read_exactly(f, 5))
+            return ImageInfo('jpeg', width, height)
+        f.seek(length - 2, 1)
+
+
+def probe(f):
+    """Format and dimensions of a JPEG or PNG from its header; raises InvalidImage"""
+    header = f.read(8)
+    if header == PNG_SIGNATURE:
+        info = _probe_png(f)
+    elif header[:3] == b'\xff\xd8\xff':
+        f.seek(-6, 1)  # back to the first marker after SOI
+        info = _probe_jpeg(f)
+    else:
+        raise InvalidImage("Not a JPEG or PNG")
+    if info.width == 0 or info.height == 0:
+        raise InvalidImage("Image has no pixels")
+    return info
+
+
+def too_many_pixels(info):
+    return info.pixels > settings.AUCTION_MAX_IMAGE_PIXELS
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _validation_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_IMAGES, thread_name_prefix='image-validation')
+        return _pool
+
+
+def run_checks(check, items):
+    """
+    check(idx, item) for every item, concurrently on the validation pool.
+    Returns [(result, exception)] in item order, so callers can report the
+    first bad image just as a loop would.
+    """
+    if len(items) <= 1:
+        futures = None
+    else:
+        pool = _validation_pool()
+        futures = [pool.submit(check, idx, item) for idx, item in enumerate(items)]
+    outcomes = []
+    for idx, item in enumerate(items):
+        try:
+            outcomes.append((futures[idx].result() if futures else check(idx, item), None))
+        except Exception as exc:
+            outcomes.append((None, exc))
+    return outcomes
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Writes file parts to disk chunk by chunk, enforcing the size limit as it goes"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversize = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_IMAGE_BYTES:
+            # Keep draining the part (it's in the middle of the stream) but drop it
+            if not self.oversize:
+                self.oversize = True
+                self.file.truncate(0)
+            return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.oversize = self.oversize
+        return upload
+
+
+class ImageUploadParser(MultiPartParser):
+    """multipart/form-data whose file parts go through ImageUploadHandler"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request._request.upload_handlers = [ImageUploadHandler(request._request)]
+        return super().parse(stream, media_type, parser_context)
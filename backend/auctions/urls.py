@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
@@ -9,9 +9,11 @@ urlpatterns = [
     path("items/<int:item_id>/bid/", views.place_bid),  # UC3
     path("items/<int:item_id>/current-price/", views.get_current_price),  # UC2/3 polling
     path("items/<int:item_id>/status/", views.get_auction_status),  # UC3
+    path("items/prices/", views.get_prices),  # Batch price/status for listing pages
     # PROFILE EXCLUSIVE ENDPOINTS
     path("users/<str:username>/items/", views.get_user_items),  # Get user's items
     path("users/<str:username>/bids/", views.get_user_bids),  # Get user's bids
     path("items/<int:item_id>/edit/", views.edit_item),  # PATCH - Edit item
     path("items/<int:item_id>/delete/", views.delete_item),  # DELETE - Delete item
+    re_path(r"^images/(?P<digest>[0-9a-f]{64})\.(?P<ext>jpeg|jpg|png|webp)$", views.serve_image),  # Stored images
 ]
\ No newline at end of file
@@ -1,26 +1,71 @@
 from xml.dom import ValidationErr
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .models import AuctionItem
+from .blobstore import get_blob_store
+from .cache import get_item, invalidate_item
+from .events import item_state, publish_item_update
+from .models import AuctionItem, Bid, BidParticipation, row_price_at
+from .pagination import InvalidCursor, cached_count, keyset_page
+from .search import get_search_backend
+from .uploads import ImageUploadParser
 from .serializers import (
+    LIST_VALUES,
     AuctionItemSerializer,
     CreateAuctionItemSerializer,
     EditAuctionItemSerializer,
-    PlaceBidSerializer
+    PlaceBidSerializer,
+    serialize_list_rows
 )
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django.contrib.auth.models import User
+from core.renderers import FastJSONParser
+import hashlib
+
+SORT_OPTIONS = {
+    'ending_soon': 'end_time',
+    'newest': '-created_at',
+    'price_asc': 'current_price',
+    'price_desc': '-current_price',
+}
+
+# Most items get_prices answers for in one request
+MAX_BATCH_PRICE_IDS = 200
+
+
+def _page_params(request):
+    """(page, page_size) from the query string, clamped to sane values"""
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+    except ValueError:
+        page_size = 20
+    return page, page_size
+
+
+def _price_param(request, name):
+    try:
+        return Decimal(request.GET[name])
+    except (KeyError, InvalidOperation):
+        return None
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_items(request):
-    _check_and_expire_auctions()
     """Display auctions with filtering and sorting"""
-    qs = AuctionItem.objects.select_related('seller', 'current_bidder').all()
+    qs = AuctionItem.objects.all()
 
     # Optional filters
     q = (request.GET.get('q') or '').strip()
@@ -39,38 +84,33 @@ def list_items(request):
         qs = qs.filter(auction_type=auction_type)
 
     # Optional sort
-    sort = request.GET.get('sort')
-    sort_map = {
-        'ending_soon': 'end_time',
-        'newest': '-created_at',
-        'price_asc': 'current_price',
-        'price_desc': '-current_price',
-    }
-    qs = qs.order_by(sort_map.get(sort, '-end_time'))
+    ordering = SORT_OPTIONS.get(request.GET.get('sort'), '-end_time')
+    page, page_size = _page_params(request)
 
-    # Pagination
-    try:
-        page = max(int(request.GET.get('page', 1)), 1)
-    except ValueError:
-        page = 1
-    try:
-        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
-    except ValueError:
-        page_size = 20
+    # Totals are approximate (cached per filter combination); ?count=false skips them
+    total = None
+    if request.GET.get('count') != 'false':
+        total = cached_count(qs, {'q': q, 'status': status_param, 'type': auction_type})
 
-    total = qs.count()
-    start = (page - 1) * page_size
-    end = start + page_size
+    # Legacy page numbers: OFFSET pagination, slower the deeper the page
+    if 'page' in request.GET:
+        start = (page - 1) * page_size
+        qs = qs.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+        data = serialize_list_rows(qs.values(*LIST_VALUES)[start:start + page_size])
+        return Response({'count': total, 'page': page, 'page_size': page_size, 'results': data})
 
-    data = AuctionItemSerializer(qs[start:end], many=True).data
+    try:
+        rows, next_cursor = keyset_page(qs.values(*LIST_VALUES), ordering, page_size, request.GET.get('cursor'))
+    except InvalidCursor as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({'count': total, 'page': page, 'page_size': page_size, 'results': data})
+    data = serialize_list_rows(rows)
+    return Response({'count': total, 'page_size': page_size, 'next_cursor': next_cursor, 'results': data})
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def search_items(request):
-    _check_and_expire_auctions()
     """Search items using keywords"""
     keyword = request.GET.get('keyword', '').strip()
     if not keyword:
@@ -79,18 +119,29 @@ def search_items(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    items = AuctionItem.objects.filter(
-        Q(name__icontains=keyword) | Q(description__icontains=keyword),
-        is_active=True
-    ).order_by('-created_at')
+    status_param = (request.GET.get('status') or 'active').lower()
+    auction_type = (request.GET.get('type') or '').upper()
+    page, page_size = _page_params(request)
+
+    # Ranked by relevance unless a sort is asked for; the backend filters and paginates
+    total, ids = get_search_backend().search(
+        keyword,
+        now=timezone.now(),
+        offset=(page - 1) * page_size,
+        limit=page_size,
+        sort=SORT_OPTIONS.get(request.GET.get('sort')),
+        status=status_param if status_param in ('active', 'ended') else None,
+        auction_type=auction_type if auction_type in ('FORWARD', 'DUTCH') else None,
+        min_price=_price_param(request, 'min_price'),
+        max_price=_price_param(request, 'max_price'),
+    )
 
-    # Update DUTCH auction prices
-    for item in items:
-        if item.auction_type == 'DUTCH':
-            _update_dutch_price(item)
+    rows = AuctionItem.objects.filter(id__in=ids).values(*LIST_VALUES)
+    position = {item_id: i for i, item_id in enumerate(ids)}
+    rows = sorted(rows, key=lambda row: position[row['id']])
 
-    serializer = AuctionItemSerializer(items, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    data = serialize_list_rows(rows)
+    return Response({'count': total, 'page': page, 'page_size': page_size, 'results': data})
 
 
 @api_view(['GET'])
@@ -98,17 +149,7 @@ def search_items(request):
 def get_item_details(request, item_id):
     """Get full item details"""
     try:
-        item = AuctionItem.objects.get(id=item_id)
-
-        # Check if auction has ended
-        if item.is_active and timezone.now() > item.end_time:
-            item.is_active = False
-            item.save()
-
-        # Update Dutch auction price
-        if item.auction_type == 'DUTCH' and item.is_active:
-            _update_dutch_price(item)
-
+        item = get_item(item_id)
         serializer = AuctionItemSerializer(item)
         return Response(serializer.data, status=status.HTTP_200_OK)
     except AuctionItem.DoesNotExist:
@@ -120,10 +161,12 @@ def get_item_details(request, item_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@parser_classes([FastJSONParser, FormParser, ImageUploadParser])
 def create_item(request):
     """
     Create Item with image uploads
-    Accepts multipart/form-data with base64 images
+    Accepts JSON or multipart/form-data with base64 images (images_data),
+    or multipart/form-data with image file parts (image_files) streamed to disk
     """
     serializer = CreateAuctionItemSerializer(
         data=request.data,
@@ -146,74 +189,73 @@ def create_item(request):
 def place_bid(request, item_id):
     """Place a bid on an auction item"""
     try:
-        item = AuctionItem.objects.get(id=item_id)
-
-        # Check if auction is active
-        if not item.is_active or timezone.now() > item.end_time:
-            item.is_active = False
-            item.save()
-            return Response(
-                {"error": "Auction has ended"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Check if user is the seller
-        if item.seller == request.user:
-            return Response(
-                {"error": "Cannot bid on your own item"},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        # Validate bid
-        serializer = PlaceBidSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-        bid_amount = serializer.validated_data['bid_amount']
-
-        # Update Dutch price if needed
-        if item.auction_type == 'DUTCH':
-            _update_dutch_price(item)
-
-        # Validate bid amount based on auction type
-        if item.auction_type == 'FORWARD':
-            minimum_bid = item.current_price * Decimal('1.05')
-            if bid_amount < minimum_bid:
+        # Lock the item row so concurrent bids (including across replicas) are
+        # checked and applied one at a time. Only the checks and the writes run
+        # under the lock; the response is serialized after commit.
+        with transaction.atomic():
+            item = AuctionItem.objects.select_for_update().get(id=item_id)
+            now = timezone.now()
+
+            # Check if auction is active (the scheduler flips is_active once it has ended)
+            if not item.is_open_at(now):
                 return Response(
-                    {
-                        "error": "Bid amount too low",
-                        "current_price": float(item.current_price),
-                        "minimum_bid": float(minimum_bid)
-                    },
+                    {"error": "Auction has ended"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-        else:  # DUTCH
-            if bid_amount < item.current_price:
+
+            # Check if user is the seller
+            if item.seller_id == request.user.id:
                 return Response(
-                    {
-                        "error": "Bid must be at least equal to current price",
-                        "current_price": float(item.current_price)
-                    },
-                    status=status.HTTP_400_BAD_REQUEST
+                    {"error": "Cannot bid on your own item"},
+                    status=status.HTTP_403_FORBIDDEN
                 )
 
-        # Place the bid
-        now = timezone.now()
-        item.current_price = bid_amount
-        item.current_bidder = request.user
-        item.bid_history.append({
-            "username": request.user.username,
-            "amount": float(bid_amount),
-            "timestamp": now.isoformat()
-        })
-
-        # ending dutch auction after a bid has been placed on it
-        if item.auction_type == 'DUTCH':
-            item.is_active = False
-            item.end_time = now        # set end_time to bid time so it ends the auction
-            item.save()
-        else:
-            item.save()
+            # Validate bid
+            serializer = PlaceBidSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            bid_amount = serializer.validated_data['bid_amount']
+
+            # Validate bid amount based on auction type
+            if item.auction_type == 'FORWARD':
+                minimum_bid = item.current_price * Decimal('1.05')
+                if bid_amount < minimum_bid:
+                    return Response(
+                        {
+                            "error": "Bid amount too low",
+                            "current_price": float(item.current_price),
+                            "minimum_bid": float(minimum_bid)
+                        },
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            else:  # DUTCH
+                dutch_price = item.price_at(now)
+                if bid_amount < dutch_price:
+                    return Response(
+                        {
+                            "error": "Bid must be at least equal to current price",
+                            "current_price": float(dutch_price)
+                        },
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            # Place the bid
+            Bid.objects.create(item=item, bidder=request.user, amount=bid_amount, timestamp=now)
+            BidParticipation.record(request.user, item, bid_amount, now)
+            item.current_price = bid_amount
+            item.current_bidder = request.user
+            item.bid_count += 1
+            update_fields = ['current_price', 'current_bidder', 'bid_count']
+
+            # ending dutch auction after a bid has been placed on it
+            if item.auction_type == 'DUTCH':
+                item.is_active = False
+                item.end_time = now        # set end_time to bid time so it ends the auction
+                update_fields += ['is_active', 'end_time']
+            item.save(update_fields=update_fields)
+            invalidate_item(item.id)
+            publish_item_update(item_state(item))
 
         return Response(
             {
@@ -235,21 +277,19 @@ def place_bid(request, item_id):
 def get_current_price(request, item_id):
     """Real-time price updates for frontend polling"""
     try:
-        item = AuctionItem.objects.get(id=item_id)
-
-        # Update Dutch auction price
-        if item.auction_type == 'DUTCH' and item.is_active:
-            _update_dutch_price(item)
+        item = get_item(item_id)
+        now = timezone.now()
+        is_open = item.is_open_at(now)
 
         minimum_bid = None
-        if item.auction_type == 'FORWARD' and item.is_active:
+        if item.auction_type == 'FORWARD' and is_open:
             minimum_bid = float(item.current_price * Decimal('1.05'))
 
         return Response(
             {
-                "current_price": float(item.current_price),
+                "current_price": float(item.price_at(now)),
                 "current_bidder": item.current_bidder.username if item.current_bidder else None,
-                "is_active": item.is_active,
+                "is_active": is_open,
                 "minimum_bid": minimum_bid
             },
             status=status.HTTP_200_OK
@@ -261,20 +301,81 @@ def get_current_price(request, item_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_prices(request):
+    """
+    Live price and status for many items at once (listing pages, watchlists)
+    GET /items/prices/?ids=1,2,3
+
+    Answers 304 when If-None-Match matches: the weak ETag covers everything
+    but remaining_time, which only moves with the clock and is derivable
+    from end_time.
+    """
+    try:
+        ids = list(dict.fromkeys(int(i) for i in request.GET.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        return Response({"error": "ids must be a comma-separated list of item ids"}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids:
+        return Response({"error": "ids parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > MAX_BATCH_PRICE_IDS:
+        return Response(
+            {"error": f"At most {MAX_BATCH_PRICE_IDS} ids per request"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rows = AuctionItem.objects.filter(id__in=ids).values(
+        'id', 'auction_type', 'starting_price', 'current_price', 'is_active', 'end_time', 'created_at',
+        'dutch_decrease_interval', 'dutch_decrease_percentage', 'current_bidder__username'
+    )
+    now = timezone.now()
+    items = {}
+    for row in rows:
+        is_open = row['is_active'] and now < row['end_time']
+        price = row_price_at(row, now)
+        remaining = "Ended"
+        if is_open:
+            hours, remainder = divmod(int((row['end_time'] - now).total_seconds()), 3600)
+            minutes, seconds = divmod(remainder, 60)
+            remaining = f"{hours}h {minutes}m {seconds}s"
+        items[row['id']] = {
+            "id": row['id'],
+            "current_price": price,
+            "minimum_bid": price * Decimal('1.05') if row['auction_type'] == 'FORWARD' and is_open else None,
+            "current_bidder": row['current_bidder__username'],
+            "is_active": is_open,
+            "end_time": row['end_time'],
+            "remaining_time": remaining,
+        }
+    results = [items[item_id] for item_id in ids if item_id in items]
+
+    version = hashlib.sha1(repr([
+        (entry["id"], entry["current_price"], entry["current_bidder"], entry["is_active"], entry["end_time"])
+        for entry in results
+    ]).encode()).hexdigest()
+    headers = {"ETag": f'W/"{version}"', "Cache-Control": "no-cache"}
+    # Weak comparison: either side may carry the W/ prefix
+    if_none_match = request.headers.get('If-None-Match', '')
+    if '*' in if_none_match or version in [tag.removeprefix('W/').strip('"') for tag in parse_etags(if_none_match)]:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(
+        {"items": results, "missing": [item_id for item_id in ids if item_id not in items]},
+        status=status.HTTP_200_OK,
+        headers=headers
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_auction_status(request, item_id):
     """Check if auction is active or ended"""
     try:
-        item = AuctionItem.objects.get(id=item_id)
-
-        # Check if auction has ended
-        if item.is_active and timezone.now() > item.end_time:
-            item.is_active = False
-            item.save()
+        item = get_item(item_id)
+        now = timezone.now()
 
-        if item.is_active:
-            time_left = item.end_time - timezone.now()
+        if item.is_open_at(now):
+            time_left = item.end_time - now
             hours, remainder = divmod(int(time_left.total_seconds()), 3600)
             minutes, seconds = divmod(remainder, 60)
 
@@ -283,7 +384,7 @@ def get_auction_status(request, item_id):
                     "is_active": True,
                     "auction_type": item.auction_type,
                     "status": "active",
-                    "current_price": float(item.current_price),
+                    "current_price": float(item.price_at(now)),
                     "current_bidder": item.current_bidder.username if item.current_bidder else None,
                     "time_remaining": f"{hours}:{minutes:02d}:{seconds:02d}",
                     "end_time": item.end_time.isoformat()
@@ -332,51 +433,47 @@ def get_user_items(request, username):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    items = AuctionItem.objects.filter(seller=user).select_related('seller', 'current_bidder').order_by('-created_at')
-
-    # Update Dutch auction prices for active items
-    for item in items:
-        if item.auction_type == 'DUTCH' and item.is_active:
-            _update_dutch_price(item)
+    items = AuctionItem.objects.filter(seller=user).order_by('-created_at').values(*LIST_VALUES)
 
-    serializer = AuctionItemSerializer(items, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serialize_list_rows(items), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_bids(request, username):
-    """Get all items user has placed bids on (chronologically ordered)"""
-    try:
-        user = User.objects.get(username=username)
-    except User.DoesNotExist:
-        return Response(
-            {"error": "User not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
+    """
+    Items the user has bid on, most recently bid first, with their latest bid
+    GET /users/<username>/bids/?page_size=&cursor=
+    """
     # Only the user can see their own bids
-    if request.user != user:
+    if request.user.username != username:
+        if not User.objects.filter(username=username).exists():
+            return Response(
+                {"error": "User not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
         return Response(
             {"error": "You can only view your own bids"},
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Get items where user has placed a bid
-    items = AuctionItem.objects.select_related('seller', 'current_bidder').all()
-    user_bid_items = []
+    # One query driven by the participation index (user, -last_bid_at)
+    qs = AuctionItem.objects.filter(participations__user=request.user).annotate(
+        bid_amount=F('participations__last_amount'),
+        last_bid_at=F('participations__last_bid_at')
+    ).values(*LIST_VALUES, 'bid_amount', 'last_bid_at')
 
-    for item in items:
-        for bid in item.bid_history:
-            if bid.get('username') == user.username:
-                user_bid_items.append(item)
-                break
-
-    # Sort chronologically (newest first)
-    user_bid_items.sort(key=lambda x: x.created_at, reverse=True)
+    _, page_size = _page_params(request)
+    try:
+        rows, next_cursor = keyset_page(qs, '-last_bid_at', page_size, request.GET.get('cursor'))
+    except InvalidCursor as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-    serializer = AuctionItemSerializer(user_bid_items, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    data = serialize_list_rows(rows)
+    for entry, row in zip(data, rows):
+        entry['bid_amount'] = str(row['bid_amount'])
+        entry['last_bid_at'] = row['last_bid_at']
+    return Response({'page_size': page_size, 'next_cursor': next_cursor, 'results': data}, status=status.HTTP_200_OK)
 
 
 @api_view(['PATCH'])
@@ -390,14 +487,14 @@ def edit_item(request, item_id):
         item = AuctionItem.objects.get(id=item_id)
         
         # Check if user is the seller
-        if item.seller != request.user:
+        if item.seller_id != request.user.id:
             return Response(
                 {"error": "You can only edit your own items"},
                 status=status.HTTP_403_FORBIDDEN
             )
         
         # Check if auction has ended or has bids
-        if not item.is_active or item.bid_history:
+        if not item.is_open or item.has_bids:
             return Response(
                 {"error": "Cannot edit items that have ended or have bids"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -416,9 +513,11 @@ def edit_item(request, item_id):
                 raise ValidationErr("Invalid image order")
             images = list(item.images)
             item.images = [images[i] for i in new_order]
+            item.thumbnail_key = item.compute_thumbnail_key()
             item.save()
         
         item.save()
+        invalidate_item(item.id)
         
         serializer = AuctionItemSerializer(item)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -441,20 +540,21 @@ def delete_item(request, item_id):
         item = AuctionItem.objects.get(id=item_id)
         
         # Check if user is the seller
-        if item.seller != request.user:
+        if item.seller_id != request.user.id:
             return Response(
                 {"error": "You can only delete your own items"},
                 status=status.HTTP_403_FORBIDDEN
             )
         
         # Check if auction has bids
-        if item.bid_history:
+        if item.has_bids:
             return Response(
                 {"error": "Cannot delete items that have bids"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         item.delete()
+        invalidate_item(item_id)
         return Response(
             {"message": "Item deleted successfully"},
             status=status.HTTP_200_OK
@@ -466,32 +566,83 @@ def delete_item(request, item_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
-# ==================== HELPER FUNCTIONS ====================
 
-def _update_dutch_price(item):
-    """Update price for Dutch auctions based on time elapsed"""
-    if item.auction_type != 'DUTCH' or not item.is_active:
-        return
+# IMAGES
 
-    if item.last_price_update is None:
-        item.last_price_update = item.created_at
+IMAGE_CONTENT_TYPES = {'jpeg': 'image/jpeg', 'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+IMAGE_CHUNK_SIZE = 64 * 1024
 
-    now = timezone.now()
-    time_elapsed = (now - item.last_price_update).total_seconds() # in seconds
-    intervals_passed = int(time_elapsed / item.dutch_decrease_interval)
 
-    if intervals_passed > 0:
-        decrease_factor = Decimal(100 - item.dutch_decrease_percentage) / Decimal(100)
-        new_price = item.current_price * (decrease_factor ** intervals_passed)
+@require_safe
+def serve_image(request, digest, ext):
+    """
+    Stream a stored image
+    GET /images/<sha256>.<ext>
+    Content never changes for a digest, so responses are cached forever;
+    single byte ranges are supported for partial/resumed downloads.
+    """
+    store = get_blob_store()
+    cache_headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if request.headers.get('If-None-Match') == cache_headers["ETag"]:
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
 
-        item.current_price = max(new_price, Decimal('0.01'))
-        item.last_price_update = now
-        item.save()
+    try:
+        size = store.size(digest)
+    except FileNotFoundError:
+        raise Http404("Image not found")
+
+    byte_range = _parse_range(request.headers.get('Range'), size)
+    if byte_range is False:
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    start, end = byte_range or (0, size - 1)
+
+    f = store.open(digest)
+    f.seek(start)
+    response = StreamingHttpResponse(
+        _read_chunks(f, end - start + 1),
+        status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        content_type=IMAGE_CONTENT_TYPES[ext],
+        headers=cache_headers
+    )
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def _parse_range(header, size):
+    """(start, end) for a single "bytes=" range, None to send everything, False if unsatisfiable"""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                return None  # malformed, so ignored rather than unsatisfiable
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_chunks(f, length):
+    with f:
+        while length > 0:
+            chunk = f.read(min(IMAGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
 
-def _check_and_expire_auctions():
-    """Mark all expired auctions as inactive"""
-    now = timezone.now()
-    AuctionItem.objects.filter(
-        is_active=True,
-        end_time__lte=now
-    ).update(is_active=False)
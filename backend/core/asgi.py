@@ -3,6 +3,11 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Live price streams (/items/stream/) are long-lived connections, so they are
+served by a plain ASGI handler instead of going through a Django view. The API
+itself runs on gunicorn (core.wsgi); deployments run this app under uvicorn for
+the stream alone (k3s/2a-stream.yaml, the `stream` compose service).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +18,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from auctions.stream import price_stream  # noqa: E402  (needs apps loaded)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'].rstrip('/') == '/items/stream':
+        await price_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,51 @@
+"""
+Small helpers shared by the bench_* management commands.
+"""
+
+import math
+import time
+from contextlib import contextmanager
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (pct in 0-100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    if not latencies:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+@contextmanager
+def timed(results):
+    """Append the wall time of the block (seconds) to results"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results.append(time.perf_counter() - start)
+
+
+def best_of(fn, repeat=5, number=1):
+    """Best per-call time (seconds) of fn over `repeat` runs of `number` calls"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
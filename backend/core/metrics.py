@@ -0,0 +1,338 @@
+"""
+Per-route request metrics, served in Prometheus text format at /metrics.
+
+MetricsMiddleware records, for every request, keyed by the URL pattern it
+resolved to (e.g. "items/<int:item_id>/bid/") and the method:
+
+- a latency histogram (http_request_duration_seconds)
+- requests by status code (http_requests_total)
+- response body bytes (http_response_bytes_total; streamed responses aren't counted)
+- database queries and the time spent in them (db_queries_total,
+  db_query_duration_seconds_total), counted by an execute wrapper installed
+  on every database connection as it opens
+
+Recording is a handful of additions under a lock, so it stays on in production
+(`manage.py bench_metrics` measures the overhead).
+
+Every process keeps its own totals. Under gunicorn, set METRICS_DIR to a
+directory the workers share: each worker writes its totals there at most
+every METRICS_FLUSH_INTERVAL seconds, under a file name unique to that
+worker, and /metrics sums all the files, so a scrape sees the whole server
+whichever worker answers it. A scrape folds the files of exited workers into
+one metrics-exited.json, so counters never go backwards and the directory
+doesn't grow as workers are recycled; liveness is checked by pid, so the
+directory must not be shared across hosts or containers. Without
+METRICS_DIR, /metrics reports only the process that serves it, which is
+enough for runserver.
+
+/metrics needs 'Authorization: Bearer <METRICS_TOKEN>'; with no token set it
+answers only when DEBUG is on.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, so exited workers' files are left in place
+    fcntl = None
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implied
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = '<unmatched>'
+EXITED_FILE = 'metrics-exited.json'
+LOCK_FILE = '.lock'
+_WORKER_FILE = re.compile(r'^metrics-(\d+)-[0-9a-f]+\.json$')
+
+
+class RouteStats:
+    __slots__ = ('statuses', 'buckets', 'duration', 'response_bytes', 'queries', 'query_duration')
+
+    def __init__(self):
+        self.statuses = {}
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration = 0.0
+        self.response_bytes = 0
+        self.queries = 0
+        self.query_duration = 0.0
+
+    def to_dict(self):
+        return {
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'buckets': self.buckets,
+            'duration': self.duration,
+            'response_bytes': self.response_bytes,
+            'queries': self.queries,
+            'query_duration': self.query_duration,
+        }
+
+    def merge(self, data):
+        for status, count in data['statuses'].items():
+            status = int(status)
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.buckets = [a + b for a, b in zip(self.buckets, data['buckets'])]
+        self.duration += data['duration']
+        self.response_bytes += data['response_bytes']
+        self.queries += data['queries']
+        self.query_duration += data['query_duration']
+
+
+class Registry:
+    """One process's totals, keyed by (method, route)"""
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._path = None
+
+    def record(self, method, route, status, duration, response_bytes, queries, query_duration):
+        key = (method, route)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.buckets[bisect_left(DURATION_BUCKETS, duration)] += 1
+            stats.duration += duration
+            stats.response_bytes += response_bytes
+            stats.queries += queries
+            stats.query_duration += query_duration
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {f'{method} {route}': stats.to_dict() for (method, route), stats in self._routes.items()}
+
+    def flush(self):
+        """Write this process's totals to its file in the shared directory"""
+        self._last_flush = time.monotonic()
+        if self._path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # Not just the pid: a later worker reusing it must not replace an exited worker's totals
+            self._path = os.path.join(self.directory, f'metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        tmp_path = f'{self._path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, self._path)
+
+    def collect(self):
+        """Totals of every process sharing the directory (or just this one), keyed by (method, route)"""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            self.flush()
+            # One scrape at a time, so two never fold the same exited worker in twice
+            with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    self._fold_exited()
+                for name in os.listdir(self.directory):
+                    path = os.path.join(self.directory, name)
+                    if not name.endswith('.json') or path == self._path:
+                        continue
+                    snapshot = _read(path)
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+        return _merge(snapshots)
+
+    def _fold_exited(self):
+        """Add the files of workers that have exited to EXITED_FILE and delete them"""
+        exited = []
+        for name in os.listdir(self.directory):
+            match = _WORKER_FILE.match(name)
+            if match and not _is_running(int(match.group(1))):
+                exited.append(os.path.join(self.directory, name))
+        if not exited:
+            return
+        exited_path = os.path.join(self.directory, EXITED_FILE)
+        snapshots = [_read(path) for path in [exited_path, *exited]]
+        totals = _merge(snapshot for snapshot in snapshots if snapshot is not None)
+        tmp_path = f'{exited_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({f'{method} {route}': stats.to_dict() for (method, route), stats in totals.items()}, f)
+        os.replace(tmp_path, exited_path)
+        for path in exited:
+            os.remove(path)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # a worker mid-replace or a stray file
+
+
+def _merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for key, data in snapshot.items():
+            method, route = key.split(' ', 1)
+            merged.setdefault((method, route), RouteStats()).merge(data)
+    return merged
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # someone else's process
+    return True
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry(settings.METRICS_DIR or None, settings.METRICS_FLUSH_INTERVAL)
+    return _registry
+
+
+def _forget_registry():
+    # A forked worker (gunicorn --preload) starts with its own, empty totals
+    global _registry, _registry_lock
+    _registry = None
+    _registry_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_registry)
+
+
+class QueryTimer:
+    """Queries of one request and their time"""
+
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_current_queries = ContextVar('metrics_queries', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    queries = _current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.duration += time.perf_counter() - start
+        queries.count += 1
+
+
+@receiver(connection_created, dispatch_uid='core.metrics')
+def _install_query_timer(sender, connection, **kwargs):
+    # Once per connection rather than connection.execute_wrapper() per request,
+    # which costs more than everything else the middleware does
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        token = _current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.route if match is not None else UNMATCHED_ROUTE
+        if response.streaming:
+            response_bytes = 0
+        else:
+            # CommonMiddleware has set it; measuring .content would copy the body
+            length = response.get('Content-Length')
+            response_bytes = int(length) if length is not None else len(response.content)
+        get_registry().record(
+            request.method, route, response.status_code, duration, response_bytes,
+            queries.count, queries.duration,
+        )
+        return response
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render(routes):
+    """Prometheus text exposition of collect()'s totals"""
+    keys = sorted(routes)
+    lines = [
+        '# HELP http_requests_total Requests handled, by route, method and status.',
+        '# TYPE http_requests_total counter',
+    ]
+    for method, route in keys:
+        for status, count in sorted(routes[method, route].statuses.items()):
+            lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Time to build the response, through all middleware.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for method, route in keys:
+        stats = routes[method, route]
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS + ('+Inf',), stats.buckets):
+            cumulative += count
+            lines.append(
+                f'http_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}'
+            )
+        lines.append(f'http_request_duration_seconds_sum{_labels(route=route, method=method)} {stats.duration!r}')
+        lines.append(f'http_request_duration_seconds_count{_labels(route=route, method=method)} {cumulative}')
+
+    for name, kind, help_text, attribute in (
+        ('http_response_bytes_total', 'counter', 'Response body bytes (streamed responses excluded).',
+         'response_bytes'),
+        ('db_queries_total', 'counter', 'Database queries run while handling requests.', 'queries'),
+        ('db_query_duration_seconds_total', 'counter', 'Time spent in those queries.', 'query_duration'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for method, route in keys:
+            lines.append(f'{name}{_labels(route=route, method=method)} {getattr(routes[method, route], attribute)!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics(request):
+    """GET /metrics, for Prometheus; needs 'Authorization: Bearer <METRICS_TOKEN>' (DEBUG alone opens it)"""
+    token = settings.METRICS_TOKEN
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(render(get_registry().collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,34 @@
+"""
+Most queries one request to each endpoint may run, checked by
+core/querydetector.py and core.testing.QueryBudgetAssertionsMixin.
+
+Keys are (method, route), the route being the URL pattern as Django reports
+it in request.resolver_match.route. Counts include the two queries session
+authentication makes (session, then user) and were measured on a cold item
+cache. A change that needs more queries should raise the budget in the same
+commit, so the increase gets reviewed.
+"""
+
+QUERY_BUDGETS = {
+    # auctions/urls.py
+    ('GET', 'items/'): 4,
+    ('GET', 'items/search/'): 4,
+    ('POST', 'items/create/'): 5,
+    ('GET', 'items/<int:item_id>/'): 4,
+    ('POST', 'items/<int:item_id>/bid/'): 10,
+    ('GET', 'items/<int:item_id>/current-price/'): 4,
+    ('GET', 'items/<int:item_id>/status/'): 4,
+    ('GET', 'items/prices/'): 3,
+    ('GET', 'users/<str:username>/items/'): 4,
+    ('GET', 'users/<str:username>/bids/'): 3,
+    ('PATCH', 'items/<int:item_id>/edit/'): 7,
+    ('DELETE', 'items/<int:item_id>/delete/'): 8,
+    ('GET', r'^images/(?P<digest>[0-9a-f]{64})\.(?P<ext>jpeg|jpg|png|webp)$'): 0,
+
+    # payments/urls.py
+    ('GET', 'payments/<int:item_id>/details/'): 3,
+    # With an Idempotency-Key, as the frontend sends; one more when racing a concurrent submit
+    ('POST', 'payments/<int:item_id>/pay/'): 10,
+    ('GET', 'payments/<int:item_id>/status/'): 3,
+    ('GET', 'payments/my-won-items/'): 3,
+}
@@ -0,0 +1,152 @@
+"""
+Repeated-query (N+1) detector and per-endpoint query budgets, for
+development and tests.
+
+Off unless settings.QUERY_DETECTOR is set. Then QueryDetectorMiddleware
+captures every query a request runs, with the line of project code that
+ran it, and groups them by shape: the SQL with literals and IN-lists
+collapsed, so `WHERE id = 1` and `WHERE id = 2` are the same query. A shape
+run QUERY_DETECTOR_REPEAT_THRESHOLD times or more in one request is logged
+as a likely N+1, with where it ran from.
+
+The request's total is also checked against its budget in
+core/query_budgets.py. "warn" logs an overrun. "raise" raises
+QueryBudgetExceeded, an AssertionError, so any test that makes the request
+fails. Tests can also check one request at a time with
+core.testing.QueryBudgetAssertionsMixin.
+
+Savepoint statements are left out: under TestCase every atomic block issues
+them, and production requests wouldn't.
+"""
+
+import logging
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .query_budgets import QUERY_BUDGETS
+
+logger = logging.getLogger(__name__)
+
+# Frames to look past for the caller: this module and the metrics query timer
+_WRAPPER_FILES = {str(Path(__file__).resolve()), str(Path(__file__).resolve().with_name('metrics.py'))}
+_SAVEPOINT = re.compile(r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_shape(sql):
+    """SQL with literal values and IN-lists collapsed, so repeats of one query compare equal"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _PLACEHOLDERS.sub('(...)', sql).replace('%s', '?')
+
+
+def _caller():
+    """'app/module.py:line in function' of the innermost project frame that ran a query"""
+    root = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and filename not in _WRAPPER_FILES and 'site-packages' not in filename:
+            return f"{Path(filename).relative_to(root)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return '<outside the project>'
+
+
+@dataclass
+class RepeatedQuery:
+    shape: str
+    count: int
+    locations: dict  # location -> times run from there
+
+    def __str__(self):
+        where = ', '.join(f"{location} (x{times})" for location, times in self.locations.items())
+        return f"{self.count}x {self.shape}\n    from {where}"
+
+
+@dataclass
+class QueryCapture:
+    """connection.execute_wrapper recording (sql, location) for each query"""
+
+    queries: list = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _SAVEPOINT.match(sql):
+            self.queries.append((sql, _caller()))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=None):
+        """Shapes run at least `threshold` times, most frequent first"""
+        threshold = threshold or settings.QUERY_DETECTOR_REPEAT_THRESHOLD
+        groups = defaultdict(lambda: defaultdict(int))
+        for sql, location in self.queries:
+            groups[query_shape(sql)][location] += 1
+        found = [
+            RepeatedQuery(shape, sum(locations.values()), dict(locations))
+            for shape, locations in groups.items()
+            if sum(locations.values()) >= threshold
+        ]
+        return sorted(found, key=lambda repeat: -repeat.count)
+
+    def summary(self):
+        lines = [f"  {query_shape(sql)}\n    from {location}" for sql, location in self.queries]
+        return '\n'.join(lines)
+
+
+def query_budget(method, route):
+    """Most queries a request to `route` (a URL pattern, as in resolver_match.route) may run"""
+    return QUERY_BUDGETS.get((method, route))
+
+
+def check_budget(method, route, capture):
+    """Error message when the captured queries are over the route's budget, else None"""
+    budget = query_budget(method, route)
+    if budget is None or len(capture) <= budget:
+        return None
+    return f"{method} {route} ran {len(capture)} queries, budget {budget}:\n{capture.summary()}"
+
+
+class QueryDetectorMiddleware:
+    def __init__(self, get_response):
+        if settings.QUERY_DETECTOR not in ('warn', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.mode = settings.QUERY_DETECTOR
+
+    def __call__(self, request):
+        with QueryCapture() as capture:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        route = match.route if match is not None else request.path
+        for repeat in capture.repeated():
+            logger.warning("Repeated query in %s %s: %s", request.method, route, repeat)
+        overrun = check_budget(request.method, route, capture)
+        if overrun:
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(overrun)
+            logger.warning(overrun)
+        return response
@@ -5,6 +5,8 @@ Django settings for core project.
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # --- Paths ---
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +39,27 @@ INSTALLED_APPS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Item images (content-addressed, see auctions/blobstore.py)
+AUCTION_BLOB_STORE = os.getenv("AUCTION_BLOB_STORE", "auctions.blobstore.FileSystemBlobStore")
+AUCTION_BLOB_ROOT = os.getenv("AUCTION_BLOB_ROOT", str(MEDIA_ROOT / "blobs"))
+# URL prefix images are served under, as seen by the browser: the ingress (and the
+# Next.js rewrite in dev) strips /api before requests reach Django
+AUCTION_IMAGE_URL = os.getenv("AUCTION_IMAGE_URL", "/api/images/")
+# Processes the rendition worker (manage.py run_rendition_worker) builds
+# thumbnail/medium/full renditions with (auctions/renditions.py)
+AUCTION_RENDITION_WORKERS = int(os.getenv("AUCTION_RENDITION_WORKERS", "2"))
+# Uploads with more pixels than this are rejected from their header, before
+# anything decodes them (auctions/uploads.py)
+AUCTION_MAX_IMAGE_PIXELS = int(os.getenv("AUCTION_MAX_IMAGE_PIXELS", "50000000"))
+
+# --- Item search (auctions/search.py) ---
+# Empty picks by database: MySQL FULLTEXT, otherwise the in-process inverted index.
+AUCTION_SEARCH_BACKEND = os.getenv("AUCTION_SEARCH_BACKEND", "")
+# Seconds before the in-process index is rebuilt from the table
+AUCTION_SEARCH_INDEX_TTL = int(os.getenv("AUCTION_SEARCH_INDEX_TTL", "300"))
+# Seconds list_items reuses a total for the same filters (auctions/pagination.py)
+AUCTION_LIST_COUNT_TTL = int(os.getenv("AUCTION_LIST_COUNT_TTL", "30"))
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",  # dev
@@ -44,12 +67,72 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",  # dev; later IsAuthenticatedOrReadOnly
     ],
+    # orjson-backed when installed (core/renderers.py), stdlib json otherwise
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DATA_UPLOAD_MAX_MEMORY_SIZE": 26214400,  # 25MB
     "FILE_UPLOAD_MAX_MEMORY_SIZE": 26214400,  # 25MB
 }
 
+# --- Payments ---
+# Seconds an Idempotency-Key is remembered for replay (payments/idempotency.py)
+PAYMENT_IDEMPOTENCY_TTL = int(os.getenv("PAYMENT_IDEMPOTENCY_TTL", "86400"))
+# Gateway the settlement worker charges through (payments/gateways.py) and its
+# constructor options; the fake one simulates a processor's latency and declines
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "payments.gateways.FakeGateway")
+PAYMENT_GATEWAY_OPTIONS = {
+    "latency": float(os.getenv("PAYMENT_GATEWAY_LATENCY_MS", "300")) / 1000,
+    "failure_rate": float(os.getenv("PAYMENT_GATEWAY_FAILURE_RATE", "0")),
+}
+# Threads and payments per gateway call in `manage.py run_settlement_worker`
+PAYMENT_SETTLEMENT_WORKERS = int(os.getenv("PAYMENT_SETTLEMENT_WORKERS", "4"))
+PAYMENT_SETTLEMENT_BATCH_SIZE = int(os.getenv("PAYMENT_SETTLEMENT_BATCH_SIZE", "20"))
+
+# --- Caching ---
+# Locmem is per process; point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached to share it
+# between workers and replicas (e.g. django.core.cache.backends.redis.RedisCache, redis://redis:6379/1)
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+PER_PROCESS_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.filebased.FileBasedCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+# Cache alias and TTL (seconds) for item reads (auctions/cache.py); "" reads straight from the
+# database. Cached items carry the current price, so a per-process cache would serve stale
+# prices from every other gunicorn worker: item caching is off unless the cache is shared.
+AUCTION_ITEM_CACHE = os.getenv(
+    "AUCTION_ITEM_CACHE", "" if CACHES["default"]["BACKEND"] in PER_PROCESS_CACHE_BACKENDS else "default"
+)
+AUCTION_ITEM_CACHE_TTL = int(os.getenv("AUCTION_ITEM_CACHE_TTL", "300"))
+if AUCTION_ITEM_CACHE and not DEBUG and CACHES[AUCTION_ITEM_CACHE]["BACKEND"] in PER_PROCESS_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f"AUCTION_ITEM_CACHE={AUCTION_ITEM_CACHE!r} is a per-process cache; use Redis or Memcached, or set it to ''"
+    )
+
+# --- Realtime item events ---
+# Broker that carries item updates to every replica's price streams and pokes
+# the background workers (settlement, mail, renditions) when work is queued.
+# InProcessBroker only reaches the same process, so streams miss other
+# processes' bids and workers only find work on their next poll; set
+# auctions.events.RedisBroker (needs the `redis` package) whenever more than
+# one process runs, as docker-compose and k3s do.
+AUCTION_EVENT_BROKER = os.getenv("AUCTION_EVENT_BROKER", "auctions.events.InProcessBroker")
+AUCTION_EVENT_BROKER_URL = os.getenv("AUCTION_EVENT_BROKER_URL", "")
+
 # EMAIL SETTINGS
 if DEBUG:
     # Development - print to console
@@ -64,8 +147,25 @@ else:
     EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
     DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 
+# --- Request metrics (core/metrics.py), scraped from /metrics ---
+# Directory gunicorn workers share their totals through; empty keeps them per process
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+# Seconds between a worker's writes to METRICS_DIR
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+# /metrics needs "Authorization: Bearer <token>"; when unset it is open only with DEBUG on
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# --- Query detector (core/querydetector.py), for development and tests ---
+# "warn" logs repeated queries (likely N+1) and requests over their budget in
+# core/query_budgets.py; "raise" makes an over-budget request fail. Empty is off.
+QUERY_DETECTOR = os.getenv("QUERY_DETECTOR", "")
+# Times one query shape may run in a request before it is reported
+QUERY_DETECTOR_REPEAT_THRESHOLD = int(os.getenv("QUERY_DETECTOR_REPEAT_THRESHOLD", "3"))
+
 # --- Middleware (corsheaders should be early) ---
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",  # first, so its timings include the other middleware
+    "core.querydetector.QueryDetectorMiddleware",  # unused unless QUERY_DETECTOR is set
     "corsheaders.middleware.CorsMiddleware",  # <-- add this near top
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
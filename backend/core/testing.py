@@ -0,0 +1,86 @@
+"""
+Helpers shared by the apps' test suites.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .querydetector import QueryCapture, check_budget, query_budget
+
+
+def full_scans(sql):
+    """
+    Full table scans in the EXPLAIN plan of a SELECT. Index scans (ordered
+    walks of an index, e.g. to satisfy ORDER BY ... LIMIT) don't count.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            details = [row[-1] for row in cursor.fetchall()]
+            # Scans of co-routines and materialized subqueries read intermediate results, not tables
+            derived = {detail.split(' ', 1)[1] for detail in details if detail.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+            return [
+                detail for detail in details
+                if detail.startswith('SCAN ') and ' USING ' not in detail
+                and detail[5:] not in derived and not detail[5:].startswith('(subquery-')
+            ]
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            # <derivedN>/<subqueryN> rows read intermediate results, not tables
+            return [
+                f"ALL {row['table']}" for row in rows
+                if row['type'] == 'ALL' and not (row['table'] or '').startswith('<')
+            ]
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql)
+            lines = [row[0] for row in cursor.fetchall()]
+            return [line.strip() for line in lines if 'Seq Scan on' in line]
+    raise NotImplementedError(f"No plan inspection for {connection.vendor}")
+
+
+class QueryPlanAssertionsMixin:
+    """TestCase mixin: fail when any query behind a request full-scans a table"""
+
+    def assertNoFullScans(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        scans = {}
+        for query in queries.captured_queries:
+            if query['sql'].lstrip().upper().startswith('SELECT'):
+                found = full_scans(query['sql'])
+                if found:
+                    scans[query['sql']] = found
+        self.assertEqual(scans, {}, f"{url} falls back to a full scan")
+        return response
+
+    @staticmethod
+    def analyze_tables(*tables):
+        """Refresh planner statistics after seeding so plans match production-sized data"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+            elif connection.vendor == 'mysql':
+                cursor.execute('ANALYZE TABLE ' + ', '.join(tables))
+            elif connection.vendor == 'postgresql':
+                for table in tables:
+                    cursor.execute('ANALYZE ' + table)
+
+
+class QueryBudgetAssertionsMixin:
+    """
+    TestCase mixin: fail when a request runs more queries than its route's
+    budget in core/query_budgets.py. Log in with client.force_login() rather
+    than force_authenticate() so the session lookups are counted as in production.
+    """
+
+    def assertWithinQueryBudget(self, client, method, url, data=None, **extra):
+        with QueryCapture() as capture:
+            response = getattr(client, method.lower())(url, data, **extra)
+        route = response.resolver_match.route
+        self.assertIsNotNone(query_budget(method, route), f"No query budget for {method} {route}")
+        overrun = check_budget(method, route, capture)
+        self.assertIsNone(overrun, overrun)
+        return response, capture
@@ -0,0 +1,224 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+import auctions.urls
+import payments.urls
+from auctions.blobstore import get_blob_store
+from auctions.models import AuctionItem
+from auctions.tests import JPEG
+from payments.models import Payment
+from . import metrics
+from .metrics import Registry
+from .query_budgets import QUERY_BUDGETS
+from .querydetector import QueryBudgetExceeded, QueryCapture
+from .testing import QueryBudgetAssertionsMixin
+
+
+def sample(text, name, **labels):
+    """Value of one sample in a Prometheus text exposition"""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+@override_settings(METRICS_TOKEN='s3cret')
+class MetricsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metrics, '_registry', Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_recorded_by_route(self):
+        for _ in range(2):
+            self.client.get('/items/')
+        self.client.get('/items/999/')
+        self.client.get('/no-such-page/')
+        text = self.scrape()
+
+        items = {'route': 'items/', 'method': 'GET'}
+        self.assertEqual(sample(text, 'http_requests_total', **items, status='200'), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', **items), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', **items, le='+Inf'), 2)
+        self.assertGreater(sample(text, 'http_response_bytes_total', **items), 0)
+        self.assertGreater(sample(text, 'db_queries_total', **items), 0)
+        self.assertEqual(
+            sample(text, 'http_requests_total', route='items/<int:item_id>/', method='GET', status='404'), 1
+        )
+        self.assertEqual(sample(text, 'http_requests_total', route='<unmatched>', method='GET', status='404'), 1)
+
+    def test_workers_are_summed_through_the_shared_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker_a, worker_b = Registry(directory, flush_interval=0), Registry(directory, flush_interval=60)
+            worker_a.record('GET', 'items/', 200, 0.02, 100, 3, 0.001)
+            worker_b.record('GET', 'items/', 200, 0.3, 50, 1, 0.002)
+            worker_b.record('GET', 'items/', 500, 0.3, 10, 0, 0.0)
+
+            routes = worker_b.collect()
+            stats = routes['GET', 'items/']
+            self.assertEqual(stats.statuses, {200: 2, 500: 1})
+            self.assertEqual((stats.response_bytes, stats.queries), (160, 4))
+            text = metrics.render(routes)
+            self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', route='items/', method='GET',
+                                    le='0.025'), 1)
+            self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', route='items/', method='GET',
+                                    le='0.5'), 3)
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            gone, alive = Registry(directory, flush_interval=0), Registry(directory, flush_interval=0)
+            gone._path = os.path.join(directory, f'metrics-{exited.pid}-0123abcd.json')
+            gone.record('GET', 'items/', 200, 0.02, 100, 3, 0.001)
+            alive.record('GET', 'items/', 200, 0.02, 100, 3, 0.001)
+
+            for _ in range(2):
+                self.assertEqual(alive.collect()['GET', 'items/'].statuses, {200: 2})
+            self.assertFalse(os.path.exists(gone._path))
+            self.assertTrue(os.path.exists(os.path.join(directory, metrics.EXITED_FILE)))
+
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertIn('http_requests_total', self.scrape())
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_is_open_only_with_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class QueryBudgetTests(QueryBudgetAssertionsMixin, TestCase):
+    """Requests to every auctions/ and payments/ endpoint stay within core/query_budgets.py"""
+
+    def setUp(self):
+        blob_root = tempfile.TemporaryDirectory()
+        self.addCleanup(blob_root.cleanup)
+        overrides = override_settings(AUCTION_BLOB_ROOT=blob_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        get_blob_store.cache_clear()
+        self.addCleanup(get_blob_store.cache_clear)
+        cache.clear()
+
+        self.seller = User.objects.create_user('seller')
+        self.buyer = User.objects.create_user('buyer')
+        now = timezone.now()
+        item = dict(description='Seeded item', starting_price=Decimal('10.00'), current_price=Decimal('10.00'),
+                    seller=self.seller)
+        self.forward = AuctionItem.objects.create(name='Boots', auction_type='FORWARD',
+                                                  end_time=now + timedelta(days=1), **item)
+        self.unsold = [
+            AuctionItem.objects.create(name=f'Spare {n}', auction_type='FORWARD', end_time=now + timedelta(days=1),
+                                       **item)
+            for n in range(2)
+        ]
+        self.dutch = AuctionItem.objects.create(name='Lamp', auction_type='DUTCH', end_time=now + timedelta(days=1),
+                                                dutch_decrease_percentage=10, dutch_decrease_interval=60, **item)
+        self.won = AuctionItem.objects.create(name='Chair', auction_type='FORWARD', is_active=False,
+                                              end_time=now - timedelta(hours=1), current_bidder=self.buyer, **item)
+        self.paid = AuctionItem.objects.create(name='Desk', auction_type='FORWARD', is_active=False,
+                                               end_time=now - timedelta(hours=2), current_bidder=self.buyer, **item)
+        payment = Payment.objects.create(
+            auction_item=self.paid, claimed_item=self.paid, buyer=self.buyer, winning_bid_amount=Decimal('10.00'),
+            standard_shipping_cost=Decimal('0.00'), expedited_shipping_cost=Decimal('0.00'),
+            total_amount=Decimal('10.00'), payment_status='COMPLETED', confirmation_number='PAY-1', paid_at=now,
+        )
+        AuctionItem.objects.filter(id=self.paid.id).update(payment=payment)
+        self.image = get_blob_store().save(JPEG)
+
+        self.seller_client = APIClient()
+        self.seller_client.force_login(self.seller)
+        self.buyer_client = APIClient()
+        self.buyer_client.force_login(self.buyer)
+
+    def requests(self):
+        """(client, method, url, data, expected status) covering every route"""
+        seller, buyer = self.seller_client, self.buyer_client
+        # The frontend sends an Idempotency-Key with every payment
+        payer = APIClient()
+        payer.force_login(self.buyer)
+        payer.credentials(HTTP_IDEMPOTENCY_KEY='checkout-1')
+        end_time = (timezone.now() + timedelta(days=1)).isoformat()
+        new_item = {'name': 'Hat', 'description': 'Felt', 'starting_price': '5.00', 'auction_type': 'FORWARD',
+                    'end_time': end_time}
+        return [
+            (buyer, 'GET', '/items/', None, 200),
+            (buyer, 'GET', '/items/search/?keyword=boots', None, 200),
+            (buyer, 'GET', f'/items/{self.forward.id}/', None, 200),
+            (buyer, 'GET', f'/items/{self.forward.id}/current-price/', None, 200),
+            (buyer, 'GET', f'/items/{self.forward.id}/status/', None, 200),
+            (buyer, 'GET', f'/images/{self.image}.jpeg', None, 200),
+            (buyer, 'GET', f'/items/prices/?ids={self.forward.id},{self.dutch.id},{self.won.id}', None, 200),
+            (buyer, 'POST', f'/items/{self.forward.id}/bid/', {'bid_amount': '20.00'}, 200),
+            (buyer, 'POST', f'/items/{self.dutch.id}/bid/', {'bid_amount': '10.00'}, 200),
+            (seller, 'GET', '/users/seller/items/', None, 200),
+            (buyer, 'GET', '/users/buyer/bids/', None, 200),
+            (seller, 'POST', '/items/create/', {**new_item, 'image_files': [SimpleUploadedFile('a.jpg', JPEG)]}, 201),
+            (seller, 'PATCH', f'/items/{self.unsold[0].id}/edit/', {'description': 'Barely worn'}, 200),
+            (seller, 'DELETE', f'/items/{self.unsold[1].id}/delete/', None, 200),
+            (buyer, 'GET', f'/payments/{self.won.id}/details/', None, 200),
+            (payer, 'POST', f'/payments/{self.won.id}/pay/', {'card_number': '4532015112830366'}, 202),
+            (buyer, 'GET', f'/payments/{self.paid.id}/status/', None, 200),
+            (buyer, 'GET', '/payments/my-won-items/', None, 200),
+        ]
+
+    def test_every_route_is_within_budget(self):
+        for client, method, url, data, expected in self.requests():
+            with self.subTest(method=method, url=url):
+                # Budgets are for a cold item cache; don't let earlier requests warm it
+                cache.clear()
+                response, capture = self.assertWithinQueryBudget(client, method, url, data)
+                self.assertEqual(response.status_code, expected)
+                self.assertEqual(capture.repeated(), [])
+
+    def test_every_route_has_a_budget(self):
+        routes = {str(pattern.pattern) for pattern in auctions.urls.urlpatterns}
+        routes |= {'payments/' + str(pattern.pattern) for pattern in payments.urls.urlpatterns}
+        self.assertEqual(routes - {route for _, route in QUERY_BUDGETS}, set())
+
+    def test_repeated_queries_are_reported_where_they_run(self):
+        sellers = []
+        with QueryCapture() as capture:
+            for item in AuctionItem.objects.order_by('id'):
+                sellers.append(item.seller.username)
+        self.assertEqual(len(sellers), 6)
+        [repeat] = capture.repeated()
+        self.assertEqual(repeat.count, 6)
+        self.assertIn('FROM "auth_user" WHERE "auth_user"."id" = ?', repeat.shape)
+        [location] = repeat.locations
+        self.assertRegex(location, r'^core/tests\.py:\d+ in test_repeated_queries_are_reported_where_they_run$')
+
+    @override_settings(QUERY_DETECTOR='raise')
+    def test_over_budget_request_fails(self):
+        with mock.patch.dict(QUERY_BUDGETS, {('GET', 'items/'): 1}):
+            with self.assertRaisesRegex(QueryBudgetExceeded, r'GET items/ ran \d+ queries, budget 1'):
+                APIClient().get('/items/')
+
+    @override_settings(QUERY_DETECTOR='warn')
+    def test_warn_mode_logs(self):
+        with mock.patch.dict(QUERY_BUDGETS, {('GET', 'items/'): 1}):
+            with self.assertLogs('core.querydetector', 'WARNING') as logs:
+                response = APIClient().get('/items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('budget 1', logs.output[0])
@@ -4,12 +4,15 @@ from django.http import JsonResponse
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics
+
 def health(_): 
     return JsonResponse({"ok": True})
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("health/", health),
+    path("metrics", metrics),
     path("", include("accounts.urls")), # <-- routes accounts/
     path("", include("auctions.urls")), # <-- routes auctions/ 
     path('payments/', include('payments.urls')), # routes payments/
@@ -0,0 +1,70 @@
+"""
+Payment gateways the settlement worker charges through (payments/settlement.py).
+
+settings.PAYMENT_GATEWAY picks the class and PAYMENT_GATEWAY_OPTIONS are
+passed to it. FakeGateway stands in for a processor locally: each batch
+takes `latency` seconds and `failure_rate` of charges are declined.
+"""
+
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class GatewayError(Exception):
+    """The outcome of a batch is unknown; its payments are retried"""
+
+
+@dataclass(frozen=True)
+class ChargeResult:
+    payment_id: int
+    approved: bool
+    reference: str = ''
+    reason: str = ''
+
+
+class BaseGateway:
+    def charge(self, payments):
+        """
+        Charge a batch of Payment rows, returning one ChargeResult per payment.
+        A batch can be sent again after a GatewayError or a worker crash, so
+        charges must be idempotent on payment.confirmation_number.
+        """
+        raise NotImplementedError
+
+
+class FakeGateway(BaseGateway):
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._charges = {}  # confirmation number -> ChargeResult
+
+    def charge(self, payments):
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        with self._lock:
+            for payment in payments:
+                result = self._charges.get(payment.confirmation_number)
+                if result is None:
+                    if self._rng.random() < self.failure_rate:
+                        result = ChargeResult(payment.id, False, reason="Card declined")
+                    else:
+                        result = ChargeResult(payment.id, True, reference=f"FAKE-{uuid.uuid4().hex[:12].upper()}")
+                    self._charges[payment.confirmation_number] = result
+                results.append(result)
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_gateway():
+    gateway_class = import_string(settings.PAYMENT_GATEWAY)
+    return gateway_class(**settings.PAYMENT_GATEWAY_OPTIONS)
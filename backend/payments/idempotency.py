@@ -0,0 +1,105 @@
+"""
+Idempotency-Key support for unsafe endpoints.
+
+A client that sends `Idempotency-Key: <key>` gets one execution per
+(user, key): the first request runs and its response is stored, and repeats
+replay that response instead of running the view again. Reusing a key for a
+different request is rejected with 422, and a repeat that arrives while the
+first is still running gets 409 so the client can retry shortly. Records
+older than PAYMENT_IDEMPOTENCY_TTL seconds are forgotten.
+"""
+
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.renderers import FastJSONRenderer
+from .models import IdempotencyRecord
+
+MAX_KEY_LENGTH = 255
+CLAIM_ATTEMPTS = 3
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _claim(request, key, fingerprint):
+    """
+    (record, True) if this request gets to run, else (existing record, False).
+    The existing record is None if it kept vanishing under us.
+    """
+    expired = timezone.now() - timedelta(seconds=settings.PAYMENT_IDEMPOTENCY_TTL)
+    IdempotencyRecord.objects.filter(user=request.user, key=key, created_at__lt=expired).delete()
+    for _ in range(CLAIM_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(user=request.user, key=key, fingerprint=fingerprint), True
+        except IntegrityError:
+            pass
+        try:
+            return IdempotencyRecord.objects.get(user=request.user, key=key), False
+        except IdempotencyRecord.DoesNotExist:
+            # The request holding the key failed (or expired) and let it go; claim it again
+            continue
+    return None, False
+
+
+def idempotent(view):
+    """Decorate a DRF function view (inside @api_view) to honour Idempotency-Key"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = _claim(request, key, fingerprint)
+        if not claimed:
+            if record is not None and record.fingerprint != fingerprint:
+                return Response(
+                    {"error": "Idempotency-Key was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record is None or record.response_status is None:
+                return Response(
+                    {"error": "A request with this Idempotency-Key is still being processed"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return Response(
+                record.response_body,
+                status=record.response_status,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            # Server errors are worth retrying, so don't pin them to the key
+            record.delete()
+            return response
+        # Store plain JSON, exactly as the renderer will send it
+        record.response_status = response.status_code
+        record.response_body = json.loads(FastJSONRenderer().render(response.data))
+        record.save(update_fields=['response_status', 'response_body'])
+        return response
+    return wrapper
@@ -0,0 +1,121 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auctions.models import AuctionItem
+from core.benchmarking import summarize, timed
+from payments.gateways import FakeGateway
+from payments.models import Payment
+from payments.settlement import SettlementWorker
+
+
+class Command(BaseCommand):
+    help = "Submit payments against a slow fake gateway and report request latency vs settlement throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=200)
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent submitting clients")
+        parser.add_argument('--latencies', default='0,100,500', help="Gateway latencies to try, ms per batch")
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['payments']} payments, {options['clients']} clients, "
+            f"{options['workers']} settlement threads x {options['batch_size']} per batch"
+        )
+        self.stdout.write(
+            f"{'gateway':>8} {'request p50':>12} {'request p99':>12} {'in-request p50':>15} "
+            f"{'settled/s':>10} {'settle p99':>11}"
+        )
+        for latency_ms in [int(value) for value in options['latencies'].split(',')]:
+            result = self.run_round(latency_ms / 1000, options)
+            self.stdout.write(
+                f"{latency_ms:>6}ms {result['request']['p50_ms']:>10.1f}ms {result['request']['p99_ms']:>10.1f}ms "
+                f"{result['inline_p50_ms']:>13.1f}ms {result['throughput']:>10.1f} {result['settle']['p99_ms']:>9.0f}ms"
+            )
+
+    def run_round(self, latency, options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(f'bench-seller-{tag}')
+        buyers = [User.objects.create_user(f'bench-buyer-{tag}-{n}') for n in range(options['clients'])]
+        ended = timezone.now() - timedelta(hours=1)
+        items = AuctionItem.objects.bulk_create([
+            AuctionItem(
+                name=f'bench item {n}', description='settlement benchmark',
+                starting_price=Decimal('10.00'), current_price=Decimal('10.00'), auction_type='FORWARD',
+                end_time=ended, is_active=False, seller=seller, current_bidder=buyers[n % len(buyers)],
+            )
+            for n in range(options['payments'])
+        ])
+        gateway = FakeGateway(latency=latency)
+        worker = SettlementWorker(
+            gateway=gateway, workers=options['workers'], batch_size=options['batch_size'], poll_interval=0.05
+        )
+        stop = threading.Event()
+        worker_thread = threading.Thread(target=worker.run_forever, args=(stop,), daemon=True)
+        worker_thread.start()
+
+        lock = threading.Lock()
+        request_latencies, submitted_at = [], {}
+
+        def submit(buyer):
+            client = APIClient()
+            client.force_authenticate(buyer)
+            try:
+                for item in items:
+                    if item.current_bidder_id != buyer.id:
+                        continue
+                    started = time.perf_counter()
+                    response = client.post(f'/payments/{item.id}/pay/', {}, format='json')
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        request_latencies.append(elapsed)
+                        submitted_at[response.json()['payment_id']] = started + elapsed
+            finally:
+                connection.close()
+
+        try:
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(len(buyers)) as pool:
+                list(pool.map(submit, buyers))
+            # Watch every payment until it settles
+            settled_at = {}
+            ids = list(submitted_at)
+            while len(settled_at) < len(ids):
+                done = Payment.objects.filter(id__in=ids).exclude(payment_status__in=['PENDING', 'PROCESSING'])
+                now = time.perf_counter()
+                for payment_id in done.values_list('id', flat=True):
+                    settled_at.setdefault(payment_id, now)
+                time.sleep(0.01)
+            wall = time.perf_counter() - wall_start
+        finally:
+            stop.set()
+            worker_thread.join()
+
+        # What each request would have cost waiting on the gateway itself
+        charge_latencies = []
+        sample = list(Payment.objects.filter(id__in=ids)[:10])
+        for payment in sample:
+            with timed(charge_latencies):
+                FakeGateway(latency=latency).charge([payment])
+        request = summarize(request_latencies)
+
+        Payment.objects.filter(auction_item__seller=seller).delete()
+        AuctionItem.objects.filter(seller=seller).delete()
+        User.objects.filter(id__in=[seller.id] + [buyer.id for buyer in buyers]).delete()
+        return {
+            "request": request,
+            "inline_p50_ms": request['p50_ms'] + summarize(charge_latencies)['p50_ms'],
+            "throughput": len(ids) / wall,
+            "settle": summarize([settled_at[payment_id] - submitted_at[payment_id] for payment_id in ids]),
+        }
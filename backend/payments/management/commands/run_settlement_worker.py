@@ -0,0 +1,31 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from payments.settlement import SettlementWorker
+
+
+class Command(BaseCommand):
+    help = "Run the worker that settles pending payments through the payment gateway"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Threads charging batches in parallel")
+        parser.add_argument('--batch-size', type=int, help="Payments per gateway call")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between checks when idle")
+        parser.add_argument('--once', action='store_true', help="Settle one round of due payments and exit")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO)
+        worker = SettlementWorker(
+            workers=options['workers'], batch_size=options['batch_size'], poll_interval=options['poll_interval']
+        )
+        if options['once']:
+            settled = worker.run_once()
+            self.stdout.write(f"Settled {settled} payments")
+            return
+
+        self.stdout.write("Payment settlement worker running")
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def claim_paid_items(apps, schema_editor):
+    """Claim each paid item for the payment its marker points at"""
+    AuctionItem = apps.get_model('auctions', 'AuctionItem')
+    Payment = apps.get_model('payments', 'Payment')
+    paid = AuctionItem.objects.filter(payment__isnull=False).values_list('id', 'payment_id')
+    for item_id, payment_id in paid.iterator():
+        Payment.objects.filter(id=payment_id).update(claimed_item_id=item_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_auctionitem_payment'),
+        ('payments', '0002_payment_item_status_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='claimed_item',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auctions.auctionitem'),
+        ),
+        migrations.RunPython(claim_paid_items, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('response_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('response_body', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='idempotency_user_key_uniq')],
+            },
+        ),
+    ]
@@ -5,6 +5,7 @@ from auctions.models import AuctionItem
 class Payment(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
         ('COMPLETED', 'Completed'),
         ('FAILED', 'Failed'),
     ]
@@ -35,11 +36,54 @@ class Payment(models.Model):
     )
     payment_method = models.CharField(max_length=50, blank=True, null=True)
     confirmation_number = models.CharField(max_length=100, unique=True)
+    # Set to auction_item unless the payment has FAILED; the unique column is
+    # what guarantees one live payment per item (MySQL has no partial unique indexes)
+    claimed_item = models.OneToOneField(
+        AuctionItem,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+    card_last4 = models.CharField(max_length=4, blank=True, default='')
+    cardholder = models.CharField(max_length=255, blank=True, default='')
+
+    # Settlement (payments/settlement.py)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    gateway_reference = models.CharField(max_length=100, blank=True, default='')
+    failure_reason = models.CharField(max_length=255, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['auction_item', 'payment_status'], name='payment_item_status_idx'),
+            # The settlement worker's queue scan
+            models.Index(fields=['payment_status', 'created_at'], name='payment_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"Payment {self.confirmation_number} - {self.buyer.username}"
+
+
+class IdempotencyRecord(models.Model):
+    """The stored outcome of a request sent with an Idempotency-Key (payments/idempotency.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    # sha256 of method, path and body; a reused key must carry the same request
+    fingerprint = models.CharField(max_length=64)
+    # Both null while the first request is still running
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
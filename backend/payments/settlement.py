@@ -0,0 +1,160 @@
+"""
+Settles payments off the request path.
+
+process_payment records a PENDING payment and calls enqueue_settlement(),
+which pokes the worker over the event broker once the transaction commits.
+The worker (`manage.py run_settlement_worker`) claims due payments, charges
+them through the gateway a batch at a time on a thread pool, and records the
+outcome. An approval marks the payment COMPLETED and the item paid. A decline
+marks it FAILED and releases the item for another attempt. When the outcome
+is unknown (a GatewayError, or a worker that died holding the claim), the
+payment goes back to the queue, until it has had MAX_ATTEMPTS tries.
+
+Outcomes are published on PAYMENT_UPDATES; clients poll
+GET /payments/<item_id>/status/.
+
+The worker runs in its own process (docker-compose `settlement`, k3s
+auction-settlement), so the poke only reaches it through a cross-process
+broker: AUCTION_EVENT_BROKER=auctions.events.RedisBroker, as both set. With
+InProcessBroker it still settles everything, on its next poll.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from auctions.cache import invalidate_item
+from auctions.events import get_broker
+from auctions.models import AuctionItem
+from .gateways import get_gateway
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_QUEUE = 'payment-settlements'
+PAYMENT_UPDATES = 'payment-updates'
+MAX_ATTEMPTS = 5
+
+
+def _publish_on_commit(channel, message):
+    def send():
+        try:
+            get_broker().publish(channel, message)
+        except Exception:
+            # The worker also polls, and clients poll the status endpoint
+            logger.exception("Could not publish on %s", channel)
+    transaction.on_commit(send)
+
+
+def enqueue_settlement(payment):
+    _publish_on_commit(SETTLEMENT_QUEUE, {"payment_id": payment.id})
+
+
+class SettlementWorker:
+    def __init__(self, gateway=None, workers=None, batch_size=None, lease=timedelta(minutes=5), poll_interval=1.0):
+        # A claim older than `lease` is presumed abandoned and handed out again
+        self.gateway = gateway or get_gateway()
+        self.workers = workers or settings.PAYMENT_SETTLEMENT_WORKERS
+        self.batch_size = batch_size or settings.PAYMENT_SETTLEMENT_BATCH_SIZE
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+
+    def claim(self, now, limit):
+        """Move up to `limit` due payments to PROCESSING and return them, oldest first"""
+        with transaction.atomic():
+            ids = list(
+                Payment.objects.select_for_update(skip_locked=True).filter(
+                    Q(payment_status='PENDING') |
+                    Q(payment_status='PROCESSING', claimed_at__lt=now - self.lease)
+                ).order_by('created_at').values_list('id', flat=True)[:limit]
+            )
+            Payment.objects.filter(id__in=ids).update(
+                payment_status='PROCESSING', claimed_at=now, attempts=F('attempts') + 1
+            )
+        return list(Payment.objects.filter(id__in=ids).order_by('created_at'))
+
+    def settle(self, payments):
+        """Charge one batch and record the outcomes; returns how many were settled"""
+        try:
+            results = self.gateway.charge(payments)
+        except Exception:
+            logger.exception("Gateway failed on a batch of %d payments", len(payments))
+            for payment in payments:
+                self._release(payment)
+            return 0
+        by_id = {payment.id: payment for payment in payments}
+        for result in results:
+            self._record(by_id[result.payment_id], result)
+        return len(results)
+
+    def _record(self, payment, result):
+        now = timezone.now()
+        claimed = Payment.objects.filter(id=payment.id, payment_status='PROCESSING')
+        with transaction.atomic():
+            if result.approved:
+                if claimed.update(payment_status='COMPLETED', paid_at=now, gateway_reference=result.reference):
+                    AuctionItem.objects.filter(id=payment.auction_item_id).update(payment=payment.id)
+                    invalidate_item(payment.auction_item_id)
+                    self._publish(payment, 'COMPLETED')
+            elif claimed.update(payment_status='FAILED', failure_reason=result.reason[:255], claimed_item=None):
+                self._publish(payment, 'FAILED')
+
+    def _release(self, payment):
+        claimed = Payment.objects.filter(id=payment.id, payment_status='PROCESSING')
+        with transaction.atomic():
+            if payment.attempts >= MAX_ATTEMPTS:
+                if claimed.update(payment_status='FAILED', failure_reason="Payment processor unavailable",
+                                  claimed_item=None):
+                    self._publish(payment, 'FAILED')
+            else:
+                claimed.update(payment_status='PENDING', claimed_at=None)
+
+    def _settle_on_pool(self, payments):
+        # Pool threads keep their own connections between rounds
+        close_old_connections()
+        try:
+            return self.settle(payments)
+        finally:
+            close_old_connections()
+
+    def _publish(self, payment, payment_status):
+        _publish_on_commit(PAYMENT_UPDATES, {
+            "payment_id": payment.id,
+            "item_id": payment.auction_item_id,
+            "status": payment_status,
+        })
+
+    def run_once(self):
+        """Claim and settle one round of batches; returns how many payments were settled"""
+        payments = self.claim(timezone.now(), self.workers * self.batch_size)
+        batches = [payments[i:i + self.batch_size] for i in range(0, len(payments), self.batch_size)]
+        if self._pool is None:
+            return sum(map(self.settle, batches))
+        return sum(self._pool.map(self._settle_on_pool, batches))
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        wake = threading.Event()
+        unsubscribe = get_broker().subscribe(SETTLEMENT_QUEUE, lambda message: wake.set())
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                wake.clear()
+                try:
+                    settled = self.run_once()
+                except Exception:
+                    logger.exception("Settlement pass failed")
+                    stop_event.wait(1)
+                    continue
+                # A full round means more may be waiting; otherwise sleep until poked
+                if settled < self.workers * self.batch_size:
+                    wake.wait(self.poll_interval)
+        finally:
+            unsubscribe()
@@ -1,3 +1,314 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auctions.models import AuctionItem
+from .gateways import FakeGateway, GatewayError
+from .idempotency import request_fingerprint
+from .models import IdempotencyRecord, Payment
+from .settlement import MAX_ATTEMPTS, SettlementWorker
+from auctions.tests import seed_catalog
+from core.testing import QueryPlanAssertionsMixin
+
+
+class PaymentQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """EXPLAIN the queries behind the winner's payment pages on a seeded catalog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, cls.bidders = seed_catalog()
+        cls.analyze_tables('auctions_auctionitem', 'payments_payment', 'auth_user')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.bidders[0])
+
+    def test_my_won_items(self):
+        self.assertNoFullScans(self.client, '/payments/my-won-items/')
+
+    def test_payment_details(self):
+        item = AuctionItem.objects.filter(is_active=False, current_bidder=self.bidders[0]).first()
+        self.assertNoFullScans(self.client, f'/payments/{item.id}/details/')
+
+
+class WonItemsTests(TestCase):
+    """my-won-items reads paid state from the item, so its query count is flat"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user('seller')
+        self.buyer = User.objects.create_user('buyer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def win_items(self, count):
+        ended = timezone.now() - timedelta(hours=1)
+        for n in range(count):
+            AuctionItem.objects.create(
+                name=f'Won {n}', description='won', starting_price=Decimal('10.00'),
+                current_price=Decimal('12.00'), auction_type='FORWARD', end_time=ended - timedelta(minutes=n),
+                is_active=False, seller=self.seller, current_bidder=self.buyer,
+            )
+
+    def pay(self, item):
+        response = self.client.post(f'/payments/{item.id}/pay/', {'expedited_shipping': False}, format='json')
+        SettlementWorker(gateway=FakeGateway(), workers=1).run_once()
+        return response
+
+    def won_items_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/payments/my-won-items/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_is_constant(self):
+        self.win_items(3)
+        self.pay(AuctionItem.objects.first())
+        few, data = self.won_items_queries()
+        self.assertEqual((len(data['paid_items']), len(data['unpaid_items'])), (1, 2))
+
+        self.win_items(40)
+        for item in AuctionItem.objects.all()[:20]:
+            self.pay(item)
+        many, data = self.won_items_queries()
+        self.assertEqual(len(data['paid_items']) + len(data['unpaid_items']), 43)
+        self.assertEqual(few, many)
+
+    def test_amounts_and_times_keep_their_wire_format(self):
+        # Floats and isoformat() (+00:00), as these responses were formatted before the orjson renderer
+        self.win_items(2)
+        paid, unpaid = AuctionItem.objects.order_by('id')
+        self.pay(paid)
+        data = self.client.get('/payments/my-won-items/').json()
+        self.assertEqual(data['unpaid_items'][0]['won_at'], unpaid.end_time.isoformat())
+        won = data['paid_items'][0]
+        self.assertEqual((won['winning_bid'], won['won_at']), (12.0, paid.end_time.isoformat()))
+        self.assertTrue(won['paid_at'].endswith('+00:00'))
+
+        receipt = self.client.get(f'/payments/{paid.id}/status/').json()['receipt']
+        self.assertEqual(receipt['paid_at'], won['paid_at'])
+        self.assertIsInstance(receipt['total_paid'], float)
+
+        status = self.client.get(f'/items/{paid.id}/status/').json()
+        self.assertEqual((status['winning_bid'], status['end_time']), (12.0, paid.end_time.isoformat()))
+
+    def test_payment_marks_item_paid(self):
+        self.win_items(1)
+        item = AuctionItem.objects.get()
+        response = self.pay(item)
+        self.assertEqual(response.status_code, 202)
+        item.refresh_from_db()
+        self.assertEqual(item.payment_id, response.json()['payment_id'])
+        self.assertEqual(item.payment.payment_status, 'COMPLETED')
+
+        again = self.pay(item)
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(again.json()['payment_id'], item.payment_id)
+
+    def test_paginates(self):
+        self.win_items(7)
+        first = self.client.get('/payments/my-won-items/?page_size=5').json()
+        second = self.client.get(f"/payments/my-won-items/?page_size=5&cursor={first['next_cursor']}").json()
+        self.assertEqual(len(first['unpaid_items']), 5)
+        self.assertEqual(len(second['unpaid_items']), 2)
+        self.assertIsNone(second['next_cursor'])
+        ids = [entry['item_id'] for entry in first['unpaid_items'] + second['unpaid_items']]
+        self.assertEqual(len(set(ids)), 7)
+
+        only = self.client.get(f'/payments/my-won-items/?item_id={ids[3]}').json()
+        self.assertEqual([entry['item_id'] for entry in only['unpaid_items']], [ids[3]])
+
+
+class IdempotencyTests(TestCase):
+    """Idempotency-Key on POST payments/<item_id>/pay/, one request at a time"""
+
+    def setUp(self):
+        seller = User.objects.create_user('seller')
+        self.buyer = User.objects.create_user('buyer')
+        self.item = AuctionItem.objects.create(
+            name='Won', description='won', starting_price=Decimal('10.00'), current_price=Decimal('12.00'),
+            auction_type='FORWARD', end_time=timezone.now() - timedelta(hours=1), is_active=False,
+            seller=seller, current_bidder=self.buyer,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def pay(self, expedited=True, key='checkout-1'):
+        return self.client.post(f'/payments/{self.item.id}/pay/', {'expedited_shipping': expedited}, format='json',
+                                headers={'Idempotency-Key': key})
+
+    def test_replay_and_reuse(self):
+        first = self.pay()
+        self.assertEqual(first.status_code, 202)
+        replay = self.pay()
+        self.assertEqual((replay.status_code, replay['Idempotent-Replayed']), (202, 'true'))
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(self.pay(expedited=False).status_code, 422)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_in_flight(self):
+        same_request = mock.Mock(method='POST', path=f'/payments/{self.item.id}/pay/', data={'expedited_shipping': True})
+        IdempotencyRecord.objects.create(user=self.buyer, key='checkout-1', fingerprint=request_fingerprint(same_request))
+        self.assertEqual(self.pay().status_code, 409)
+
+    def test_claim_released_while_we_looked(self):
+        # Another request held the key, then failed and deleted its record
+        IdempotencyRecord.objects.create(user=self.buyer, key='checkout-1', fingerprint='x' * 64)
+        real_get = IdempotencyRecord.objects.get
+
+        def released(**lookup):
+            IdempotencyRecord.objects.filter(**lookup).delete()
+            return real_get(**lookup)
+        with mock.patch.object(IdempotencyRecord.objects, 'get', side_effect=released) as get:
+            self.assertEqual(self.pay().status_code, 202)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(IdempotencyRecord.objects.get().response_status, 202)
+
+    def test_claim_that_keeps_vanishing(self):
+        with mock.patch.object(IdempotencyRecord.objects, 'create', side_effect=IntegrityError), \
+                mock.patch.object(IdempotencyRecord.objects, 'get', side_effect=IdempotencyRecord.DoesNotExist):
+            self.assertEqual(self.pay().status_code, 409)
+        self.assertFalse(Payment.objects.exists())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentPaymentTests(TransactionTestCase):
+    """
+    Parallel submits for one item must charge exactly once. Needs real row
+    locks; SQLite serializes writers and answers "database is locked" instead.
+    """
+
+    WORKERS = 8
+
+    def setUp(self):
+        seller = User.objects.create_user('seller')
+        self.buyer = User.objects.create_user('buyer')
+        self.item = AuctionItem.objects.create(
+            name='Won', description='won', starting_price=Decimal('10.00'), current_price=Decimal('12.00'),
+            auction_type='FORWARD', end_time=timezone.now() - timedelta(hours=1), is_active=False,
+            seller=seller, current_bidder=self.buyer,
+        )
+
+    def hammer(self, headers):
+        barrier = threading.Barrier(self.WORKERS)
+
+        def submit(_):
+            client = APIClient()
+            client.force_authenticate(self.buyer)
+            barrier.wait()
+            try:
+                return client.post(f'/payments/{self.item.id}/pay/', {'expedited_shipping': True}, format='json', headers=headers)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.WORKERS) as pool:
+            return list(pool.map(submit, range(self.WORKERS)))
+
+    def test_parallel_submits_charge_once(self):
+        responses = self.hammer({})
+        # Later submits find the first one in flight and report it
+        self.assertEqual({response.status_code for response in responses}, {202})
+        payment = Payment.objects.get()
+        self.assertEqual(payment.claimed_item_id, self.item.id)
+        for response in responses:
+            self.assertEqual(response.json()['payment_id'], payment.id)
+
+    def test_parallel_retries_with_one_key_replay(self):
+        responses = self.hammer({'Idempotency-Key': 'checkout-1'})
+        payment = Payment.objects.get()
+        self.assertEqual(len(payment.confirmation_number), len('PAY-') + 32)
+        completed = [response for response in responses if response.status_code == 202]
+        # The rest arrived while the first was still running
+        self.assertTrue(all(response.status_code == 409 for response in responses if response.status_code != 202))
+        self.assertEqual({response.json()['payment_id'] for response in completed}, {payment.id})
+
+        replay = APIClient()
+        replay.force_authenticate(self.buyer)
+        response = replay.post(f'/payments/{self.item.id}/pay/', {'expedited_shipping': True}, format='json',
+                               headers={'Idempotency-Key': 'checkout-1'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.json(), completed[0].json())
+
+        reused = replay.post(f'/payments/{self.item.id}/pay/', {'expedited_shipping': False}, format='json',
+                             headers={'Idempotency-Key': 'checkout-1'})
+        self.assertEqual(reused.status_code, 422)
+
+
+class SettlementTests(TestCase):
+    """Payments are settled by the worker, not in the request"""
+
+    def setUp(self):
+        seller = User.objects.create_user('seller')
+        self.buyer = User.objects.create_user('buyer')
+        self.item = AuctionItem.objects.create(
+            name='Won', description='won', starting_price=Decimal('10.00'), current_price=Decimal('12.00'),
+            auction_type='FORWARD', end_time=timezone.now() - timedelta(hours=1), is_active=False,
+            seller=seller, current_bidder=self.buyer,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def pay(self):
+        return self.client.post(f'/payments/{self.item.id}/pay/', {'card_number': '4532015112830366'}, format='json')
+
+    def payment_status(self):
+        return self.client.get(f'/payments/{self.item.id}/status/').json()
+
+    def test_approved_payment_completes(self):
+        submitted = self.pay()
+        self.assertEqual(submitted.status_code, 202)
+        self.assertEqual(self.payment_status()['status'], 'PENDING')
+
+        self.assertEqual(SettlementWorker(gateway=FakeGateway(), workers=1).run_once(), 1)
+        state = self.payment_status()
+        self.assertEqual(state['status'], 'COMPLETED')
+        self.assertEqual(state['receipt']['card_ending_in'], '0366')
+        self.item.refresh_from_db()
+        self.assertTrue(self.item.paid)
+        self.assertTrue(Payment.objects.get().gateway_reference.startswith('FAKE-'))
+
+    def test_declined_payment_frees_the_item(self):
+        self.pay()
+        SettlementWorker(gateway=FakeGateway(failure_rate=1), workers=1).run_once()
+        state = self.payment_status()
+        self.assertEqual((state['status'], state['error']), ('FAILED', 'Card declined'))
+        self.item.refresh_from_db()
+        self.assertFalse(self.item.paid)
+
+        retry = self.pay()
+        self.assertEqual(retry.status_code, 202)
+        self.assertNotEqual(retry.json()['payment_id'], state['payment_id'])
+
+    def test_gateway_errors_are_retried_then_failed(self):
+        class DownGateway(FakeGateway):
+            def charge(self, payments):
+                raise GatewayError("timeout")
+
+        self.pay()
+        worker = SettlementWorker(gateway=DownGateway(), workers=1)
+        for attempt in range(1, MAX_ATTEMPTS):
+            worker.run_once()
+            payment = Payment.objects.get()
+            self.assertEqual((payment.payment_status, payment.attempts), ('PENDING', attempt))
+        worker.run_once()
+        self.assertEqual(Payment.objects.get().payment_status, 'FAILED')
+
+    def test_abandoned_claims_are_reclaimed(self):
+        self.pay()
+        worker = SettlementWorker(gateway=FakeGateway(), workers=1, lease=timedelta(minutes=5))
+        claimed = worker.claim(timezone.now(), 10)
+        self.assertEqual([payment.payment_status for payment in claimed], ['PROCESSING'])
+        self.assertEqual(worker.claim(timezone.now(), 10), [])
+        # The worker holding it died; once the lease runs out it is handed out again
+        again = worker.claim(timezone.now() + timedelta(minutes=6), 10)
+        self.assertEqual(worker.settle(again), 1)
+        self.assertEqual(Payment.objects.get().payment_status, 'COMPLETED')
@@ -4,5 +4,6 @@ from . import views
 urlpatterns = [
     path("<int:item_id>/details/", views.get_payment_details), # payment details endpoint
     path("<int:item_id>/pay/", views.process_payment), # paying endpoint
+    path("<int:item_id>/status/", views.get_payment_status), # settlement status and receipt
     path("my-won-items/", views.get_my_won_items), # show all auction items won (paid and not yet paid)
 ]
@@ -2,18 +2,26 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
 from decimal import Decimal
 import uuid
 
 from auctions.models import AuctionItem
+from auctions.pagination import InvalidCursor, keyset_page
+from .idempotency import idempotent
 from .models import Payment
+from .settlement import enqueue_settlement
 from .serializers import (
     PaymentDetailSerializer,
     PaymentOptionsSerializer,
     ProcessPaymentSerializer
 )
 
+# Won items per page of /payments/my-won-items/
+WON_ITEMS_PAGE_SIZE = 50
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_payment_details(request, item_id):
@@ -27,7 +35,7 @@ def get_payment_details(request, item_id):
         item = AuctionItem.objects.get(id=item_id)
         
         # Simple check: Is auction still active?
-        if item.is_active:
+        if item.is_open:
             return Response(
                 {"error": "Auction is still active"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -40,14 +48,14 @@ def get_payment_details(request, item_id):
         # Both are fine, continue with payment
         
         # Check if there's a winner
-        if not item.current_bidder:
+        if not item.current_bidder_id:
             return Response(
                 {"error": "No winner for this auction"},
                 status=status.HTTP_404_NOT_FOUND
             )
         
         # Check if user is the winner
-        if item.current_bidder != request.user:
+        if item.current_bidder_id != request.user.id:
             return Response(
                 {
                     "error": "You are not the winner of this auction",
@@ -57,17 +65,12 @@ def get_payment_details(request, item_id):
             )
         
         # Check if already paid
-        existing_payment = Payment.objects.filter(
-            auction_item=item,
-            payment_status='COMPLETED'
-        ).first()
-        
-        if existing_payment:
+        if item.paid:
             return Response(
                 {
                     "error": "This item has already been paid for",
-                    "payment_id": existing_payment.id,
-                    "confirmation_number": existing_payment.confirmation_number
+                    "payment_id": item.payment_id,
+                    "confirmation_number": item.payment.confirmation_number
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -81,7 +84,7 @@ def get_payment_details(request, item_id):
             'item_id': item.id,
             'item_name': item.name,
             'winning_bid': item.current_price,
-            'winner': item.current_bidder.username,
+            'winner': request.user.username,
             'standard_shipping_cost': item.standard_shipping_cost,
             'expedited_shipping_cost': item.expedited_shipping_cost,
             'total_if_standard': standard_total,
@@ -98,12 +101,91 @@ def get_payment_details(request, item_id):
         )
 
 
+def new_confirmation_number():
+    """A full random uuid4, so numbers don't collide however many payments there are"""
+    return f"PAY-{uuid.uuid4().hex.upper()}"
+
+
+def _already_paid(payment):
+    return Response(
+        {
+            "error": "This item has already been paid for",
+            "payment_id": payment.id,
+            "confirmation_number": payment.confirmation_number
+        },
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def _receipt(payment):
+    """The receipt for a completed payment"""
+    item = payment.auction_item
+    user = payment.buyer
+    profile = getattr(user, "profile", None)
+
+    buyer_block = {
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+    }
+
+    address_block = (
+        {
+            "street_name": profile.street_name,
+            "street_number": profile.street_number,
+            "city": profile.city,
+            "country": profile.country,
+            "postal_code": profile.postal_code,
+        }
+        if profile else None
+    )
+    return {
+        "item_name": item.name,
+        "winning_bid": float(payment.winning_bid_amount),
+        "shipping_cost": float(payment.standard_shipping_cost + payment.expedited_shipping_cost),
+        "expedited": payment.expedited_shipping_selected,
+        "total_paid": float(payment.total_amount),
+        "paid_at": payment.paid_at.isoformat() if payment.paid_at else None,
+        "confirmation_number": payment.confirmation_number,
+        "payment_method": payment.payment_method,
+        "card_ending_in": payment.card_last4,
+        "cardholder": payment.cardholder,
+        "buyer": buyer_block,
+        "shipping_address": address_block
+    }
+
+
+def _payment_state(payment):
+    """Where a payment is in settlement, with the receipt once it has completed"""
+    state = {
+        "payment_id": payment.id,
+        "status": payment.payment_status,
+        "confirmation_number": payment.confirmation_number,
+        "status_url": f"/payments/{payment.auction_item_id}/status/",
+    }
+    if payment.payment_status == 'COMPLETED':
+        state["receipt"] = _receipt(payment)
+    elif payment.payment_status == 'FAILED':
+        state["error"] = payment.failure_reason
+    return state
+
+
+def _submitted(payment):
+    return Response({
+        "success": True,
+        "message": "Payment submitted for processing",
+        **_payment_state(payment)
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def process_payment(request, item_id):
     """
-    Process payment for a won auction item (UC4)
+    Submit payment for a won auction item (UC4)
     POST /payments/<item_id>/pay/
+    Headers: Idempotency-Key (optional; repeats replay the first response)
     Body: {
         "expedited_shipping": true/false,
         "payment_method": "Credit Card",
@@ -112,26 +194,30 @@ def process_payment(request, item_id):
         "expiration_date": "12/27",
         "security_code": "647"
     }
+
+    The payment is recorded as PENDING and settled by the settlement worker
+    (payments/settlement.py); poll GET /payments/<item_id>/status/ for the
+    outcome and receipt.
     """
     try:
         item = AuctionItem.objects.get(id=item_id)
         
         # Check if auction has ended
-        if item.is_active or timezone.now() < item.end_time:
+        if item.is_open:
             return Response(
                 {"error": "Auction is still active"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Check if there's a winner
-        if not item.current_bidder:
+        if not item.current_bidder_id:
             return Response(
                 {"error": "No winner for this auction"},
                 status=status.HTTP_404_NOT_FOUND
             )
         
         # Check if user is the winner
-        if item.current_bidder != request.user:
+        if item.current_bidder_id != request.user.id:
             return Response(
                 {
                     "error": "You are not the winner of this auction",
@@ -141,20 +227,8 @@ def process_payment(request, item_id):
             )
         
         # Check if already paid
-        existing_payment = Payment.objects.filter(
-            auction_item=item,
-            payment_status='COMPLETED'
-        ).first()
-        
-        if existing_payment:
-            return Response(
-                {
-                    "error": "This item has already been paid for",
-                    "payment_id": existing_payment.id,
-                    "confirmation_number": existing_payment.confirmation_number
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if item.paid:
+            return _already_paid(item.payment)
         
         # remove payment validation for now. Doesn't really matter
         expedited_shipping = bool(request.data.get("expedited_shipping", False))
@@ -172,63 +246,40 @@ def process_payment(request, item_id):
         total_amount = winning_bid_amount + standard_shipping_cost + expedited_shipping_cost
         
         # Generate confirmation number
-        confirmation_number = f"PAY-{uuid.uuid4().hex[:8].upper()}"
+        confirmation_number = new_confirmation_number()
         
-        # Create payment record
-        payment = Payment.objects.create(
-            auction_item=item,
-            buyer=request.user,
-            winning_bid_amount=winning_bid_amount,
-            standard_shipping_cost=standard_shipping_cost,
-            expedited_shipping_selected=expedited_shipping,
-            expedited_shipping_cost=expedited_shipping_cost,
-            total_amount=total_amount,
-            payment_status='COMPLETED',  # For now, simulate instant success
-            payment_method=payment_method,
-            confirmation_number=confirmation_number,
-            paid_at=timezone.now()
-        )
-        
-        # get user details
-        user = request.user
-        profile = getattr(user, "profile", None)
-
-        buyer_block = {
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-        }
+        # Record the payment and queue it for settlement. Concurrent submits can
+        # all pass the check above; the row lock makes them take turns here, and
+        # claimed_item's unique index stops a second live payment where locks don't
+        try:
+            with transaction.atomic():
+                AuctionItem.objects.select_for_update().filter(id=item.id).values_list('id').get()
+                live = Payment.objects.filter(claimed_item=item).first()
+                if live is not None:
+                    return _already_paid(live) if live.payment_status == 'COMPLETED' else _submitted(live)
+                payment = Payment.objects.create(
+                    auction_item=item,
+                    claimed_item=item,
+                    buyer=request.user,
+                    winning_bid_amount=winning_bid_amount,
+                    standard_shipping_cost=standard_shipping_cost,
+                    expedited_shipping_selected=expedited_shipping,
+                    expedited_shipping_cost=expedited_shipping_cost,
+                    total_amount=total_amount,
+                    payment_status='PENDING',
+                    payment_method=payment_method,
+                    card_last4=last_4,
+                    cardholder=name_on_card,
+                    confirmation_number=confirmation_number
+                )
+                enqueue_settlement(payment)
+        except IntegrityError:
+            live = Payment.objects.filter(claimed_item=item).first()
+            if live is None:
+                raise
+            return _already_paid(live) if live.payment_status == 'COMPLETED' else _submitted(live)
 
-        address_block = (
-            {
-                "street_name": profile.street_name,
-                "street_number": profile.street_number,
-                "city": profile.city,
-                "country": profile.country,
-                "postal_code": profile.postal_code,
-            }
-            if profile else None
-        )
-        # Return receipt
-        return Response({
-            "success": True,
-            "message": "Payment processed successfully",
-            "payment_id": payment.id,
-            "receipt": {
-                "item_name": item.name,
-                "winning_bid": float(winning_bid_amount),
-                "shipping_cost": float(standard_shipping_cost + expedited_shipping_cost),
-                "expedited": expedited_shipping,
-                "total_paid": float(total_amount),
-                "paid_at": payment.paid_at.isoformat(),
-                "confirmation_number": confirmation_number,
-                "payment_method": payment_method,
-                "card_ending_in": last_4,
-                "cardholder": name_on_card,
-                "buyer": buyer_block,
-                "shipping_address": address_block
-            }
-        }, status=status.HTTP_200_OK)
+        return _submitted(payment)
         
     except AuctionItem.DoesNotExist:
         return Response(
@@ -237,42 +288,70 @@ def process_payment(request, item_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_payment_status(request, item_id):
+    """
+    The current user's latest payment for an item, as it settles
+    GET /payments/<item_id>/status/
+    """
+    payment = Payment.objects.select_related('auction_item', 'buyer', 'buyer__profile').filter(
+        auction_item_id=item_id,
+        buyer=request.user
+    ).order_by('-created_at', '-id').first()
+    if payment is None:
+        return Response(
+            {"error": "No payment for this item"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(_payment_state(payment), status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_my_won_items(request):
     """
     Get all items won by the current user (extra functionality, not included in UC4)
-    GET /payments/my-won-items/
+    GET /payments/my-won-items/?page_size=&cursor=&item_id=
     """
-    # Get all items won by user
+    # Get all items won by user (ended, even if the scheduler hasn't closed them yet).
+    # One query: the item's payment marker joins straight to its completed payment
     won_items = AuctionItem.objects.filter(
-        current_bidder=request.user,
-        is_active=False
-    ).order_by('-end_time')
-    
+        Q(is_active=False) | Q(end_time__lte=timezone.now()),
+        current_bidder=request.user
+    ).values(
+        'id', 'name', 'current_price', 'end_time', 'payment_id',
+        'payment__paid_at', 'payment__total_amount', 'payment__confirmation_number'
+    )
+    if request.GET.get('item_id', '').isdigit():
+        won_items = won_items.filter(id=int(request.GET['item_id']))
+
+    try:
+        page_size = min(max(int(request.GET.get('page_size', WON_ITEMS_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        page_size = WON_ITEMS_PAGE_SIZE
+    try:
+        rows, next_cursor = keyset_page(won_items, '-end_time', page_size, request.GET.get('cursor'))
+    except InvalidCursor as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
     unpaid_items = []
     paid_items = []
     
-    for item in won_items:
-        # Check if paid
-        payment = Payment.objects.filter(
-            auction_item=item,
-            payment_status='COMPLETED'
-        ).first()
-        
+    for row in rows:
         item_data = {
-            "item_id": item.id,
-            "item_name": item.name,
-            "winning_bid": float(item.current_price),
-            "won_at": item.end_time.isoformat(),
+            "item_id": row['id'],
+            "item_name": row['name'],
+            "winning_bid": float(row['current_price']),
+            "won_at": row['end_time'].isoformat(),
         }
         
-        if payment:
+        if row['payment_id']:
             item_data.update({
                 "payment_status": "paid",
-                "paid_at": payment.paid_at.isoformat() if payment.paid_at else None,
-                "total_paid": float(payment.total_amount),
-                "confirmation_number": payment.confirmation_number
+                "paid_at": row['payment__paid_at'].isoformat() if row['payment__paid_at'] else None,
+                "total_paid": float(row['payment__total_amount']),
+                "confirmation_number": row['payment__confirmation_number']
             })
             paid_items.append(item_data)
         else:
@@ -281,5 +360,6 @@ def get_my_won_items(request):
     
     return Response({
         "unpaid_items": unpaid_items,
-        "paid_items": paid_items
+        "paid_items": paid_items,
+        "next_cursor": next_cursor
     }, status=status.HTTP_200_OK)
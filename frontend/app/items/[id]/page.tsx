@@ -7,9 +7,10 @@ import { useAuth } from '@/app/contexts/AuthContext';
 import { itemsApi } from '@/lib/api';
 import styles from './page.module.css';
 import Countdown from '@/components/Countdown';
+import { useItemPriceStream } from '@/hooks/useItemPriceStream';
 
 interface Image {
-  data: string;
+  url: string;
   format: string;
   order: number;
 }
@@ -105,7 +106,7 @@ export default function ItemPage({ params }: { params: Promise<{ id: string }> }
 
     try {
       const response = await fetch(
-        `${base}/payments/my-won-items/`,
+        `${base}/payments/my-won-items/?item_id=${resolvedParams.id}`,
         {
           method: 'GET',
           credentials: 'include',
@@ -147,6 +148,20 @@ export default function ItemPage({ params }: { params: Promise<{ id: string }> }
     }
   }, [resolvedParams.id, authLoading, user]);
 
+  // Keep price, leading bidder and open/closed state live while the page is open
+  useItemPriceStream(parseInt(resolvedParams.id), (update) => {
+    setItem((prev) =>
+      prev
+        ? {
+            ...prev,
+            current_price: String(update.current_price),
+            current_bidder_username: update.current_bidder,
+            is_active: update.is_active,
+          }
+        : prev
+    );
+  });
+
   // Handle bid submission
   const handlePlaceBid = async () => {
     const base = (process.env.NEXT_PUBLIC_API_BASE ?? '/api').replace(/\/$/, '');
@@ -280,7 +295,7 @@ export default function ItemPage({ params }: { params: Promise<{ id: string }> }
               <div className={styles.carousel}>
                 {/* Main Image */}
                 <img
-                  src={`data:image/${currentImage.format};base64,${currentImage.data}`}
+                  src={currentImage.url}
                   alt={item.name}
                   className={styles.mainImage}
                   onClick={() => setShowImageModal(true)}
@@ -315,7 +330,7 @@ export default function ItemPage({ params }: { params: Promise<{ id: string }> }
                     {sortedImages.map((img, idx) => (
                       <img
                         key={idx}
-                        src={`data:image/${img.format};base64,${img.data}`}
+                        src={img.url}
                         alt={`Thumbnail ${idx + 1}`}
                         onClick={() => setCurrentImageIndex(idx)}
                         className={`${styles.thumbnail} ${
@@ -596,7 +611,7 @@ export default function ItemPage({ params }: { params: Promise<{ id: string }> }
             onClick={(e) => e.stopPropagation()}
           >
             <img
-              src={`data:image/${currentImage.format};base64,${currentImage.data}`}
+              src={currentImage.url}
               alt={item.name}
               className={styles.modalImage}
             />
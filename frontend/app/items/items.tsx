@@ -2,7 +2,7 @@ export const dynamic = 'force-dynamic';
 
 import ItemCard from '@/components/ItemCard';
 
-type Image = { data: string; format: string; order: number };
+type Image = { url: string; format: string; order: number };
 
 type Item = {
   id: number;
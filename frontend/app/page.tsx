@@ -17,12 +17,14 @@ async function fetchItems(sp: SP) {
   const status = rawStatus === undefined ? 'active' : rawStatus; // '', 'active', 'ended'
 
   const type = get(sp, 'type'); // '', 'FORWARD', 'DUTCH'
+  const cursor = get(sp, 'cursor');
 
   const params = new URLSearchParams();
   params.set('sort', sort);
   if (q) params.set('q', q);
   if (status) params.set('status', status);
   if (type) params.set('type', type);
+  if (cursor) params.set('cursor', cursor);
   params.set('page_size', '24');
 
   const res = await fetch(`${base}/items/?${params.toString()}`, {
@@ -99,6 +101,17 @@ export default async function HomePage({
           ))
         )}
       </div>
+
+      {data?.next_cursor && (
+        <div className="mt-6 flex justify-center">
+          <a
+            className="underline text-sm"
+            href={`/?${new URLSearchParams({ q, sort, status, type, cursor: data.next_cursor })}`}
+          >
+            Next page →
+          </a>
+        </div>
+      )}
     </main>
   );
 }
\ No newline at end of file
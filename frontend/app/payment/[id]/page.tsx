@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect, use } from 'react';
+import { useState, useEffect, use, useRef } from 'react';
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/app/contexts/AuthContext';
 import { itemsApi } from '@/lib/api';
@@ -47,6 +47,8 @@ export default function PaymentPage({ params }: { params: Promise<{ id: string }
   const [expiryDate, setExpiryDate] = useState('');
   const [cvv, setCvv] = useState('');
   const [processing, setProcessing] = useState(false);
+  // One key per visit: double clicks and retries replay the first charge instead of making another
+  const idempotencyKey = useRef(crypto.randomUUID());
 
   // Check if user has already paid
   const checkPaymentStatus = async () => {
@@ -54,7 +56,7 @@ export default function PaymentPage({ params }: { params: Promise<{ id: string }
 
     try {
       const response = await fetch(
-        `${process.env.NEXT_PUBLIC_API_BASE}/payments/my-won-items/`,
+        `${process.env.NEXT_PUBLIC_API_BASE}/payments/my-won-items/?item_id=${resolvedParams.id}`,
         {
           method: 'GET',
           credentials: 'include',
@@ -103,6 +105,20 @@ export default function PaymentPage({ params }: { params: Promise<{ id: string }
     }
   }, [resolvedParams.id, authLoading, user]);
 
+  const waitForSettlement = async (): Promise<{ status: string; error?: string }> => {
+    for (;;) {
+      const res = await fetch(
+        `${process.env.NEXT_PUBLIC_API_BASE}/payments/${item?.id}/status/`,
+        { credentials: 'include' }
+      );
+      if (res.ok) {
+        const data = await res.json();
+        if (data.status === 'COMPLETED' || data.status === 'FAILED') return data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
   e.preventDefault();
   setProcessing(true);
@@ -122,13 +138,21 @@ export default function PaymentPage({ params }: { params: Promise<{ id: string }
         headers: {
           'Content-Type': 'application/json',
           'X-CSRFToken': csrfToken || '',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify(payload),
       }
     );
 
     if (response.ok) {
-      router.push(`/receipts/${item?.id}`);
+      // The charge settles in the background; wait for its outcome
+      const outcome = await waitForSettlement();
+      if (outcome.status === 'COMPLETED') {
+        router.push(`/receipts/${item?.id}`);
+      } else {
+        setError(outcome.error || 'Payment failed');
+        setProcessing(false);
+      }
     } else {
       // Show raw backend error so we see if anything else is required
       const text = await response.text();
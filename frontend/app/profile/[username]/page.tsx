@@ -17,7 +17,7 @@ interface AuctionItem {
   current_bidder_username: string | null;
   is_active: boolean;
   images: Array<{
-    data: string;
+    url: string;
     format: string;
     order: number;
   }>;
@@ -325,6 +325,8 @@ function CreateItemModal({
   const [dutchPercentage, setDutchPercentage] = useState('');
   const [dutchInterval, setDutchInterval] = useState('');
   const [images, setImages] = useState<string[]>([]);
+  // The files behind the previews; uploaded as multipart parts
+  const [imageFiles, setImageFiles] = useState<File[]>([]);
   const [dragActive, setDragActive] = useState(false);
   const [saving, setSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -364,18 +366,15 @@ function CreateItemModal({
     for (const file of filesToProcess) {
       if (!file.type.startsWith('image/')) continue;
       
-      const reader = new FileReader();
-      reader.onload = (e) => {
-        if (e.target?.result) {
-          setImages((prev) => [...prev, e.target!.result as string]);
-        }
-      };
-      reader.readAsDataURL(file);
+      // Object URLs keep previews in step with imageFiles without reading the file into memory
+      setImageFiles((prev) => [...prev, file]);
+      setImages((prev) => [...prev, URL.createObjectURL(file)]);
     }
   };
 
   const removeImage = (index: number) => {
     setImages((prev) => prev.filter((_, i) => i !== index));
+    setImageFiles((prev) => prev.filter((_, i) => i !== index));
   };
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -414,19 +413,18 @@ function CreateItemModal({
         return;
       }
 
-      // Format payload
-      const payload: any = {
-        name: name.trim(),
-        description: description.trim(),
-        starting_price: parseFloat(startingPrice),
-        auction_type: auctionType,
-        end_time: endDate.toISOString(),
-        images_data: images.map(img => img.split(',')[1]), // Remove data:image/... prefix
-      };
+      // Format payload; images go as file parts rather than base64 strings
+      const payload = new FormData();
+      payload.append('name', name.trim());
+      payload.append('description', description.trim());
+      payload.append('starting_price', String(parseFloat(startingPrice)));
+      payload.append('auction_type', auctionType);
+      payload.append('end_time', endDate.toISOString());
+      imageFiles.forEach((file) => payload.append('image_files', file));
 
       if (auctionType === 'DUTCH') {
-        payload.dutch_decrease_percentage = parseFloat(dutchPercentage);
-        payload.dutch_decrease_interval = parseInt(dutchInterval);
+        payload.append('dutch_decrease_percentage', String(parseFloat(dutchPercentage)));
+        payload.append('dutch_decrease_interval', String(parseInt(dutchInterval)));
       }
 
       await itemsApi.createItem(payload);
@@ -694,7 +692,7 @@ function EditItemModal({
   const [name, setName] = useState('');
   const [description, setDescription] = useState('');
   const [images, setImages] = useState<
-    Array<{ data: string; format: string; order: number }>
+    Array<{ url: string; format: string; order: number }>
   >([]);
   const [imageOrder, setImageOrder] = useState<number[]>([]);
   const [loading, setLoading] = useState(true);
@@ -823,7 +821,7 @@ function EditItemModal({
                   }`}
                 >
                   <img
-                    src={`data:image/${images[originalIndex].format};base64,${images[originalIndex].data}`}
+                    src={images[originalIndex].url}
                     alt={`Image ${newIndex + 1}`}
                   />
                   <span className={styles.imageNumber}>{newIndex + 1}</span>
@@ -13,7 +13,7 @@ interface Item {
   current_price: string;
   current_bidder_username: string | null;
   seller_username: string;
-  images?: Array<{ data: string; format: string; order: number }>;
+  images?: Array<{ url: string; format: string; order: number }>;
   thumbnail?: string;
   end_time?: string;
 }
@@ -120,7 +120,7 @@ export default function ReceiptPage({ params }: { params: Promise<{ id: string }
             {mainImage && (
               <div className={styles.itemImage}>
                 <img 
-                  src={`data:image/${mainImage.format};base64,${mainImage.data}`}
+                  src={mainImage.url}
                   alt={item.name}
                 />
               </div>
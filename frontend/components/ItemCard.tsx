@@ -2,7 +2,7 @@
 import Link from 'next/link';
 import Countdown from '@/components/Countdown'; // ⬅️ add this
 
-type Image = { data: string; format: string; order: number };
+type Image = { url: string; format: string; order: number };
 
 type Item = {
   id: number;
@@ -24,7 +24,7 @@ export default function ItemCard({
   const thumbSrc =
     item.thumbnail ||
     (item.images?.length
-      ? `data:image/${item.images[0].format};base64,${item.images[0].data}`
+      ? item.images[0].url
       : undefined);
 
   return (
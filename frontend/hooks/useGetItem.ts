@@ -4,7 +4,7 @@ import { useState, useEffect } from 'react';
 import { itemsApi } from '@/lib/api';
 
 interface Image {
-  data: string;
+  url: string;
   format: string;
   order: number;
 }
@@ -0,0 +1,66 @@
+'use client';
+
+import { useEffect } from 'react';
+import { API_BASE, apiClient } from '@/lib/api';
+
+export interface PriceUpdate {
+  current_price: number | string;
+  current_bidder: string | null;
+  is_active: boolean;
+  minimum_bid: number | string | null;
+}
+
+// The stream is served by the ASGI pods (/api/items/stream/ behind the ingress);
+// in docker-compose it has its own port, so it can be pointed elsewhere
+const STREAM_BASE = (process.env.NEXT_PUBLIC_STREAM_BASE || API_BASE).replace(/\/$/, '');
+const POLL_INTERVAL_MS = 5000;
+
+/**
+ * Calls onUpdate with the item's live price: from the server-sent event stream,
+ * or by polling current-price/ if the stream is unavailable.
+ */
+export function useItemPriceStream(itemId: number, onUpdate: (update: PriceUpdate) => void) {
+  useEffect(() => {
+    if (!itemId) return;
+
+    let source: EventSource | null = null;
+    let pollTimer: ReturnType<typeof setInterval> | null = null;
+    let closed = false;
+
+    const poll = async () => {
+      try {
+        onUpdate(await apiClient.get(`/items/${itemId}/current-price/`));
+      } catch {
+        // keep the last known price until the next poll
+      }
+    };
+
+    const startPolling = () => {
+      if (pollTimer || closed) return;
+      poll();
+      pollTimer = setInterval(poll, POLL_INTERVAL_MS);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+    } else {
+      source = new EventSource(`${STREAM_BASE}/items/stream/?ids=${itemId}`, {
+        withCredentials: true,
+      });
+      source.addEventListener('price', (event) => {
+        const data = JSON.parse((event as MessageEvent).data);
+        if (data.item_id === itemId) onUpdate(data);
+      });
+      source.onerror = () => {
+        // EventSource reconnects on its own unless the server refused the stream
+        if (source?.readyState === EventSource.CLOSED) startPolling();
+      };
+    }
+
+    return () => {
+      closed = true;
+      source?.close();
+      if (pollTimer) clearInterval(pollTimer);
+    };
+  }, [itemId]);
+}
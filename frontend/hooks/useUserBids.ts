@@ -9,7 +9,7 @@ interface BidItem {
   description: string;
   current_price: string;
   seller_username: string;
-  images: Array<{ data: string; format: string; order: number }>;
+  images: Array<{ url: string; format: string; order: number }>;
   thumbnail: string;
   is_active: boolean;
   remaining_time: string;
@@ -10,7 +10,7 @@ interface Item {
   starting_price: string;
   current_price: string;
   seller_username: string;
-  images: Array<{ data: string; format: string; order: number }>;
+  images: Array<{ url: string; format: string; order: number }>;
   thumbnail: string;
   is_active: boolean;
 }
@@ -60,12 +60,14 @@ class ApiClient {
   ): Promise<T> {
     const clean = this.clean(endpoint);
     const headers: Record<string, string> = {};
+    // FormData goes as multipart; the browser sets the boundary header
+    const isForm = typeof FormData !== 'undefined' && body instanceof FormData;
 
     if (method === 'GET') {
       headers['Accept'] = 'application/json';
     } else {
       const csrf = await this.ensureCsrf();
-      headers['Content-Type'] = 'application/json';
+      if (!isForm) headers['Content-Type'] = 'application/json';
       headers['X-CSRFToken'] = csrf;     
     }
 
@@ -73,7 +75,7 @@ class ApiClient {
       method,
       credentials: 'include',
       headers,
-      body: body === undefined ? undefined : JSON.stringify(body),
+      body: body === undefined ? undefined : isForm ? (body as FormData) : JSON.stringify(body),
     });
 
     const data = await this.safeJson(res);
@@ -105,7 +107,9 @@ export const apiClient = new ApiClient();
 
 export const userApi = {
   getItems: (username: string) => apiClient.get(`/users/${username}/items/`),
-  getBids: (username: string) => apiClient.get(`/users/${username}/bids/`),
+  // Paginated by cursor; the profile shows the most recent 100
+  getBids: (username: string) =>
+    apiClient.get(`/users/${username}/bids/?page_size=100`).then((data: any) => data.results),
 };
 
 export const itemsApi = {
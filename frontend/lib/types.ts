@@ -1,6 +1,6 @@
 export interface Image {
   id?: number;
-  data: string;
+  url: string;
   format: 'jpeg' | 'png' | 'jpg';
   order: number;
 }